@@ -1,21 +1,15 @@
+import time
+
+_startTime = time.perf_counter()
+
 # Set system path for external packages
 from . import setup  # noqa: F401
 
 import os
-import requests
-
-from aqt import mw, qconnect
-
-# import the "show info" tool from utils.py
-from aqt.utils import showInfo
-
-# import all of Qt GUI library
-from aqt.qt import QAction
-from .addon.addonWindow import Windows
 import logging
 
-HOME = os.path.expanduser("~")
-BASHRC_FILE = HOME + "/.bashrc"
+# `APORA_DICT2ANKI_SSL_VERIFY=0` or `"sslVerify": false` in the add-on config disable SSL checks
+SSL_VERIFY_ENV = "APORA_DICT2ANKI_SSL_VERIFY"
 
 # set logger level
 
@@ -26,6 +20,8 @@ logger.debug("Executing __init__.py")
 
 
 def disable_ssl_check():
+    import requests
+
     original_req = requests.Session.request
 
     def request(*args, **kwargs):
@@ -35,47 +31,65 @@ def disable_ssl_check():
     requests.Session.request = request
 
 
-check_debug = True
-DEBUG = False
+DEBUG = os.environ.get(SSL_VERIFY_ENV) == "0"  # read once, completed from config below
+ssl_check_disabled = False
 
 
 def disable_ssl_check_if_debug():
-    global check_debug, DEBUG
-    if not check_debug:
-        return
-    if not os.path.exists(BASHRC_FILE):
+    global ssl_check_disabled
+    if not DEBUG or ssl_check_disabled:
         return
-    try:
-        rc = os.system(
-            f'source {BASHRC_FILE} && test "$Apora DICT2ANKI_SSL_VERIFY" = "0"'
-        )
-        if rc == 0:
-            DEBUG = True
-            showInfo("[Apora Dict2Anki] DEBUG=True, SSL Check is DISABLED!")
-            disable_ssl_check()
-        check_debug = False  # check and prompt once
-    except Exception:
-        pass
+    from aqt.utils import showInfo
 
+    showInfo("[Apora Dict2Anki] DEBUG=True, SSL Check is DISABLED!")
+    disable_ssl_check()
+    ssl_check_disabled = True  # check and prompt once
 
-try:
-    from aqt import mw, qconnect
 
-    # import the "show info" tool from utils.py
-    from aqt.utils import showInfo
+try:
+    from aqt import gui_hooks, mw, qconnect
 
     # import all of Qt GUI library
     from aqt.qt import QAction
-    from .addon.addonWindow import Windows
+
+    # only lightweight modules here, the window (dictionaries, query apis, bs4, requests,
+    # generated UI and icon resources) is imported when the menu action is first triggered
+    from .addon.configService import getConfigService, registerConfigServiceHooks
+    from .addon.noteIndex import registerNoteIndexHooks
 
     logger.debug("Successfully imported aqt and addon.")
 
+    registerNoteIndexHooks()
+    registerConfigServiceHooks()
+
+    DEBUG = DEBUG or not getConfigService().snapshot.sslVerify
+
+    window = None
+
     def show_window():
+        """The dialog is built on first open and reused afterwards"""
+        global window
         disable_ssl_check_if_debug()
-        w = Windows()
-        w.exec()
+        if window is None:
+            start = time.perf_counter()
+            from .addon.addonWindow import Windows
+
+            window = Windows(mw)
+            logger.debug(
+                f"Window created in {(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+        window.exec()
 
-    logger.debug("Successfully imported aqt and addon.")
+    def close_window():
+        """The window holds state of the current collection, drop it with the profile"""
+        global window
+        if window is None:
+            return
+        window.shutdown()
+        window.deleteLater()
+        window = None
+
+    gui_hooks.profile_will_close.append(close_window)
 
     action = QAction("Apora Dict2Anki", mw)
     qconnect(action.triggered, show_window)
@@ -98,4 +112,6 @@ except Exception as ex:
         window.exec()
         sys.exit(app.exec())
 
-logger.debug("__init__.py execution end.")
+logger.info(
+    f"__init__.py execution end, add-on loaded in {(time.perf_counter() - _startTime) * 1000:.1f}ms"
+)
@@ -1,16 +1,22 @@
 import json
 import logging
 import sys
+import threading
 from copy import deepcopy
 from pathlib import Path
 
 from aqt.qt import (
     QAction,
+    QCheckBox,
     QKeySequence,
     QDialog,
     QFileDialog,
     QIcon,
+    QLabel,
+    QListView,
+    QListWidget,
     QListWidgetItem,
+    QPushButton,
     Qt,
     QThread,
     pyqtSlot,
@@ -24,6 +30,10 @@ from .constants import (
     WINDOW_TITLE,
     BACKWARDS_CARD_TEMPLATE_NAME,
     CARD_SETTINGS,
+    FILL_MISSING_VALUES_CHUNK_SIZE,
+    RUN_REPORT_DIRNAME,
+    USER_FILES_DIR,
+    WORDBOOK_SNAPSHOT_FILENAME,
 )
 from .noteManager import (
     FieldGroup,
@@ -34,7 +44,16 @@ from .noteManager import (
     checkModelCardTemplates,
     getOrCreateBackwardsCardTemplate,
     deleteBackwardsCardTemplate,
-    addNoteToDeck,
+    addNotesInBulk,
+    buildAddNoteRequest,
+    fillNoteFields,
+    findNotesWithMissingFields,
+    findNotesWithMissingMedia,
+    findSoundReferences,
+    findUnreferencedSounds,
+    replaceSoundReferences,
+    getEnabledFieldNames,
+    updateNotesInBulk,
     getDeckList,
     getOrCreateDeck,
     getOrCreateModel,
@@ -49,13 +68,22 @@ from .dictionary import DICTIONARIES
 from .dictionary.base import (
     SimpleWord,
 )
+from .dictionary.snapshot import WordbookSnapshotCache
+from .audioCompressor import (
+    DOWNLOADED_AUDIO_FORMAT,
+    audio_format,
+    compress_files,
+    find_ffmpeg,
+)
+from .downloadManager import DownloadManager, DownloadQueue
 from .logger import TimedBufferingHandler
+from .configService import flushConfig, getConfigService
+from .noteIndex import saveNoteIndex
+from .progress import ProgressAggregator
 from .loginDialog import LoginDialog
 from .misc import (
     Mask,
-    safe_load_config,
     safe_load_empty_config,
-    safe_convert_config_to_dict,
     transform_lang_to_text,
     ConfigType,
     ContextDifficulty,
@@ -68,16 +96,24 @@ from .misc import (
 from .queryApi import QUERY_APIS
 from .queryApi.base import QueryAPIPlatformEnum, AbstractQueryAPI, QueryAPIReturnType
 from .queryApi.utils import get_pronunciation
+from .runReport import getRunReport, startRunReport
+from .termIndex import TermIndex
 from .UIForm import mainUI, wordGroup
+from .wordListModel import WordListModel, WordStatus
+from .wordImporter import ImportStats
 from .workers import (
     AssetDownloadWorker,
     LoginStateCheckWorker,
+    MultiDictionaryFetchingWorker,
     QueryWorker,
     RemoteWordFetchingWorker,
+    WordImportWorker,
 )
 from typing import Callable, Optional
 
 from aqt import mw
+from anki.collection import OpChangesWithCount
+from aqt.operations import CollectionOp, QueryOp
 from aqt.utils import askUser, showCritical, showInfo, tooltip
 
 
@@ -94,7 +130,7 @@ sys.excepthook = fatal_error
 
 # change UI slots in `addon/UIForm`
 class Windows(QDialog, mainUI.Ui_Dialog):
-    isRunning = False
+    """Created once per profile and shown again on every open, see `show_window`"""
 
     def __init__(self, parent=None):
         super(Windows, self).__init__(parent)
@@ -102,6 +138,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.currentConfig = safe_load_empty_config()
         self.localWords: list[str] = []
         self.remoteWordsDict: dict[str, SimpleWord] = {}
+        self.remoteTermIndex = TermIndex()
         self.selectedGroups: list[list[str]] = [list()] * len(DICTIONARIES)
 
         self.querySuccessDict: dict[int, QueryAPIReturnType] = {}  # row -> queryResult
@@ -112,18 +149,26 @@ class Windows(QDialog, mainUI.Ui_Dialog):
 
         self.added = 0
         self.deleted = 0
+        self.syncStepsPending = 0  # steps still running after notes are added
+        self.runLogStart = 0  # first line of the current run in the log box
 
         self.workerThread = QThread(self)
         self.workerThread.start()
-        self.updateCheckThead = QThread(self)
-        self.updateCheckThead.start()
+        self.updateCheckThead = QThread(self)  # started by checkUpdate, if ever enabled
         self.assetDownloadThread = QThread(self)
 
         self.updateCheckWork = None
         self.loginWorker = None
         self.queryWorker = None
         self.pullWorker = None
+        self.multiPullWorker = None
+        self.importWorker = None
         self.assetDownloadWorker = None
+        self.snapshotCache: Optional[WordbookSnapshotCache] = None
+        self.downloadManager: Optional[DownloadManager] = None
+        self.prefetchStopped = threading.Event()
+        # the config was changed elsewhere (e.g. Anki's config editor) while the dialog was hidden
+        self.configChangedOutside = False
 
         self.setupUi(self)
         self.setWindowTitle(WINDOW_TITLE)
@@ -144,20 +189,63 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.setupLogger()
 
         self.initCore()
+        getConfigService().subscribe(self.on_configChanged)
         # self.checkUpdate()    # 会导致卡顿
         # self.__dev() # 以备调试时使用
 
-    def closeEvent(self, a0):
-        """插件关闭时调用"""
-        # cleanup
+    def showEvent(self, a0):
+        """Warm start: threads stopped by the last `closeEvent` are restarted, decks reloaded"""
+        super().showEvent(a0)
+        if not self.workerThread.isRunning():
+            self.workerThread.start()
+        self.prefetchStopped.clear()
+        if self.configChangedOutside:
+            self.setupGUIByConfig()
+        self.refreshDeckList()
+
+    def on_configChanged(self, config: ConfigType, _old: ConfigType):
+        """Config subscriber, may be called from any thread"""
+        self.currentConfig = config
+        if not self.isVisible():
+            self.configChangedOutside = True
+
+    def refreshDeckList(self):
+        """Load the deck names off the GUI thread, keeping the deck currently typed or selected"""
+        if mw.col is None:
+            return
+
+        def onSuccess(deckNames: list[str]):
+            currentDeck = self.deckComboBox.currentText()
+            self.deckComboBox.clear()
+            self.deckComboBox.addItems(deckNames)
+            self.deckComboBox.setCurrentText(currentDeck)
+
+        QueryOp(parent=self, op=getDeckList, success=onSuccess).failure(
+            lambda err: logger.warning(f"读取牌组列表失败: {err}")
+        ).run_in_background()
+
+    def shutdown(self):
+        """Release what outlives a single open, before the dialog is destroyed"""
+        self.closeEvent(None)  # stops the threads even if the dialog is hidden
+        getConfigService().unsubscribe(self.on_configChanged)
         for dictionary in DICTIONARIES:
             dictionary.close()
         for api in QUERY_APIS:
             api.close()
-
         if self.assetDownloadWorker:
             AssetDownloadWorker.close()
 
+    def closeEvent(self, a0):
+        """插件关闭时调用, the dialog itself is kept for the next open"""
+        if getRunReport().stages:
+            self.endRun("closed")
+        saveNoteIndex()
+        flushConfig()
+
+        self.prefetchStopped.set()
+        if self.downloadManager is not None:
+            self.downloadManager.shutdown()
+
         # 退出所有线程
         if self.workerThread.isRunning():
             self.workerThread.requestInterruption()
@@ -201,13 +289,10 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.logTextBox.destroyed.connect(onDestroyed)
 
     def setupGUIByConfig(self):
-        """Setting GUI Widget by reading config file"""
-        untypedConfig = mw.addonManager.getConfig(__name__)
-
-        if untypedConfig is None:
-            raise Exception("Cannot read config")
-
-        config = safe_load_config(untypedConfig)
+        """Setting GUI Widget by the config snapshot"""
+        config = getConfigService().snapshot
+        self.currentConfig = config
+        self.configChangedOutside = False
 
         selectedDifficulty = 0
 
@@ -232,7 +317,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.languageComboBox.setCurrentIndex(selectedLanguage)
 
         if config.selectedGroup:
-            self.selectedGroups = config.selectedGroup
+            # edited in place by the window, the snapshot must not be
+            self.selectedGroups = [list(groups) for groups in config.selectedGroup]
         else:
             self.selectedGroups = [list()] * len(DICTIONARIES)
 
@@ -260,6 +346,9 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.enableTermHighlight.setChecked(config.enableTermHighlight)
         self.contextDifficultyComboBox.setCurrentIndex(selectedDifficulty)
         self.contextTranslation.setChecked(config.contextTranslation)
+        self.pullAllDictionariesCheckBox.setChecked(config.pullAllDictionaries)
+        self.compressAudioCheckBox.setChecked(config.compressAudio)
+        self.prefetchAudioCheckBox.setChecked(config.prefetchAudio)
 
     def initCore(self):
         # Temporarily disable username/password login, use cookie is more stable
@@ -272,9 +361,58 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         for d in DICTIONARIES:
             self.dictionaryComboBox.addItem(d.name, d.platform)
 
+        # pull from every logged-in dictionary at once, and merge their words
+        self.pullAllDictionariesCheckBox = QCheckBox("全部词典", self.mainTab)
+        self.pullAllDictionariesCheckBox.setToolTip(
+            "同时从所有已登录的词典拉取上次选择的单词本，并合并去重"
+        )
+        self.dictionaryLayout.addWidget(self.pullAllDictionariesCheckBox)
+
+        # progress is counted from the worker threads and repainted at a fixed rate
+        self.progressStatusLabel = QLabel(self)
+        self.main_layout.insertWidget(
+            self.main_layout.indexOf(self.progressBar) + 1, self.progressStatusLabel
+        )
+        self.progress = ProgressAggregator(
+            self.progressBar, self.progressStatusLabel, parent=self
+        )
+
+        # word lists are views over columnar models, not one item widget per word
+        self.newWordModel = WordListModel(parent=self)
+        self.newWordListView = self.replaceListWidget(
+            self.newWordListWidget, self.newWordModel
+        )
+        self.needDeleteWordModel = WordListModel(checkable=True, parent=self)
+        self.needDeleteWordListView = self.replaceListWidget(
+            self.needDeleteWordListWidget, self.needDeleteWordModel
+        )
+
+        # optional compression of downloaded audio (needs ffmpeg)
+        self.compressAudioCheckBox = QCheckBox(
+            "压缩音频 (Ogg/Opus)", self.defaultConfigGroupBox
+        )
+        self.compressAudioCheckBox.setToolTip(
+            "下载后将 WAV 发音转为单声道 22kHz Opus，体积约为原来的 1/10（需要 ffmpeg）"
+        )
+        self.gridLayout.addWidget(self.compressAudioCheckBox, 0, 1, 1, 1)
+        self.prefetchAudioCheckBox = QCheckBox(
+            "查询时下载音频", self.defaultConfigGroupBox
+        )
+        self.prefetchAudioCheckBox.setToolTip(
+            "每个单词查询完成后立即开始下载其发音，同步时大部分音频已下载完毕"
+        )
+        self.gridLayout.addWidget(self.prefetchAudioCheckBox, 0, 2, 1, 1)
+        self.btnCompressAudio = QPushButton(
+            "Compress Existing Audio", self.utilitiesGroupBox
+        )
+        self.btnCompressAudio.setToolTip(
+            "Convert the WAV pronunciations of existing notes to Ogg/Opus (needs ffmpeg)"
+        )
+        self.gridLayout_7.addWidget(self.btnCompressAudio, 1, 1, 1, 1)
+        self.btnCompressAudio.clicked.connect(self.on_btnCompressAudio_clicked)
+
         # dynamically add apis, languages and decks
         self.apiComboBox.addItems([d.name for d in QUERY_APIS])
-        self.deckComboBox.addItems(getDeckList())
         self.languageComboBox.addItems([transform_lang_to_text(x) for x in Language])
 
         # bind save button and shortcut (Ctrl+S)
@@ -301,6 +439,20 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.GBSpeakingRadioButton.setEnabled(isTargetEnglish)
         self.USSpeakingRadioButton.setEnabled(isTargetEnglish)
 
+    def replaceListWidget(self, widget: QListWidget, model: WordListModel) -> QListView:
+        """Swap a list widget of the generated UI for a `QListView` over `model`"""
+        view = QListView(widget.parentWidget())
+        view.setAlternatingRowColors(widget.alternatingRowColors())
+        view.setSelectionMode(widget.selectionMode())
+        view.setUniformItemSizes(True)  # rows are laid out without measuring each
+        view.setModel(model)
+        layout = widget.parentWidget().layout()
+        if layout is not None:
+            layout.replaceWidget(widget, view)
+        widget.hide()
+        widget.deleteLater()
+        return view
+
     def on_languageComboBox_change(self, index: int):
         if index == 0:
             self.GBSpeakingRadioButton.setEnabled(True)
@@ -327,14 +479,9 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         print("invoke getAndSaveCurrentConfig_returnMetaInfo()")
 
         # Get old credential
-        untypedOldConfig = mw.addonManager.getConfig(__name__)
+        oldConfig = getConfigService().snapshot
 
-        if untypedOldConfig is None:
-            raise Exception("Cannot read config file.")
-
-        oldConfig = safe_load_config(untypedOldConfig)
-
-        credential = oldConfig.credential
+        credential = list(oldConfig.credential)
         # Append the current credential to the old one
 
         currentSelectedCredentialPlatform: CredentialPlatformEnum = (
@@ -388,29 +535,26 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             enableTermHighlight=self.enableTermHighlight.isChecked(),
             contextDifficulty=contextDifficultyValue,
             language=languageValue,
+            pullAllDictionaries=self.pullAllDictionariesCheckBox.isChecked(),
+            compressAudio=self.compressAudioCheckBox.isChecked(),
+            prefetchAudio=self.prefetchAudioCheckBox.isChecked(),
+            sslVerify=oldConfig.sslVerify,
         )
 
         configChanged, cardSettingsChanged = self._saveConfig(currentConfig)
-        self.currentConfig = currentConfig
-        return currentConfig, configChanged, cardSettingsChanged
+        self.currentConfig = getConfigService().snapshot
+        return self.currentConfig, configChanged, cardSettingsChanged
 
     def _saveConfig(self, config: ConfigType) -> tuple[bool, bool]:
         """:return: (configChanged, cardSettingsChanged)"""
-        # get the config currently stored in Anki
-        untypedOldConfig = deepcopy(mw.addonManager.getConfig(__name__))
-
-        if untypedOldConfig is None:
-            raise Exception("Cannot read oldConfig.")
-
-        # safely convert config into typed ConfigType
-        oldConfig = safe_load_config(untypedOldConfig)
+        configService = getConfigService()
+        oldConfig = configService.snapshot
 
-        # we compare `ConfigType` by calling __eq__ method that dataclass generated
-        configChanged = config == oldConfig
-
-        if configChanged:
+        # the snapshot is normalized by the service, compare what it would store
+        if not configService.update(config):
             logger.info("Config has no changes.")
             return False, False
+        config = configService.snapshot
 
         cardSettingsChanged = False
 
@@ -418,12 +562,10 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             if getattr(config, setting) != getattr(oldConfig, setting):
                 cardSettingsChanged = True
 
-        logger.info(
-            f"configChanged: {configChanged}, cardSettingsChanged: {cardSettingsChanged}"
-        )
+        logger.info(f"cardSettingsChanged: {cardSettingsChanged}")
+        # written by the service once the updates settle
         logger.info(f"Saving config: {self._mask_config(config)}")
-        mw.addonManager.writeConfig(__name__, safe_convert_config_to_dict(config))
-        return configChanged, cardSettingsChanged
+        return True, cardSettingsChanged
 
     def _mask_config(self, config: ConfigType) -> object:
         """Mostly for logging purposes, mask secrets with `***********`"""
@@ -473,12 +615,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.currentDictionaryLabel.setText(
             f"当前选择词典: {self.dictionaryComboBox.currentText()}"
         )
-        untypedConfig = mw.addonManager.getConfig(__name__)
-
-        if untypedConfig is None:
-            raise Exception("Cannot read config.")
-
-        config = safe_load_config(untypedConfig)
+        config = getConfigService().snapshot
 
         # self.cookieLineEdit.setText(config["credential"][index]["cookie"])
 
@@ -496,10 +633,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             return
 
         # if word boxes are not empty, warn user before proceeding
-        if (
-            self.newWordListWidget.count() > 0
-            or self.needDeleteWordListWidget.count() > 0
-        ):
+        if self.newWordModel.count() > 0 or self.needDeleteWordModel.count() > 0:
             if not askUser(
                 "The words boxes are not empty! Clear the words and continue?",
                 defaultno=True,
@@ -508,13 +642,16 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 self.logHandler.flush()
                 return
         # clear the word boxes
-        self.newWordListWidget.clear()
-        self.needDeleteWordListWidget.clear()
+        self.newWordModel.clear()
+        self.needDeleteWordModel.clear()
 
-        # choose txt files
+        # choose word list files
         homedir = str(Path.home())
         filenames, _ = QFileDialog.getOpenFileNames(
-            self, "Select Files", homedir, "Text Files (*.txt)"
+            self,
+            "Select Files",
+            homedir,
+            "Word Lists (*.txt *.csv *.tsv);;All Files (*)",
         )
         if not filenames:
             logger.info("No files selected.")
@@ -524,35 +661,42 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         logger.info(f"filenames: {filenames}")
         self.logHandler.flush()
 
-        words: list[SimpleWord] = []
-        for filename in filenames:
-            logger.info(f"Reading words from {filename}...")
-            words_in_file = [
-                SimpleWord.from_values(values_in_line)
-                for values_in_line in utils.read_words_from_file(filename)
-            ]
-            # Filter out None values returned by SimpleWord.from_values before extending
-            words_in_file = [w for w in words_in_file if w is not None]
-            logger.info(
-                f"[OK] Found {len(words_in_file)} words (may including duplicates)."
-            )
-            words.extend(words_in_file)
+        # files are parsed concurrently off the GUI thread, words are listed as they come
+        self.beginRun("import")
+        self.mainTab.setEnabled(False)
+        self.resetRemoteWords()
+        self.importWorker = WordImportWorker(filenames)
+        self.importWorker.moveToThread(self.workerThread)
+        self.importWorker.start.connect(self.importWorker.run)
+        self.progress.begin("导入", len(filenames))
+        direct = Qt.ConnectionType.DirectConnection
+        self.importWorker.fileStarted.connect(self.progress.started, direct)
+        self.importWorker.fileDone.connect(self.progress.finish, direct)
+        self.importWorker.doneThisBatch.connect(self.insertWordToListWidget)
+        self.importWorker.done.connect(self.on_importDone)
+        self.importWorker.start.emit()
+
+    @pyqtSlot(ImportStats)
+    def on_importDone(self, stats: ImportStats):
+        self.progress.end()
         logger.info("------------------------------")
         logger.info(
-            f"Total: Found {len(words)} words (may including duplicates) in {len(filenames)} files."
+            f"Total: Found {stats.unique} words ({stats.duplicates} duplicates skipped) in {stats.files} files."
         )
+        if stats.failedFiles:
+            logger.warning(f"Cannot read: {stats.failedFiles}")
         self.logHandler.flush()
         if not askUser(
-            f"Found {len(words)} words (may including duplicates) in {len(filenames)} files. Import now?"
+            f"Found {stats.unique} words ({stats.duplicates} duplicates skipped) in {stats.files} files. Import now?"
         ):
             logger.info("Aborted")
-            self.logHandler.flush()
+            self.newWordModel.clear()
+            self.resetRemoteWords()
+            self.mainTab.setEnabled(True)
+            self.endRun("cancelled")
             return
 
         logger.info("Start importing")
-        self.localWords = getWordsByDeck(self.deckComboBox.currentText())
-        self.remoteWordsDict = {}
-        self.insertWordToListWidget(words)
         self.on_allPullWork_done()
 
     @pyqtSlot()
@@ -562,11 +706,16 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             showInfo("\n请选择或输入要同步的牌组")
             return
 
+        self.beginRun("pull")
         self.mainTab.setEnabled(False)
         self.progressBar.setValue(0)
         self.progressBar.setMaximum(0)
 
         currentConfig = self.getAndSaveCurrentConfig()
+        if currentConfig.pullAllDictionaries:
+            self.pullFromAllDictionaries(currentConfig)
+            return
+
         self.selectedDict = DICTIONARIES[currentConfig.selectedDict]()
 
         # 登陆线程
@@ -580,6 +729,61 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.loginWorker.logFailed.connect(self.onLoginFailed)
         self.loginWorker.start.emit()
 
+    def pullFromAllDictionaries(self, config: ConfigType):
+        """Pull the last selected groups of every logged-in dictionary concurrently"""
+        jobs = []
+        for index, dictionaryClass in enumerate(DICTIONARIES):
+            cookie = (
+                config.credential[index].cookie
+                if index < len(config.credential)
+                else ""
+            )
+            groups = (
+                self.selectedGroups[index] if index < len(self.selectedGroups) else []
+            )
+            if not cookie or not groups:
+                logger.warning(
+                    f"{dictionaryClass.name}: 未登录或未选择单词本，跳过（请先单独拉取一次该词典）"
+                )
+                continue
+            jobs.append((dictionaryClass(), json.loads(cookie), list(groups)))
+
+        if not jobs:
+            showInfo("没有可用的词典：请先分别登录并拉取一次各个词典")
+            self.progressBar.setValue(0)
+            self.progressBar.setMaximum(1)
+            self.mainTab.setEnabled(True)
+            self.endRun("no dictionary")
+            return
+
+        logger.info(f"同时拉取: {[(d.name, groups) for d, _, groups in jobs]}")
+        self.newWordModel.clear()
+        self.needDeleteWordModel.clear()
+        self.resetRemoteWords()
+        if self.snapshotCache is None:
+            self.snapshotCache = WordbookSnapshotCache(
+                USER_FILES_DIR.joinpath(WORDBOOK_SNAPSHOT_FILENAME)
+            )
+
+        self.multiPullWorker = MultiDictionaryFetchingWorker(
+            jobs, snapshotCache=self.snapshotCache
+        )
+        self.multiPullWorker.moveToThread(self.workerThread)
+        self.multiPullWorker.start.connect(self.multiPullWorker.run)
+        self.progress.begin("拉取")
+        self.multiPullWorker.tick.connect(
+            self.progress.finish, Qt.ConnectionType.DirectConnection
+        )
+        self.multiPullWorker.addProgress.connect(
+            self.progress.addTotal, Qt.ConnectionType.DirectConnection
+        )
+        self.multiPullWorker.dictionaryFailed.connect(
+            lambda name: logger.warning(f"{name}: 登录失效，请切换到该词典重新登录")
+        )
+        self.multiPullWorker.doneThisGroup.connect(self.insertWordToListWidget)
+        self.multiPullWorker.done.connect(self.on_allPullWork_done)
+        self.multiPullWorker.start.emit()
+
     @pyqtSlot()
     def onLoginFailed(self):
         showCritical(title="Apora Dict2Anki", text="第一次登录或cookie失效!请重新登录")
@@ -587,6 +791,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.progressBar.setMaximum(1)
         self.mainTab.setEnabled(True)
         self.cookieLineEdit.clear()
+        # the login dialog may be closed without logging in
+        self.endRun("login failed")
         # Ensure selectedDict is initialized before accessing its attributes
         if self.selectedDict is None:
             idx = self.dictionaryComboBox.currentIndex()
@@ -596,9 +802,15 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             loginCheckCallbackFn=self.selectedDict.loginCheckCallbackFn,
             parent=self,
         )
-        self.loginDialog.loginSucceed.connect(self.onLogSuccess)
+        self.loginDialog.loginSucceed.connect(self.onLoginDialogSucceed)
         self.loginDialog.show()
 
+    @pyqtSlot(str)
+    def onLoginDialogSucceed(self, cookie: str):
+        """Pulling after logging in is a new run, the previous one ended when the login failed"""
+        self.beginRun("pull")
+        self.onLogSuccess(cookie)
+
     @pyqtSlot(str)
     def onLogSuccess(self, cookie: str) -> None:
         self.cookieLineEdit.setText(cookie)
@@ -618,8 +830,11 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             except Exception:
                 selected_idx = self.dictionaryComboBox.currentIndex()
             self.selectedDict = DICTIONARIES[selected_idx]()
-        self.selectedDict.checkCookie(json.loads(cookie))
-        groups = self.selectedDict.getGroups()
+        report = getRunReport()
+        with report.stage("login check") as timer:
+            timer.failed = not self.selectedDict.checkCookie(json.loads(cookie))
+        with report.stage("group fetch"):
+            groups = self.selectedDict.getGroups()
         if groups:
             logger.info(f"{len(groups)} group(s): {groups}")
         else:
@@ -628,8 +843,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         def onAccepted(is_popup=True):
             """选择单词本弹窗确定事件"""
             # 清空 listWidget
-            self.newWordListWidget.clear()
-            self.needDeleteWordListWidget.clear()
+            self.newWordModel.clear()
+            self.needDeleteWordModel.clear()
             self.mainTab.setEnabled(False)
 
             if not is_popup:
@@ -652,6 +867,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             self.progressBar.setValue(0)
             self.progressBar.setMaximum(1)
             self.mainTab.setEnabled(True)
+            self.endRun("cancelled")
 
         # Avoid popup when there's only 1 group
         if len(groups) == 1:
@@ -707,11 +923,16 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                     title="Apora Dict2Anki",
                     text="未能初始化词典实例，无法获取远程单词列表。",
                 )
+                self.mainTab.setEnabled(True)
+                self.endRun("failed")
                 return
 
         group_map = dict(self.selectedDict.groups)
-        self.localWords = getWordsByDeck(self.deckComboBox.currentText())
-        self.remoteWordsDict = {}
+        self.resetRemoteWords()
+        if self.snapshotCache is None:
+            self.snapshotCache = WordbookSnapshotCache(
+                USER_FILES_DIR.joinpath(WORDBOOK_SNAPSHOT_FILENAME)
+            )
 
         # 启动单词获取线程
         self.pullWorker = RemoteWordFetchingWorker(
@@ -723,79 +944,92 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 )
                 for group_name in selected_groups
             ],
+            snapshotCache=self.snapshotCache,
         )
         self.pullWorker.moveToThread(self.workerThread)
         self.pullWorker.start.connect(self.pullWorker.run)
+        self.progress.begin("拉取")
         self.pullWorker.tick.connect(
-            lambda: self.progressBar.setValue(self.progressBar.value() + 1)
+            self.progress.finish, Qt.ConnectionType.DirectConnection
+        )
+        # every group adds its pages, `done` counts the pages of all groups
+        self.pullWorker.addProgress.connect(
+            self.progress.addTotal, Qt.ConnectionType.DirectConnection
         )
-        self.pullWorker.setProgress.connect(self.progressBar.setMaximum)
         self.pullWorker.doneThisGroup.connect(self.insertWordToListWidget)
         self.pullWorker.done.connect(self.on_allPullWork_done)
         self.pullWorker.start.emit()
 
+    def resetRemoteWords(self):
+        self.remoteWordsDict = {}
+        self.remoteTermIndex = TermIndex()
+
     @pyqtSlot(list)
     def insertWordToListWidget(self, words: list[SimpleWord]):
         """一个分组获取完毕事件"""
+        newTerms = []
         for word in words:
+            # the same word may come from several groups, dictionaries or files
+            if not self.remoteTermIndex.add(word.term):
+                continue
             self.remoteWordsDict[word.term] = word
-            wordItem = QListWidgetItem(word.term, self.newWordListWidget)
-            wordItem.setData(Qt.ItemDataRole.UserRole, None)
-        self.newWordListWidget.clearSelection()
+            newTerms.append(word.term)
+        self.newWordModel.appendTerms(newTerms)
+        self.newWordListView.clearSelection()
 
     @pyqtSlot()
     def on_allPullWork_done(self):
         """全部分组获取完毕事件"""
-        # termList: [str]
-        localTermList: set[str] = set(getWordsByDeck(self.deckComboBox.currentText()))
-        remoteTermList: set[str] = set()
-        for row in range(self.newWordListWidget.count()):
-            item = self.newWordListWidget.item(row)
-            if item is not None:
-                remoteTermList.add(item.text())
-
-        newTerms: set[str] = utils.set_sub_ignore_case(
-            remoteTermList, localTermList
-        )  # 新单词
-        needToDeleteTerms: set[str] = utils.set_sub_ignore_case(
-            localTermList, remoteTermList
-        )  # 需要删除的单词
-        logger.info(f"本地({len(localTermList)}): {localTermList}")
-        logger.info(f"远程({len(remoteTermList)}): {remoteTermList}")
+        self.progress.end()
+        deckName = self.deckComboBox.currentText()
+
+        def onFailure(err: Exception):
+            logger.error(f"读取本地单词失败: {err}")
+            self.mainTab.setEnabled(True)
+            self.endRun("failed")
+
+        def readLocalWords(_col) -> list[str]:
+            with getRunReport().stage("local words"):
+                return getWordsByDeck(deckName)
+
+        # read local words off the GUI thread, then diff
+        QueryOp(
+            parent=self,
+            op=readLocalWords,
+            success=self.diffRemoteWithLocalWords,
+        ).failure(onFailure).run_in_background()
+
+    def diffRemoteWithLocalWords(self, localWords: list[str]):
+        self.localWords = localWords
+        report = getRunReport()
+        with report.stage("diff"):
+            localTermIndex = TermIndex(localWords)
+            termDiff = self.remoteTermIndex.diff(localTermIndex)
+        newTerms = termDiff.added  # 新单词
+        needToDeleteTerms = termDiff.removed  # 需要删除的单词
+        report.count("new words", len(newTerms))
+        report.count("words to delete", len(needToDeleteTerms))
+        logger.info(f"本地({len(localTermIndex)}): {list(localTermIndex)}")
+        logger.info(f"远程({len(self.remoteTermIndex)}): {list(self.remoteTermIndex)}")
         logger.info(f"待查({len(newTerms)}): {newTerms}")
         logger.info(f"待删({len(needToDeleteTerms)}): {needToDeleteTerms}")
-        waitIcon = QIcon(":/icons/wait.png")
-        delIcon = QIcon(":/icons/delete.png")
-        self.newWordListWidget.clear()
-        self.needDeleteWordListWidget.clear()
-
-        for term in needToDeleteTerms:
-            item = QListWidgetItem(term)
-            # item.setCheckState(Qt.CheckState.Checked)
-            item.setCheckState(
-                Qt.CheckState.Unchecked
-            )  # Defaults to Unchecked (Avoid unintentional data loss)
-            item.setIcon(delIcon)
-            self.needDeleteWordListWidget.addItem(item)
-
-        for term in newTerms:
-            item = QListWidgetItem(term)
-            item.setIcon(waitIcon)
-            self.newWordListWidget.addItem(item)
-        self.newWordListWidget.clearSelection()
+        # words to delete are unchecked by default (avoid unintentional data loss)
+        self.needDeleteWordModel.setTerms(needToDeleteTerms, WordStatus.DELETE)
+        self.newWordModel.setTerms(newTerms, WordStatus.WAITING)
+        self.newWordListView.clearSelection()
 
         self.dictionaryComboBox.setEnabled(True)
         self.apiComboBox.setEnabled(True)
         self.deckComboBox.setEnabled(True)
         self.pullRemoteWordsBtn.setEnabled(True)
-        self.queryBtn.setEnabled(self.newWordListWidget.count() > 0)
+        self.queryBtn.setEnabled(self.newWordModel.count() > 0)
         self.btnSync.setEnabled(
-            self.newWordListWidget.count() == 0
-            and self.needDeleteWordListWidget.count() > 0
+            self.newWordModel.count() == 0 and self.needDeleteWordModel.count() > 0
         )
-        if self.needDeleteWordListWidget.count() == self.newWordListWidget.count() == 0:
+        if self.needDeleteWordModel.count() == self.newWordModel.count() == 0:
             logger.info("无需同步")
             tooltip("无需同步")
+            self.endRun("no changes")
         self.mainTab.setEnabled(True)
         self.logHandler.flush()
 
@@ -823,15 +1057,14 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             return
 
         wordList: list[tuple[SimpleWord, int]] = []  # [(SimpleWord, row)]
-        selectedTerms = self.newWordListWidget.selectedItems()
+        selectedRows = sorted(
+            {index.row() for index in self.newWordListView.selectedIndexes()}
+        )
 
-        if selectedTerms:
+        if selectedRows:
             # 如果选中单词则只查询选中的单词
-            for termItem in selectedTerms:
-                if termItem is None:
-                    continue
-                row = self.newWordListWidget.row(termItem)
-                term_text = termItem.text()
+            for row in selectedRows:
+                term_text = self.newWordModel.terms[row]
 
                 if term_text not in self.remoteWordsDict:
                     logger.warning(
@@ -843,11 +1076,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 if word.term not in self.querySuccessSet:
                     wordList.append((word, row))
         else:  # 没有选择则查询全部
-            for row in range(self.newWordListWidget.count()):
-                termItem = self.newWordListWidget.item(row)
-                if termItem is None:
-                    continue
-                term_text = termItem.text()
+            for row, term_text in enumerate(self.newWordModel.terms):
                 if term_text not in self.remoteWordsDict:
                     logger.warning(
                         f"Term '{term_text}' at row {row} not found in remoteWordsDict; skipping"
@@ -871,20 +1100,31 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             max_workers = 2
             query_delay = 2
 
+        onResult: Optional[Callable[[QueryAPIReturnType], None]] = None
+        if currentConfig.prefetchAudio:
+            # read here: the query threads must not touch the widgets
+            manager = self.getDownloadManager()
+            preferred_pron = self.get_preferred_pronunciation_variant(currentConfig)
+            audioFormat = audio_format(currentConfig)
+
+            def prefetch(word: QueryAPIReturnType):
+                self.prefetchAudio(word, manager, preferred_pron, audioFormat)
+
+            onResult = prefetch
+
         # 查询线程
-        self.progressBar.setMaximum(len(wordList))
+        self.progress.begin("查询", len(wordList))
         self.queryWorker = QueryWorker(
             wordList,
             QUERY_APIS[currentConfig.selectedApi],
             max_workers=max_workers,
             delay=query_delay,
+            onResult=onResult,
         )
         self.queryWorker.moveToThread(self.workerThread)
-        self.queryWorker.thisRowDone.connect(self.on_thisRowDone)
-        self.queryWorker.thisRowFailed.connect(self.on_thisRowFailed)
-        self.queryWorker.tick.connect(
-            lambda: self.progressBar.setValue(self.progressBar.value() + 1)
-        )
+        self.queryWorker.thisRowDone.connect(self.on_newWordQueried)
+        self.queryWorker.thisRowFailed.connect(self.on_newWordFailed)
+        self.connectQueryProgress(self.queryWorker)
         self.queryWorker.allQueryDone.connect(self.on_allQueryDone)
         self.queryWorker.start.connect(self.queryWorker.run)
         self.queryWorker.start.emit()
@@ -899,26 +1139,30 @@ class Windows(QDialog, mainUI.Ui_Dialog):
     def on_thisRowFailed(self, row):
         self.queryFailedDict[row] = True
 
-    doneIcon = QIcon(":/icons/done.png")
-    failedIcon = QIcon(":/icons/failed.png")
-
-    @pyqtSlot()
-    def on_allQueryDone(self):
-        # update icons
-        failed = []
-        for row in range(self.newWordListWidget.count()):
-            wordItem = self.newWordListWidget.item(row)
+    @pyqtSlot(int, QueryAPIReturnType)
+    def on_newWordQueried(self, row, result: QueryAPIReturnType):
+        """该行单词查询完毕 (newWordListView), only this row is repainted"""
+        self.on_thisRowDone(row, result)
+        self.newWordModel.setResults({row: result})
 
-            if wordItem is None:
-                raise Exception("Cannot get wordItem.")
+    @pyqtSlot(int)
+    def on_newWordFailed(self, row):
+        self.on_thisRowFailed(row)
+        self.newWordModel.setFailed([row])
 
-            if row in self.querySuccessDict:
-                wordItem.setIcon(self.doneIcon)
-                wordItem.setData(Qt.ItemDataRole.UserRole, self.querySuccessDict[row])
-            elif row in self.queryFailedDict:
-                wordItem.setIcon(self.failedIcon)
-                failed.append(wordItem.text())
+    def connectQueryProgress(self, worker: QueryWorker):
+        # counted in the worker threads, the aggregator repaints on its own timer
+        direct = Qt.ConnectionType.DirectConnection
+        worker.taskStarted.connect(self.progress.started, direct)
+        worker.thisRowFailed.connect(lambda _row: self.progress.fail(), direct)
+        worker.tick.connect(self.progress.finish, direct)
 
+    @pyqtSlot()
+    def on_allQueryDone(self):
+        self.progress.end()
+        if self.downloadManager is not None:
+            self.downloadManager.queue.save()  # audios prefetched during the query
+        failed = [self.newWordModel.terms[row] for row in self.queryFailedDict]
         if failed:
             logger.warning(f"查询失败或未查询:{failed}")
 
@@ -939,9 +1183,40 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 else PronunciationVariantEnum.UK
             )
 
+    def getDownloadManager(self) -> DownloadManager:
+        """Shared by audio prefetching and sync, so a file is never downloaded twice at once"""
+        if mw.col is None:
+            raise Exception("mw.col is none")
+        mediaDir = mw.col.media.dir()
+        if self.downloadManager is None or self.downloadManager.targetDir != mediaDir:
+            self.downloadManager = DownloadManager(mediaDir)
+        return self.downloadManager
+
+    def prefetchAudio(
+        self,
+        word: QueryAPIReturnType,
+        manager: DownloadManager,
+        preferred_pron: PronunciationVariantEnum,
+        audioFormat: str,
+    ):
+        """
+        Called by `QueryWorker` (in its thread): start downloading the audio of a query result.
+        Reads no widget, the settings are passed in from the GUI thread.
+        """
+        _, audio_task, _, _ = self.get_asset_download_task(
+            word, preferred_pron, audioFormat
+        )
+        if audio_task is not None:
+            filename, url = audio_task
+            manager.submit(filename, url, self.prefetchStopped.is_set)
+
     def get_asset_download_task(
-        self, word: QueryAPIReturnType, preferred_pron: PronunciationVariantEnum
+        self,
+        word: QueryAPIReturnType,
+        preferred_pron: PronunciationVariantEnum,
+        audioFormat: Optional[str] = None,
     ):
+        """:param audioFormat: defaults to the format of the current config"""
         image_task = None
         term = word.term
         # if word["image"]:
@@ -965,7 +1240,11 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 f"Pronunciation: {preferred_pron.name} is missing for word {term}. Downloading {pron_type.name} instead."
             )
 
-        pronFilename = utils.default_audio_filename(term=term, format="wav")
+        pronFilename = utils.audio_filename(
+            term,
+            word.context_audio_url or word.term_audio_url,
+            format=audioFormat or audio_format(self.currentConfig),
+        )
         logger.info(f"Audio file for: ${term}: ${pronFilename}")
         if word.context_audio_url:
             audio_task = (
@@ -983,12 +1262,7 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         logger.info("Sync button clicked")
         logger.info("Check query results")
         self.logHandler.flush()
-        failedGenerator = (
-            (item := self.newWordListWidget.item(row)) is None
-            or item.data(Qt.ItemDataRole.UserRole) is None
-            for row in range(self.newWordListWidget.count())
-        )
-        if any(failedGenerator):
+        if self.newWordModel.hasUnfinished():
             if not askUser(
                 '存在未查询或失败的单词，确定要加入单词本吗？\n 你可以选择失败的单词点击 "查询按钮" 来重试。'
             ):
@@ -1045,9 +1319,6 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             # create 'Backwards' card template (card type)
             # getOrCreateBackwardsCardTemplate(model)
 
-            # we need to ensure the fonts and js file are loaded into `collection.media`
-            loadAssetsIntoCollectionMedia()
-
         else:
             logger.info("Found existing model.")
             if currentConfig.syncTemplates:
@@ -1068,12 +1339,15 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         # else:                   # existing model, and fields have not been updated/merged
         #     pass
 
+        # we need to ensure the fonts and js file are loaded into `collection.media`,
+        # only new or changed assets are copied
+        loadAssetsIntoCollectionMedia()
+
         # create deck
         deck = getOrCreateDeck(self.deckComboBox.currentText(), model=model)
 
         imagesDownloadTasks = []
         audiosDownloadTasks: list[tuple[str, str]] = []
-        newWordCount = self.newWordListWidget.count()
 
         # 判断是否需要下载发音
         preferred_pron = self.get_preferred_pronunciation_variant(currentConfig)
@@ -1085,14 +1359,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             )  # print enum name
 
         self.added = 0
-        for row in range(newWordCount):
-            wordItem = self.newWordListWidget.item(row)
-
-            if wordItem is None:
-                raise Exception("Cannot get wordItem")
-
-            wordItemData: QueryAPIReturnType = wordItem.data(Qt.ItemDataRole.UserRole)
-
+        pendingNotes: list[tuple[QueryAPIReturnType, PronunciationVariantEnum]] = []
+        for wordItemData in self.newWordModel.results:
             if wordItemData:
                 term = wordItemData.term
                 logger.debug(f"wordItemData ({term}): {wordItemData}")
@@ -1105,35 +1373,64 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 if audio_task:
                     logger.info(f"添加Audio Task: {audio_task}")
                     audiosDownloadTasks.append(audio_task)
+                pendingNotes.append((wordItemData, pron_type))
 
-                # add note
-                addNoteToDeck(
-                    deck=deck,
-                    model=model,
-                    config=currentConfig,
-                    word=wordItemData,
-                    pronunciationVariant=pron_type,
-                    existing_note=None,
-                    overwrite=False,
+        def onProgress(added: int, total: int):
+            mw.taskman.run_on_main(
+                lambda: mw.progress.update(
+                    label=f"添加笔记 {added}/{total}", value=added, max=total
                 )
-                self.added += 1
-        mw.reset()
+            )
+
+        def onNotesAdded(_changes):
+            self.added = len(pendingNotes)
+            mw.reset()
+            self.afterNotesAdded(
+                currentConfig, imagesDownloadTasks, audiosDownloadTasks
+            )
+
+        def addNotes(col):
+            # build all notes up front, then write them in chunks
+            with getRunReport().stage("note build"):
+                noteRequests = [
+                    buildAddNoteRequest(deck, model, currentConfig, word, pron_type)
+                    for word, pron_type in pendingNotes
+                ]
+            return addNotesInBulk(col, noteRequests, onProgress=onProgress)
+
+        self.btnSync.setEnabled(False)
+        CollectionOp(parent=self, op=addNotes).success(onNotesAdded).failure(
+            self.onSyncFailed
+        ).run_in_background()
+
+    def onSyncFailed(self, err: Exception):
+        logger.error(f"同步失败: {err}")
+        showCritical(title="Apora Dict2Anki", text=f"同步失败: {err}")
+        self.btnSync.setEnabled(True)
+        self.endRun("failed")
+
+    def afterNotesAdded(
+        self,
+        currentConfig: ConfigType,
+        imagesDownloadTasks: list,
+        audiosDownloadTasks: list[tuple[str, str]],
+    ):
+        """Download assets and delete stale words once new notes are written"""
+        self.btnSync.setEnabled(True)
+        hasDownloads = bool(imagesDownloadTasks or audiosDownloadTasks)
+        # the sync is reported once both the deletion and the downloads are done, in any order
+        self.syncStepsPending = 2 if hasDownloads else 1
 
         # download assets
-        if len(imagesDownloadTasks) > 0 or len(audiosDownloadTasks) > 0:
+        if hasDownloads:
             self.btnSync.setEnabled(False)
             self.downloadAssets(
                 imagesDownloadTasks, audiosDownloadTasks, self.on_assetsDownloadDone
             )
 
-        self.newWordListWidget.clear()
+        self.newWordModel.clear()
 
-        needToDeleteWordItems = []
-        for row in range(self.needDeleteWordListWidget.count()):
-            item = self.needDeleteWordListWidget.item(row)
-            if item is not None and item.checkState() == Qt.CheckState.Checked:
-                needToDeleteWordItems.append(item)
-        needToDeleteWords = [i.text() for i in needToDeleteWordItems]
+        needToDeleteWords = self.needDeleteWordModel.checkedTerms()
 
         self.deleted = 0
 
@@ -1143,31 +1440,66 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             parent=self,
         ):
             logger.info(f"需要删除({len(needToDeleteWords)}) - {needToDeleteWords}")
-            needToDeleteWordNoteIds = getNoteIDsOfWords(
-                needToDeleteWords, currentConfig.deck
-            )
-
-            if mw.col is None:
-                raise Exception("mw.col is none")
-
-            mw.col.remNotes(needToDeleteWordNoteIds)
-            self.deleted += len(needToDeleteWordNoteIds)
-            mw.col.reset()
-            mw.reset()
-            for item in needToDeleteWordItems:
-                self.needDeleteWordListWidget.takeItem(
-                    self.needDeleteWordListWidget.row(item)
-                )
-            logger.info(f"实际删除({self.deleted})")
+            deckName = currentConfig.deck
+
+            def onDeleted(out: OpChangesWithCount):
+                self.deleted += out.count
+                getRunReport().count("notes deleted", out.count)
+                self.needDeleteWordModel.removeTerms(needToDeleteWords)
+                logger.info(f"实际删除({self.deleted})")
+                self.syncStepDone()
+
+            def onDeleteFailed(err: Exception):
+                logger.error(f"删除失败: {err}")
+                self.syncStepDone()
+
+            # resolve every word from one term -> note id map, and remove them as a single undo step
+            CollectionOp(
+                parent=self,
+                op=lambda col: col.remove_notes(
+                    getNoteIDsOfWords(needToDeleteWords, deckName)
+                ),
+            ).success(onDeleted).failure(onDeleteFailed).run_in_background()
+        else:
+            self.syncStepDone()
         logger.info("完成")
         tooltip(f"成功添加{self.added}张笔记")
+        self.logHandler.flush()
 
-        if not (imagesDownloadTasks or audiosDownloadTasks):
+    def syncStepDone(self):
+        """One of the steps started by `afterNotesAdded` is done, report the sync after the last"""
+        self.syncStepsPending -= 1
+        if self.syncStepsPending <= 0:
             self.printSyncReport()
         self.logHandler.flush()
 
     def printSyncReport(self):
         logger.info(f"Added: {self.added}, Deleted: {self.deleted}")
+        self.endRun("completed")
+
+    def beginRun(self, name: str):
+        """Start timing a run, ended by `endRun` once synced (or when there is nothing to sync)"""
+        self.logHandler.flush()
+        self.runLogStart = len(self.logTextBox.toPlainText().splitlines())
+        startRunReport(name)
+
+    def endRun(self, status: str):
+        """Log the timings of the current run, show them under the progress bar and export them"""
+        report = getRunReport()
+        if report.finished:
+            return
+        report.finish(status)
+        for line in report.formatLines():
+            logger.info(line)
+        self.logHandler.flush()
+        self.progressStatusLabel.setText(report.formatShort())
+        log = "\n".join(self.logTextBox.toPlainText().splitlines()[self.runLogStart :])
+        try:
+            path = report.export(USER_FILES_DIR.joinpath(RUN_REPORT_DIRNAME), log)
+            logger.info(f"运行报告已导出: {path}")
+        except OSError as e:
+            logger.warning(f"导出运行报告失败: {e}")
+        self.logHandler.flush()
 
     def downloadAssets(
         self,
@@ -1175,6 +1507,19 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         audiosDownloadTasks: list[tuple[str, str]],
         done_func: Callable,
     ):
+        if mw.col is None:
+            raise Exception("mw.col is none")
+        # words sharing an audio share its filename, download it once.
+        # downloads left over from previous sessions are resumed as well
+        imagesDownloadTasks = list(dict.fromkeys(imagesDownloadTasks))
+        audiosDownloadTasks = list(
+            dict.fromkeys(
+                audiosDownloadTasks
+                + DownloadQueue().pending(
+                    mw.col.media.dir(), self.currentConfig.aporaApiToken
+                )
+            )
+        )
         logger.info(
             f"Image download tasks({len(imagesDownloadTasks)}): {imagesDownloadTasks}"
         )
@@ -1182,9 +1527,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             f"Audio download tasks({len(audiosDownloadTasks)}): {audiosDownloadTasks}"
         )
         if imagesDownloadTasks or audiosDownloadTasks:
-            self.progressBar.setValue(0)
-            self.progressBar.setMaximum(
-                len(imagesDownloadTasks) + len(audiosDownloadTasks)
+            self.progress.begin(
+                "下载", len(imagesDownloadTasks) + len(audiosDownloadTasks)
             )
             if self.assetDownloadThread is not None:
                 self.assetDownloadThread.requestInterruption()
@@ -1194,16 +1538,17 @@ class Windows(QDialog, mainUI.Ui_Dialog):
             self.assetDownloadThread = QThread(self)
             self.assetDownloadThread.start()
 
-            if mw.col is None:
-                raise Exception("mw.col is none")
-
             self.assetDownloadWorker = AssetDownloadWorker(
-                mw.col.media.dir(), imagesDownloadTasks, audiosDownloadTasks
+                mw.col.media.dir(),
+                imagesDownloadTasks,
+                audiosDownloadTasks,
+                manager=self.getDownloadManager(),
             )
             self.assetDownloadWorker.moveToThread(self.assetDownloadThread)
-            self.assetDownloadWorker.tick.connect(
-                lambda: self.progressBar.setValue(self.progressBar.value() + 1)
-            )
+            direct = Qt.ConnectionType.DirectConnection
+            self.assetDownloadWorker.taskStarted.connect(self.progress.started, direct)
+            self.assetDownloadWorker.tick.connect(self.progress.finish, direct)
+            self.assetDownloadWorker.failed.connect(self.progress.finishFailed, direct)
             self.assetDownloadWorker.start.connect(self.assetDownloadWorker.run)
             self.assetDownloadWorker.done.connect(done_func)
             self.assetDownloadWorker.start.emit()
@@ -1211,18 +1556,20 @@ class Windows(QDialog, mainUI.Ui_Dialog):
     # =================================== Utilities =================================== #
     @pyqtSlot()
     def on_assetsDownloadDone(self):
+        self.progress.end()
         self.assetDownloadThread.quit()
         tooltip("图片音频下载完成")
         logger.info("图片音频下载完成")
-        self.printSyncReport()
-        self.logHandler.flush()
+        self.syncStepDone()
 
     def queryWords(
         self,
         wordList: list[tuple[SimpleWord, int]],
         dictAPI: type[AbstractQueryAPI],
         all_done_func: Callable[[], None],
+        connect: Optional[Callable[[QueryWorker], None]] = None,
     ):
+        """:param connect: connects more signals of the worker, before it starts"""
         # self.progressBar.setMaximum(len(wordList))
         self.queryWorker = QueryWorker(wordList, dictAPI)
         self.queryWorker.moveToThread(self.workerThread)
@@ -1230,6 +1577,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.queryWorker.thisRowFailed.connect(self.on_thisRowFailed)
         # self.queryWorker.tick.connect(lambda: self.progressBar.setValue(self.progressBar.value() + 1))
         self.queryWorker.allQueryDone.connect(all_done_func)
+        if connect is not None:
+            connect(self.queryWorker)
         self.queryWorker.start.connect(self.queryWorker.run)
         self.queryWorker.start.emit()
 
@@ -1238,29 +1587,28 @@ class Windows(QDialog, mainUI.Ui_Dialog):
 
     @pyqtSlot()
     def on_btnDownloadMissingAssets_clicked(self):
-        """Download missing assets for all notes of type Dict2Anki in ALL decks"""
+        """Download missing assets for Apora notes (both note types) in ALL decks"""
         self.tmp_currentConfig = self.getAndSaveCurrentConfig()
 
         if mw.col is None:
             raise Exception("mw.col is none")
 
-        noteIds = mw.col.find_notes(f"note:{MODEL_NAME}")
-        logger.info(f"Found ({len(noteIds)}) notes of type '{MODEL_NAME}'")
-        self.logHandler.flush()
+        mediaDir = mw.col.media.dir()
+        QueryOp(
+            parent=self,
+            op=lambda _col: findNotesWithMissingMedia(mediaDir),
+            success=self.__on_missingAssetsScanned,
+        ).with_progress("Scanning media...").run_in_background()
+
+    def __on_missingAssetsScanned(self, missing: list[tuple[int, str, list[str]]]):
+        """for btnDownloadMissingAssets"""
+        if self.tmp_currentConfig is None:
+            raise Exception("tmp_currentConfig is None")
 
         # find words that have missing assets
         wordList: list[tuple[SimpleWord, int]] = []  # [(SimpleWord, row)]
-        for noteId in noteIds:
-            note = mw.col.get_note(noteId)
-            term = note["term"]
-            media_dir = mw.col.media.dir()
-            # logger.info(f"Checking term {term}")
-            if utils.is_image_file_missing(
-                note["image"], media_dir
-            ) or utils.is_audio_file_missing(note["pronunciation"], media_dir):
-                # logger.warning(f"image or audio file is missing for [{term}]")
-                word, row = SimpleWord(term), len(wordList)
-                wordList.append((word, row))
+        for term in TermIndex(term for _, term, _ in missing):
+            wordList.append((SimpleWord(term), len(wordList)))
         terms = [w.term for w, r in wordList]
         if not terms:
             logger.info("[All clear] Nothing to do.")
@@ -1337,110 +1685,223 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         logger.info("Download complete!")
         self.logHandler.flush()
 
-    tmp_noteDict: dict = {}  # term -> Note
+    tmp_noteDict: dict[str, list[int]] = {}  # term -> note ids
+    """for FillMissingValues only"""
+    tmp_termQueue: list[str] = []
+    """for FillMissingValues only: terms left to query, consumed chunk by chunk"""
+    tmp_fillStats: dict[str, int] = {}
     """for FillMissingValues only"""
 
     @pyqtSlot()
     def on_btnFillMissingValues_clicked(self):
-        """Fill missing field values for all notes of type Dict2Anki in ALL decks.
-        This function may take some time."""
+        """Fill missing field values for Apora notes (both note types) in ALL decks.
+        Only notes with an empty enabled field are queried."""
         self.tmp_noteDict = {}
+        self.tmp_termQueue = []
         self.tmp_currentConfig = self.getAndSaveCurrentConfig()
-        if mw.col is None:
-            raise Exception("mw.col is none")
-        noteIds = mw.col.find_notes(f"note:{MODEL_NAME}")
-        logger.info(f"Found ({len(noteIds)}) notes of type '{MODEL_NAME}'")
+        preferred_pron = self.get_preferred_pronunciation_variant(
+            self.tmp_currentConfig
+        )
+        fieldNames = getEnabledFieldNames(
+            self.tmp_currentConfig, preferred_pron != PronunciationVariantEnum.NONE
+        )
+        logger.info(f"Scanning notes for empty fields: {fieldNames}")
         self.logHandler.flush()
 
+        QueryOp(
+            parent=self,
+            op=lambda _col: findNotesWithMissingFields(fieldNames),
+            success=lambda gaps: self.__on_missingValuesScanned(gaps, fieldNames),
+        ).with_progress("Scanning notes...").run_in_background()
+
+    def __on_missingValuesScanned(
+        self, gaps: list[tuple[int, str]], fieldNames: list[str]
+    ):
+        """for btnFillMissingValues"""
+        if not gaps:
+            logger.info("[All clear] No empty fields.")
+            self.logHandler.flush()
+            tooltip("Nothing to do.")
+            return
+
+        noteIdsByTerm: dict[str, list[int]] = {}
+        for nid, term in gaps:
+            noteIdsByTerm.setdefault(term, []).append(nid)
+        if self.tmp_currentConfig is None:
+            raise Exception("tmp_currentConfig is None")
+        api = QUERY_APIS[self.tmp_currentConfig.selectedApi]
+
+        logger.info(
+            f"{len(gaps)} notes have empty fields, {len(noteIdsByTerm)} terms to query"
+        )
+        self.logHandler.flush()
         if not askUser(
-            f"This operation will take some time to fill missing field values for notes of type '{MODEL_NAME}' ({len(noteIds)}). Continue?",
+            f"{len(gaps)} notes have empty fields ({', '.join(fieldNames)}).\n"
+            f"This will send {len(noteIdsByTerm)} queries to '{api.name}'. Continue?",
             defaultno=True,
         ):
             logger.info("Aborted")
             self.logHandler.flush()
             return
 
-        # load all notes, and generate word list, as well as note dict
-        wordList: list[tuple[SimpleWord, int]] = []  # [(SimpleWord, row)]
-        for noteId in noteIds:
-            note = mw.col.get_note(noteId)
-            term = note["term"]
-            self.tmp_noteDict[term] = note
-            word, row = SimpleWord(term), len(wordList)
-            wordList.append((word, row))
-
-        if not wordList:
-            logger.info("No words.")
+        self.tmp_noteDict = noteIdsByTerm
+        self.tmp_termQueue = list(noteIdsByTerm)
+        self.tmp_fillStats = {"queried": 0, "failed": 0, "updated": 0}
+        self.progress.begin("补全", len(self.tmp_termQueue))
+        self.__queryNextChunk_FillMissingValues()
+
+    def __queryNextChunk_FillMissingValues(self):
+        """for btnFillMissingValues: query and save one bounded chunk at a time"""
+        chunk = self.tmp_termQueue[:FILL_MISSING_VALUES_CHUNK_SIZE]
+        del self.tmp_termQueue[:FILL_MISSING_VALUES_CHUNK_SIZE]
+        if not chunk:
+            stats = self.tmp_fillStats
+            logger.info(
+                f"Done! Queried: {stats['queried']}, Failed: {stats['failed']}, Updated notes: {stats['updated']}"
+            )
+            self.tmp_noteDict = {}
+            self.progress.end()
             self.logHandler.flush()
-            tooltip("No words.")
+            tooltip(f"Updated {stats['updated']} notes.")
             return
 
-        # query words
+        if self.tmp_currentConfig is None:
+            raise Exception("tmp_currentConfig is None")
         self.querySuccessDict = {}
         self.queryFailedDict = {}
+
+        def connect(worker: QueryWorker):
+            self.connectQueryProgress(worker)
+            # no point in spending more queries
+            worker.insufficientBalance.connect(self.tmp_termQueue.clear)
+
         self.queryWords(
-            wordList,
+            [(SimpleWord(term), row) for row, term in enumerate(chunk)],
             QUERY_APIS[self.tmp_currentConfig.selectedApi],
             self.__on_allQueryDone_FillMissingValues,
+            connect,
         )
 
     @pyqtSlot()
     def __on_allQueryDone_FillMissingValues(self):
         """for btnFillMissingValues"""
         logger.info(
-            f"[Query complete] Success: {len(self.querySuccessDict)}, Failed: {len(self.queryFailedDict)}"
+            f"[Query chunk complete] Success: {len(self.querySuccessDict)}, Failed: {len(self.queryFailedDict)}"
         )
-        self.logHandler.flush()
+        self.tmp_fillStats["queried"] += len(self.querySuccessDict)
+        self.tmp_fillStats["failed"] += len(self.queryFailedDict)
         if self.queryFailedDict:
             logger.warning(f"{len(self.queryFailedDict)} words query failed.")
-            if not askUser(
-                f"{len(self.queryFailedDict)} words query failed. Continue anyway?"
-            ):
-                logger.info("Aborted")
-                self.logHandler.flush()
-                return
-        # update notes (fill missing field values)
-        logger.info("------------------------------------------")
-        logger.info(
-            "Iterate over query results: update notes (fill missing field values)"
-        )
         self.logHandler.flush()
         preferred_pron = self.get_preferred_pronunciation_variant(
             self.tmp_currentConfig
         )
-        if preferred_pron == PronunciationVariantEnum.NONE:
-            logger.info("不下载发音")
-        else:
-            logger.info(f"Preferred Pronunciation: {preferred_pron}")
+        if self.tmp_currentConfig is None:
+            raise Exception("tmp_currentConfig is None")
+        config = self.tmp_currentConfig
 
-        self.logHandler.flush()
+        # resolve image and audio information (for use in field values)
+        pendingUpdates = []
         for row, word in self.querySuccessDict.items():
-            term = word.term
-            logger.debug(f"word ({term}): {word}")
-            # resolve image and audio information (for use in field values)
-            image_task, audio_task, pron_type, is_fallback = (
-                self.get_asset_download_task(word, preferred_pron)
+            logger.debug(f"word ({word.term}): {word}")
+            _, _, pron_type, _ = self.get_asset_download_task(word, preferred_pron)
+            for nid in self.tmp_noteDict.pop(word.term, []):
+                pendingUpdates.append((nid, word, pron_type))
+
+        def fillAndSave(col):
+            # notes are only loaded for the current chunk, and only changed ones are written
+            changedNotes = []
+            for nid, word, pron_type in pendingUpdates:
+                note = col.get_note(nid)
+                if fillNoteFields(note, config, word, pron_type, False, False):
+                    changedNotes.append(note)
+            logger.info(
+                f"{len(changedNotes)}/{len(pendingUpdates)} notes have new values"
+            )
+            return updateNotesInBulk(col, changedNotes)
+
+        def onSaved(out: OpChangesWithCount):
+            self.tmp_fillStats["updated"] += out.count
+            self.logHandler.flush()
+            self.__queryNextChunk_FillMissingValues()
+
+        CollectionOp(parent=self, op=fillAndSave).success(onSaved).run_in_background()
+
+    def on_btnCompressAudio_clicked(self):
+        if mw.col is None:
+            raise Exception("mw.col is none")
+        if find_ffmpeg() is None:
+            showInfo("ffmpeg is required to compress audio, please install it first.")
+            return
+
+        mediaDir = mw.col.media.dir()
+        QueryOp(
+            parent=self,
+            op=lambda _col: findSoundReferences(mediaDir, DOWNLOADED_AUDIO_FORMAT),
+            success=lambda references: self.__on_uncompressedAudioScanned(
+                mediaDir, references
+            ),
+        ).with_progress("Scanning media...").run_in_background()
+
+    def __on_uncompressedAudioScanned(
+        self, mediaDir: str, references: dict[str, list[int]]
+    ):
+        """for btnCompressAudio"""
+        if not references:
+            logger.info("[All clear] No audio to compress.")
+            self.logHandler.flush()
+            tooltip("Nothing to do.")
+            return
+        if not askUser(
+            f"{len(references)} audio files can be compressed. Convert them now?"
+        ):
+            logger.info("Aborted")
+            self.logHandler.flush()
+            return
+
+        filenames = list(references)
+        total = len(filenames)
+
+        def onProgress(done: int):
+            mw.taskman.run_on_main(
+                lambda: mw.progress.update(
+                    label=f"Compressing audio {done}/{total}...", value=done, max=total
+                )
             )
-            # update note (fill missing field values)
-            existing_note = self.tmp_noteDict[term]
-            # Ensure tmp_currentConfig is not None before passing to addNoteToDeck
-            if self.tmp_currentConfig is None:
-                raise Exception("tmp_currentConfig is None")
-
-            # Downloading missing assets don't need model and deck
-            addNoteToDeck(
-                deck=None,
-                model=None,
-                config=self.tmp_currentConfig,
-                word=word,
-                pronunciationVariant=pron_type,
-                existing_note=existing_note,
-                overwrite=False,
+
+        QueryOp(
+            parent=self,
+            op=lambda _col: compress_files(mediaDir, filenames, onProgress),
+            success=lambda renamed: self.__on_audioCompressed(references, renamed),
+        ).with_progress("Compressing audio...").run_in_background()
+
+    def __on_audioCompressed(
+        self, references: dict[str, list[int]], renamed: dict[str, str]
+    ):
+        """for btnCompressAudio"""
+        failed = len(references) - len(renamed)
+        noteIds = sorted({nid for old in renamed for nid in references[old]})
+        unreferenced: list[str] = []
+
+        def replaceReferences(col):
+            out = replaceSoundReferences(col, noteIds, renamed)
+            # other notes (or fields) may still use a WAV file, Check Media cleans it up later
+            unreferenced.extend(findUnreferencedSounds(col, list(renamed)))
+            return out
+
+        def onSaved(out: OpChangesWithCount):
+            if mw.col is not None and unreferenced:
+                mw.col.media.trash_files(unreferenced)
+            logger.info(
+                f"Compressed {len(renamed)} audio files, failed {failed}, updated {out.count} notes,"
+                f" {len(renamed) - len(unreferenced)} WAV files still referenced are kept"
             )
-        mw.reset()
-        self.logHandler.flush()
-        logger.info("Done!")
-        self.logHandler.flush()
+            self.logHandler.flush()
+            tooltip(f"Compressed {len(renamed)} audio files")
+
+        CollectionOp(parent=self, op=replaceReferences).success(
+            onSaved
+        ).run_in_background()
 
     @pyqtSlot()
     def on_btnExportAudio_clicked(self):
@@ -0,0 +1,108 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional
+
+from .misc import ConfigType
+
+logger = logging.getLogger("Apora dict2Anki.audioCompressor")
+
+DOWNLOADED_AUDIO_FORMAT = "wav"  # format served by Apora TTS
+COMPRESSED_AUDIO_FORMAT = "ogg"
+# mono 22 kHz Opus is plenty for speech, about 1/10 of the WAV size
+FFMPEG_OPTIONS = ["-ac", "1", "-ar", "22050", "-c:a", "libopus", "-b:a", "24k"]
+
+
+@lru_cache(maxsize=1)
+def find_ffmpeg() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def audio_format(config: ConfigType) -> str:
+    """Format of the audio files notes reference, decided before anything is downloaded"""
+    if config.compressAudio and find_ffmpeg():
+        return COMPRESSED_AUDIO_FORMAT
+    return DOWNLOADED_AUDIO_FORMAT
+
+
+def needs_transcoding(filename: str) -> bool:
+    return filename.lower().endswith(f".{COMPRESSED_AUDIO_FORMAT}")
+
+
+def compressed_filename(filename: str) -> str:
+    return f"{os.path.splitext(filename)[0]}.{COMPRESSED_AUDIO_FORMAT}"
+
+
+def transcode(source: str, target: str) -> bool:
+    """Transcode `source` into `target` (written atomically). :return: success"""
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        logger.warning("ffmpeg is not available, cannot compress audio")
+        return False
+    tmpTarget = f"{target}.tmp.{COMPRESSED_AUDIO_FORMAT}"
+    try:
+        subprocess.run(
+            [
+                ffmpeg,
+                "-y",
+                "-loglevel",
+                "error",
+                "-i",
+                source,
+                *FFMPEG_OPTIONS,
+                tmpTarget,
+            ],
+            check=True,
+            capture_output=True,
+            timeout=120,
+            # no console window popping up on Windows
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            if sys.platform == "win32"
+            else 0,
+        )
+        os.replace(tmpTarget, target)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        logger.error(
+            f"Failed to compress {source}: {e} {stderr.decode(errors='ignore')}"
+        )
+        if os.path.exists(tmpTarget):
+            os.remove(tmpTarget)
+        return False
+
+
+def compress_files(
+    mediaDir: str,
+    filenames: list[str],
+    onProgress: Optional[Callable[[int], None]] = None,
+    max_workers: Optional[int] = None,
+) -> dict[str, str]:
+    """
+    Compress existing media files. Every ffmpeg runs in its own process, threads only wait for them.
+    :return: {old filename: compressed filename} of the files converted successfully
+    """
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+
+    def _compress(filename: str) -> Optional[str]:
+        target = compressed_filename(filename)
+        if os.path.exists(os.path.join(mediaDir, target)) or transcode(
+            os.path.join(mediaDir, filename), os.path.join(mediaDir, target)
+        ):
+            return target
+        return None
+
+    result = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i, (filename, target) in enumerate(
+            zip(filenames, executor.map(_compress, filenames))
+        ):
+            if target is not None:
+                result[filename] = target
+            if onProgress is not None:
+                onProgress(i + 1)
+    return result
@@ -0,0 +1,128 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+from aqt import gui_hooks, mw
+from aqt.qt import QTimer
+
+from .constants import CONFIG_WRITE_DELAY
+from .misc import ConfigType, safe_convert_config_to_dict, safe_load_config
+
+logger = logging.getLogger("Apora dict2Anki.configService")
+
+# (new config, old config)
+ConfigSubscriber = Callable[[ConfigType, ConfigType], None]
+
+
+class ConfigService:
+    """
+    One typed snapshot of the add-on config.
+
+    - reading `snapshot` is an attribute access, from any thread. The snapshot is replaced,
+      never mutated, so do not mutate it either
+    - `update` publishes a new snapshot to the subscribers, and writes it back to Anki once
+      the updates stop for `CONFIG_WRITE_DELAY` ms
+    """
+
+    def __init__(self, module: str = __name__):
+        self.module = module
+        self._lock = threading.Lock()
+        self._subscribers: list[ConfigSubscriber] = []
+        self._timer: Optional[QTimer] = None
+        self._dirty = False
+        self.snapshot = self._read()
+
+    def _read(self) -> ConfigType:
+        untypedConfig = mw.addonManager.getConfig(self.module)
+        if untypedConfig is None:
+            raise Exception("Cannot load Apora dict2anki config.")
+        return safe_load_config(untypedConfig)
+
+    def subscribe(self, subscriber: ConfigSubscriber):
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: ConfigSubscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def update(self, config: ConfigType, write: bool = True) -> bool:
+        """
+        Replace the snapshot with (a copy of) `config`.
+        :return: whether it differs from the current snapshot
+        """
+        # round trip through the stored form: enums and nested lists are normalized and copied,
+        # so the snapshot compares equal to what a reload gives and shares nothing with `config`
+        config = safe_load_config(safe_convert_config_to_dict(config))
+        with self._lock:
+            old = self.snapshot
+            if config == old:
+                return False
+            self.snapshot = config
+            self._dirty |= write
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber(config, old)
+            except Exception as e:
+                logger.exception(f"Config subscriber failed: {e}")
+        if write:
+            mw.taskman.run_on_main(self._scheduleWrite)
+        return True
+
+    def reload(self, untypedConfig: Optional[dict] = None):
+        """The config was changed outside the add-on, e.g. in Anki's config editor"""
+        config = (
+            safe_load_config(untypedConfig)
+            if untypedConfig is not None
+            else self._read()
+        )
+        self.update(config, write=False)
+
+    def _scheduleWrite(self):
+        # every update restarts the timer, a burst of updates is written once
+        if self._timer is None:
+            self._timer = QTimer()
+            self._timer.setSingleShot(True)
+            self._timer.setInterval(CONFIG_WRITE_DELAY)
+            self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def flush(self):
+        """Write the snapshot now if it has unsaved changes. Main thread only."""
+        if self._timer is not None:
+            self._timer.stop()
+        with self._lock:
+            if not self._dirty:
+                return
+            config = self.snapshot
+            self._dirty = False
+        mw.addonManager.writeConfig(self.module, safe_convert_config_to_dict(config))
+        logger.debug("Config written")
+
+
+_configService: Optional[ConfigService] = None
+
+
+def getConfigService() -> ConfigService:
+    global _configService
+    if _configService is None:
+        _configService = ConfigService()
+    return _configService
+
+
+def flushConfig():
+    if _configService is not None:
+        _configService.flush()
+
+
+def _onConfigUpdated(untypedConfig: dict):
+    if _configService is not None:
+        _configService.reload(untypedConfig)
+
+
+def registerConfigServiceHooks():
+    """Pick up edits from Anki's config editor, write pending changes on exit. Call once."""
+    mw.addonManager.setConfigUpdatedAction(__name__, _onConfigUpdated)
+    gui_hooks.profile_will_close.append(flushConfig)
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 VERSION = "v1.0.8"
 RELEASE_URL = "https://github.com/0x0501/Apora-Dict2Anki"
 WINDOW_TITLE = f"Apora Dict2Anki {VERSION}"
@@ -9,6 +11,35 @@ HEADERS = {"User-Agent": USER_AGENT}
 
 LOG_BUFFER_CAPACITY = 20  # number of log items
 LOG_FLUSH_INTERVAL = 3  # seconds
+CONFIG_WRITE_DELAY = 500  # ms without config updates before the config is written
+
+PROGRESS_FPS = 10  # progress bar/status repaints per second
+PROGRESS_RATE_WINDOW = 10  # seconds of history used for the items/sec rate and ETA
+
+NOTE_WRITE_CHUNK_SIZE = 500  # notes written per collection transaction
+NOTE_SCAN_BATCH_SIZE = 2000  # note rows read per query when scanning the collection
+FILL_MISSING_VALUES_CHUNK_SIZE = 200  # terms queried (and notes updated) per round
+IMPORT_BATCH_SIZE = 1000  # words handed over to the GUI at once when importing files
+IMPORT_QUEUE_SIZE = 8  # batches parsed ahead of the consumer, bounds the import memory
+IMPORT_MAX_WORKERS = 4  # files parsed concurrently
+
+# Anki keeps `user_files` of an add-on across upgrades
+USER_FILES_DIR = Path(__file__).absolute().parent.parent.joinpath("user_files")
+WORDBOOK_SNAPSHOT_FILENAME = "wordbook_snapshot.json"
+NOTE_INDEX_DIRNAME = "note_index"  # one index file per collection
+MEDIA_STORE_DIRNAME = "media_store"  # one index file per media folder
+ASSET_MANIFEST_FILENAME = "assets_manifest.json"
+DOWNLOAD_QUEUE_FILENAME = "download_queue.json"
+DOWNLOAD_PARTIAL_DIRNAME = "downloads"  # files still being downloaded
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # bytes written per chunk
+DOWNLOAD_PER_HOST_LIMIT = 4  # concurrent requests per host
+# name: `fileNameTag.wav` of a query result
+APORA_AUDIO_URL = "https://apora.sumku.cc/api/audio/{token}/{name}"
+RUN_REPORT_DIRNAME = "reports"  # timings (json) and log of every sync run
+RUN_REPORT_KEEP = 30  # most recent run reports kept
+
+# key of the card templates/CSS content hash stored on the Apora note types
+MODEL_TEMPLATE_HASH_KEY = "aporaTemplateHash"
 
 # continue to use Dict2Anki 4.x model
 ASSET_FILENAME_PREFIX = "APORA"
@@ -54,6 +85,10 @@ class FieldGroup:
         else:
             setattr(self, field, "")
 
+    def key(self) -> tuple[str, str, str]:
+        """Identifies the rendered card templates, see `noteManager.renderCardTemplates`"""
+        return (self.definition_cn, self.pronunciation, self.context)
+
     def toString(self) -> str:
         return f"definition_cn={self.definition_cn}, pronunciation={self.pronunciation}, context={self.context}"
 
@@ -1,9 +1,15 @@
+import hashlib
+import sys
 from abc import ABC, abstractmethod
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Optional
 from ..misc import CredentialPlatformEnum
 
 
 class SimpleWord(ABC):
+    # no per-instance `__dict__`, large wordbooks hold hundreds of thousands of words
+    __slots__ = ("term", "trans", "modifiedTime", "bookId", "bookName")
+
     @classmethod
     def from_values(cls, values: list[str]):
         n = len(values)
@@ -37,7 +43,25 @@ class SimpleWord(ABC):
         self.trans = trans
         self.modifiedTime = modifiedTime
         self.bookId = bookId
-        self.bookName = bookName
+        # every word of a wordbook repeats its name, share one string
+        self.bookName = sys.intern(bookName) if isinstance(bookName, str) else bookName
+
+    def __reduce__(self):
+        # pickled as a plain tuple of values, without the attribute names
+        return (
+            SimpleWord,
+            (self.term, self.trans, self.modifiedTime, self.bookId, self.bookName),
+        )
+
+    def to_values(self) -> list[str]:
+        """Inverse of `from_values`, used to persist words compactly."""
+        return [
+            self.term,
+            self.trans,
+            str(self.modifiedTime),
+            str(self.bookId),
+            self.bookName,
+        ]
 
     def toString(self) -> str:
         return f"{self.term} {self.trans} modifiedTime={self.modifiedTime}, bookId={self.bookId}, bookName={self.bookName}"
@@ -51,6 +75,24 @@ class SimpleWord(ABC):
         return self.term
 
 
+@dataclass
+class GroupState:
+    """State of a remote group, obtained with the cheapest request the platform allows."""
+
+    totalPage: int
+    fingerprint: str = ""
+    """Platform specific digest of the group (e.g. total count + newest word). Empty if unknown."""
+    etag: str = ""
+    lastModified: str = ""
+    notModified: bool = False
+    """True if the server answered a conditional request with `304 Not Modified`."""
+
+
+def group_fingerprint(*parts: Any) -> str:
+    """Digest of the values that identify a group's content, e.g. total count and newest word."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
 class AbstractDictionary(ABC):
     name: str
     """
@@ -95,6 +137,17 @@ class AbstractDictionary(ABC):
     ) -> list[SimpleWord]:
         pass
 
+    def getGroupState(
+        self, groupName: str, groupId: int, validators: Optional[dict[str, str]] = None
+    ) -> GroupState:
+        """
+        获取分组状态，用于判断分组自上次拉取后是否有变化
+        :param validators: conditional request headers (`If-None-Match`/`If-Modified-Since`) from the last snapshot
+        :return: GroupState. Dictionaries that cannot fingerprint a group return an empty fingerprint,
+                 which never matches a snapshot.
+        """
+        return GroupState(totalPage=self.getTotalPage(groupName, groupId))
+
     @classmethod
     @abstractmethod
     def close(cls):
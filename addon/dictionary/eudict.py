@@ -6,10 +6,11 @@ from math import ceil
 from bs4 import BeautifulSoup
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
-from ..misc import safe_load_config_from_mw, Language, ConfigType
+from ..misc import Language, ConfigType
 from dataclasses import dataclass
 from ..constants import HEADERS
-from .base import AbstractDictionary, SimpleWord
+from typing import Optional
+from .base import AbstractDictionary, GroupState, SimpleWord, group_fingerprint
 from ..misc import CredentialPlatformEnum
 
 logger = logging.getLogger("Apora dict2Anki.dictionary.eudict")
@@ -47,11 +48,19 @@ class Eudict(AbstractDictionary):
     def __init__(self):
         self.groups = []
         self.indexSoup = None
-        self.config = safe_load_config_from_mw()
+
+    @property
+    def config(self) -> ConfigType:
+        # imported here, the config service needs aqt
+        from ..configService import getConfigService
+
+        return getConfigService().snapshot
 
     @staticmethod
     def getLoginUrl() -> str:
-        config = safe_load_config_from_mw()
+        from ..configService import getConfigService
+
+        config = getConfigService().snapshot
 
         if config.language == Language.ENGLISH:
             return "https://dict.eudic.net/account/login"  # for English
@@ -138,6 +147,40 @@ class Eudict(AbstractDictionary):
             logger.exception(f"网络异常{error}")
             return 0
 
+    def getGroupState(
+        self, groupName: str, groupId: int, validators: Optional[dict[str, str]] = None
+    ) -> GroupState:
+        """
+        用一次请求获取分组状态：总数 + 第一个单词
+        :param validators: conditional request headers from the last snapshot
+        :return: GroupState
+        """
+        validation = self.validations[self.config.language.value]
+        try:
+            r = self.session.post(
+                url=f"https://{validation.baseUrl}/StudyList/WordsDataSource",
+                timeout=self.timeout,
+                data={"categoryid": groupId, "start": 0, "length": 1},
+                headers=validators or {},
+            )
+            if r.status_code == 304:
+                logger.info(f"该分组({groupName}-{groupId})未修改 (304)")
+                return GroupState(totalPage=0, notModified=True)
+            wl = r.json()
+            records = wl["recordsTotal"]
+            first = wl["data"][0]["uuid"] if wl.get("data") else ""
+        except Exception as error:
+            logger.exception(f"网络异常{error}")
+            return GroupState(totalPage=0)
+        totalPages = ceil(records / 100)
+        logger.info(f"该分组({groupName}-{groupId})下共有{totalPages}页")
+        return GroupState(
+            totalPage=totalPages,
+            fingerprint=group_fingerprint(records, first),
+            etag=r.headers.get("ETag", ""),
+            lastModified=r.headers.get("Last-Modified", ""),
+        )
+
     def getWordsByPage(
         self, pageNo: int, groupName: str, groupId: str
     ) -> list[SimpleWord]:
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from .base import GroupState, SimpleWord
+from ..misc import CredentialPlatformEnum
+
+logger = logging.getLogger("Apora dict2Anki.dictionary.snapshot")
+
+
+def page_hash(page: list[list[str]]) -> str:
+    """Content hash of a page of words (as returned by `SimpleWord.to_values`)."""
+    digest = hashlib.sha1()
+    for values in page:
+        digest.update("\x1f".join(values).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+@dataclass
+class GroupSnapshot:
+    """Pages of a group as they were on the last successful pull."""
+
+    fingerprint: str
+    etag: str
+    lastModified: str
+    pageHashes: list[str]
+    pages: list[list[list[str]]]
+
+    def validators(self) -> dict[str, str]:
+        """Headers for a conditional request against this snapshot"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.lastModified:
+            headers["If-Modified-Since"] = self.lastModified
+        return headers
+
+    def matches(self, state: GroupState) -> bool:
+        """Whether the remote group is unchanged since this snapshot was taken"""
+        if state.notModified:
+            return True
+        return bool(state.fingerprint) and state.fingerprint == self.fingerprint
+
+    def isIntact(self) -> bool:
+        return len(self.pages) == len(self.pageHashes) and all(
+            page_hash(page) == h for page, h in zip(self.pages, self.pageHashes)
+        )
+
+    def words(self) -> list[SimpleWord]:
+        return [
+            word
+            for page in self.pages
+            for values in page
+            if (word := SimpleWord.from_values(values)) is not None
+        ]
+
+
+class WordbookSnapshotCache:
+    """
+    A compact, JSON backed store of wordbook pages, keyed by (platform, groupId).
+
+    Unchanged groups are served from here, so a pull only costs one request per group.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+        self._load()
+
+    @staticmethod
+    def _key(platform: CredentialPlatformEnum, groupId) -> str:
+        return f"{platform.value}:{groupId}"
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discard corrupted wordbook snapshot {self.path}: {e}")
+            self._data = {}
+
+    def get(self, platform: CredentialPlatformEnum, groupId) -> Optional[GroupSnapshot]:
+        with self._lock:
+            raw = self._data.get(self._key(platform, groupId))
+        if raw is None:
+            return None
+        try:
+            snapshot = GroupSnapshot(**raw)
+        except TypeError:
+            return None
+        if not snapshot.isIntact():
+            logger.warning(f"Snapshot of group {groupId} is damaged, ignore it.")
+            return None
+        return snapshot
+
+    def put(
+        self,
+        platform: CredentialPlatformEnum,
+        groupId,
+        state: GroupState,
+        pages: list[list[SimpleWord]],
+    ):
+        serializedPages = [[word.to_values() for word in page] for page in pages]
+        snapshot = {
+            "fingerprint": state.fingerprint,
+            "etag": state.etag,
+            "lastModified": state.lastModified,
+            "pageHashes": [page_hash(page) for page in serializedPages],
+            "pages": serializedPages,
+        }
+        with self._lock:
+            self._data[self._key(platform, groupId)] = snapshot
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._data, ensure_ascii=False, separators=(",", ":"))
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmpPath = self.path.with_suffix(".tmp")
+            with open(tmpPath, "w", encoding="utf8") as f:
+                f.write(data)
+            os.replace(tmpPath, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save wordbook snapshot: {e}")
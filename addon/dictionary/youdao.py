@@ -6,7 +6,8 @@ from bs4 import BeautifulSoup
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 from ..constants import HEADERS
-from .base import AbstractDictionary, SimpleWord
+from typing import Optional
+from .base import AbstractDictionary, GroupState, SimpleWord, group_fingerprint
 from ..misc import CredentialPlatformEnum
 
 logger = logging.getLogger("Apora dict2Anki.dictionary.youdao")
@@ -101,6 +102,41 @@ class Youdao(AbstractDictionary):
             logger.info(f"该分组({groupName}-{groupId})下共有{totalPages}页")
             return totalPages
 
+    def getGroupState(
+        self, groupName: str, groupId: int, validators: Optional[dict[str, str]] = None
+    ) -> GroupState:
+        """
+        用一次请求获取分组状态：总数 + 最新单词
+        :param validators: conditional request headers from the last snapshot
+        :return: GroupState
+        """
+        try:
+            r = self.session.get(
+                url="http://dict.youdao.com/wordbook/webapi/words",
+                timeout=self.timeout,
+                params={"bookId": groupId, "limit": 1, "offset": 0},
+                headers=validators or {},
+            )
+            if r.status_code == 304:
+                logger.info(f"该分组({groupName}-{groupId})未修改 (304)")
+                return GroupState(totalPage=0, notModified=True)
+            data = r.json()["data"]
+            totalWords = data["total"]
+            newest = data["itemList"][0] if data["itemList"] else {}
+        except Exception as error:
+            logger.exception(f"网络异常{error}")
+            return GroupState(totalPage=0)
+        totalPages: int = ceil(totalWords / 15)
+        logger.info(f"该分组({groupName}-{groupId})下共有{totalPages}页")
+        return GroupState(
+            totalPage=totalPages,
+            fingerprint=group_fingerprint(
+                totalWords, newest.get("word", ""), newest.get("modifiedTime", 0)
+            ),
+            etag=r.headers.get("ETag", ""),
+            lastModified=r.headers.get("Last-Modified", ""),
+        )
+
     def getWordsByPage(
         self, pageNo: int, groupName: str, groupId: str
     ) -> list[SimpleWord]:
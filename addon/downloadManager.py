@@ -0,0 +1,345 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_PARTIAL_DIRNAME,
+    DOWNLOAD_PER_HOST_LIMIT,
+    DOWNLOAD_QUEUE_FILENAME,
+    HEADERS,
+    USER_FILES_DIR,
+)
+from .audioCompressor import needs_transcoding, transcode
+from .mediaStore import MediaStore, asset_key, asset_url
+from .runReport import getRunReport
+
+logger = logging.getLogger("Apora dict2Anki.downloadManager")
+
+# statuses worth retrying, other 4xx will fail the same way again
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class DownloadQueue:
+    """
+    Pending downloads per media folder, persisted in `user_files` so downloads interrupted by
+    closing the window (or Anki) are picked up by the next session.
+
+    Downloads are stored by `asset_key`, which holds no api token: the url is built again
+    with the current token when the download is resumed.
+
+    Changes are only kept in memory until `save`, which writes the file if anything changed.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or USER_FILES_DIR.joinpath(DOWNLOAD_QUEUE_FILENAME)
+        self._lock = threading.Lock()
+        # media dir -> {filename: asset key}, saved as [[filename, asset key]]
+        self._data: dict[str, dict[str, str]] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf8") as f:
+                    data = json.load(f)
+                # queues saved by older versions hold the urls
+                self._data = {
+                    mediaDir: {f: asset_key(u) for f, u in queue}
+                    for mediaDir, queue in data.items()
+                }
+                self._dirty = any(
+                    self._data[mediaDir][f] != u
+                    for mediaDir, queue in data.items()
+                    for f, u in queue
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discard download queue {self.path}: {e}")
+
+    @staticmethod
+    def _key(mediaDir: str) -> str:
+        return os.path.abspath(mediaDir)
+
+    def pending(self, mediaDir: str, aporaApiToken: str) -> list[tuple[str, str]]:
+        """:return: [(filename, url)], without the Apora audios while there is no api token"""
+        with self._lock:
+            queue = self._data.get(self._key(mediaDir), {})
+            tasks = [(f, asset_url(key, aporaApiToken)) for f, key in queue.items()]
+        return [(f, url) for f, url in tasks if url is not None]
+
+    def add(self, mediaDir: str, tasks: Iterable[tuple[str, str]]):
+        with self._lock:
+            queue = self._data.setdefault(self._key(mediaDir), {})
+            for f, u in tasks:
+                if f not in queue:
+                    queue[f] = asset_key(u)
+                    self._dirty = True
+
+    def remove(self, mediaDir: str, filename: str):
+        with self._lock:
+            key = self._key(mediaDir)
+            queue = self._data.get(key)
+            if queue is None or queue.pop(filename, None) is None:
+                return
+            if not queue:
+                del self._data[key]
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(
+                {
+                    d: [[f, k] for f, k in queue.items()]
+                    for d, queue in self._data.items()
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmpPath = self.path.with_suffix(".tmp")
+            with open(tmpPath, "w", encoding="utf8") as f:
+                f.write(data)
+            os.replace(tmpPath, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"Cannot save download queue: {e}")
+
+
+class DownloadManager:
+    """
+    Downloads files into a media folder.
+
+    - at most `perHostLimit` concurrent requests per host
+    - data goes to a partial file and is renamed into place when complete,
+      an interrupted partial file is resumed with a `Range` request
+    - a single retry policy (exponential backoff), the session itself does not retry
+    """
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("http://", HTTPAdapter(pool_maxsize=DOWNLOAD_PER_HOST_LIMIT))
+    session.mount("https://", HTTPAdapter(pool_maxsize=DOWNLOAD_PER_HOST_LIMIT))
+
+    def __init__(
+        self,
+        targetDir: str,
+        queue: Optional[DownloadQueue] = None,
+        mediaStore: Optional[MediaStore] = None,
+        maxWorkers: int = 6,
+        perHostLimit: int = DOWNLOAD_PER_HOST_LIMIT,
+        maxRetry: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 30,
+        overwrite: bool = False,
+    ):
+        self.targetDir = targetDir
+        self.queue = queue or DownloadQueue()
+        self.mediaStore = mediaStore or MediaStore(targetDir)
+        self.maxWorkers = maxWorkers
+        self.perHostLimit = perHostLimit
+        self.maxRetry = maxRetry
+        self.backoff = backoff
+        self.timeout = timeout
+        self.overwrite = overwrite
+        self.partialDir = USER_FILES_DIR.joinpath(DOWNLOAD_PARTIAL_DIRNAME)
+        self._hostLocks: dict[str, threading.Semaphore] = {}
+        self._fileLocks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _hostSemaphore(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hostLocks:
+                self._hostLocks[host] = threading.BoundedSemaphore(self.perHostLimit)
+            return self._hostLocks[host]
+
+    def _fileLock(self, fileName: str) -> threading.Lock:
+        """The same file may be prefetched and requested by a sync at the same time"""
+        with self._lock:
+            if fileName not in self._fileLocks:
+                self._fileLocks[fileName] = threading.Lock()
+            return self._fileLocks[fileName]
+
+    def _partialPath(self, filename: str) -> Path:
+        digest = hashlib.sha1(
+            os.path.join(self.targetDir, filename).encode("utf-8")
+        ).hexdigest()[:12]
+        return self.partialDir.joinpath(f"{digest}-{filename}.part")
+
+    def run(
+        self,
+        tasks: list[tuple[str, str]],  # list[tuple[filename, file download url]]
+        onFinished: Callable[[str, bool], None],
+        isInterrupted: Callable[[], bool],
+        onStarted: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Download `tasks` concurrently, calling `onStarted(filename)` when a download begins
+        and `onFinished(filename, success)` when it ends.
+        """
+        self.queue.add(self.targetDir, tasks)
+        self.queue.save()
+
+        def _download(fileName: str, url: str) -> bool:
+            if onStarted is not None:
+                onStarted(fileName)
+            return self.download(fileName, url, isInterrupted)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+                futures = {
+                    executor.submit(_download, fileName, url): fileName
+                    for fileName, url in tasks
+                }
+                for future in as_completed(futures):
+                    fileName = futures[future]
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        logger.error(f"下载{fileName}异常: {e}", exc_info=e)
+                        success = False
+                    if success:
+                        self.queue.remove(self.targetDir, fileName)
+                    onFinished(fileName, success)
+        finally:
+            self.queue.save()
+            self.mediaStore.save()
+
+    def submit(
+        self, fileName: str, url: str, isInterrupted: Callable[[], bool]
+    ) -> Future:
+        """
+        Start downloading one file in the background, e.g. as soon as a query returns its url.
+        The queue is not saved for every file: by `run`, `shutdown` or the caller once it is done
+        submitting (e.g. when a query is done).
+        """
+        self.queue.add(self.targetDir, [(fileName, url)])
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.maxWorkers)
+            executor = self._executor
+
+        def _download() -> bool:
+            success = self.download(fileName, url, isInterrupted)
+            if success:
+                self.queue.remove(self.targetDir, fileName)
+            return success
+
+        return executor.submit(_download)
+
+    def shutdown(self):
+        """Stop the background downloads started by `submit`, the queue keeps unfinished ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.queue.save()
+        self.mediaStore.save()
+
+    def download(
+        self, fileName: str, url: str, isInterrupted: Callable[[], bool]
+    ) -> bool:
+        """Download one file, retrying with exponential backoff. :return: success"""
+        with self._fileLock(fileName), getRunReport().stage("download") as timer:
+            success = self._download(fileName, url, isInterrupted)
+            timer.failed = not success
+            return success
+
+    def _download(
+        self, fileName: str, url: str, isInterrupted: Callable[[], bool]
+    ) -> bool:
+        if not self.overwrite and self.mediaStore.has(url, fileName):
+            logger.info(f"[SKIP] {fileName} already exists")
+            getRunReport().count("downloads skipped")
+            return True
+        for i in range(self.maxRetry + 1):
+            if isInterrupted():
+                return False
+            if i > 0:
+                delay = self.backoff * 2 ** (i - 1)
+                logger.info(f"Retrying {fileName} ({i}/{self.maxRetry}) in {delay}s...")
+                time.sleep(delay)
+            try:
+                with self._hostSemaphore(url):
+                    if self._fetch(fileName, url, isInterrupted):
+                        return True
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                logger.warning(f"下载{fileName}:{url}异常: {e}")
+                if status not in RETRY_STATUSES:
+                    # it would fail the same way in every later sync
+                    logger.error(
+                        f"FAILED to download {fileName}: HTTP {status}, dropped"
+                    )
+                    self.queue.remove(self.targetDir, fileName)
+                    return False
+            except (requests.RequestException, OSError) as e:
+                logger.warning(f"下载{fileName}:{url}异常: {e}")
+        logger.error(
+            f"FAILED to download {fileName} after retrying {self.maxRetry} times!"
+        )
+        return False
+
+    def _fetch(
+        self, fileName: str, url: str, isInterrupted: Callable[[], bool]
+    ) -> bool:
+        partialPath = self._partialPath(fileName)
+        partialPath.parent.mkdir(parents=True, exist_ok=True)
+        offset = partialPath.stat().st_size if partialPath.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=self.timeout
+        ) as r:
+            if r.status_code == 416 and offset:
+                # the partial file is already complete
+                pass
+            else:
+                r.raise_for_status()
+                # servers ignoring `Range` send the whole file again
+                mode = "ab" if offset and r.status_code == 206 else "wb"
+                if offset and mode == "ab":
+                    logger.info(f"Resuming {fileName} from {offset} bytes")
+                with open(partialPath, mode) as f:
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if isInterrupted():
+                            return False  # keep the partial file to resume later
+                        f.write(chunk)
+
+        filepath = os.path.join(self.targetDir, fileName)
+        if os.path.exists(filepath):
+            logger.warning(f"Overwriting file {fileName}")
+            os.remove(filepath)  # it may be a hard link to another file
+        if needs_transcoding(fileName) and not needs_transcoding(urlsplit(url).path):
+            # the partial file is kept on failure, retrying only transcodes again
+            if not transcode(str(partialPath), filepath):
+                raise OSError(f"Cannot compress {fileName}")
+            partialPath.unlink()
+        else:
+            try:
+                os.replace(partialPath, filepath)
+            except OSError:
+                # `user_files` and the media folder on different drives
+                shutil.move(str(partialPath), filepath)
+        self.mediaStore.commit(url, fileName)
+        getRunReport().count("bytes downloaded", os.path.getsize(filepath))
+        logger.info(f"[OK] {fileName} 下载完成")
+        return True
+
+    @classmethod
+    def close(cls):
+        cls.session.close()
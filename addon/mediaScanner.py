@@ -0,0 +1,77 @@
+import html
+import os
+import re
+import unicodedata
+from typing import Iterable
+from urllib.parse import unquote
+
+SOUND_REFERENCE = re.compile(r"\[sound:(.+?)\]")
+IMAGE_REFERENCE = re.compile(
+    r"""<img\b[^>]*?\bsrc\s*=\s*["']?([^"'>\s]+)""", re.IGNORECASE
+)
+
+
+def normalize_filename(filename: str) -> str:
+    # Anki stores media filenames in NFC
+    return unicodedata.normalize("NFC", filename)
+
+
+def snapshot_media_dir(media_dir: str) -> set[str]:
+    """Names of all files in the media folder, read with a single directory scan"""
+    with os.scandir(media_dir) as entries:
+        return {normalize_filename(e.name) for e in entries if e.is_file()}
+
+
+def get_sound_references(fieldValue: str) -> list[str]:
+    if not fieldValue:
+        return []
+    return [normalize_filename(f) for f in SOUND_REFERENCE.findall(fieldValue)]
+
+
+def get_image_references(fieldValue: str) -> list[str]:
+    if not fieldValue:
+        return []
+    # the editor escapes filenames in html attributes
+    return [
+        normalize_filename(unquote(html.unescape(src)))
+        for src in IMAGE_REFERENCE.findall(fieldValue)
+        if "://" not in src
+    ]
+
+
+def find_missing_media(
+    rows: Iterable[tuple[int, int, str]],
+    fieldOrdinals: dict[int, tuple[int, list[int], list[int]]],
+    mediaFiles: set[str],
+) -> list[tuple[int, str, list[str]]]:
+    """
+    Find notes referencing files that are not in the media folder, in one pass.
+
+    :param rows: (note id, notetype id, raw fields) as stored in the collection
+    :param fieldOrdinals: {notetype id: (term field index, image field indexes, sound field indexes)}
+    :param mediaFiles: snapshot of the media folder, see `snapshot_media_dir`
+    :return: [(note id, term, missing filenames)]
+    """
+    result = []
+    for nid, mid, flds in rows:
+        if mid not in fieldOrdinals:
+            continue
+        termOrd, imageOrds, soundOrds = fieldOrdinals[mid]
+        fields = flds.split("\x1f")
+        missing = [
+            filename
+            for ord in imageOrds
+            if ord < len(fields)
+            for filename in get_image_references(fields[ord])
+            if filename not in mediaFiles
+        ]
+        missing.extend(
+            filename
+            for ord in soundOrds
+            if ord < len(fields)
+            for filename in get_sound_references(fields[ord])
+            if filename not in mediaFiles
+        )
+        if missing and termOrd < len(fields) and fields[termOrd]:
+            result.append((nid, fields[termOrd], missing))
+    return result
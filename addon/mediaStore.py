@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+from .constants import (
+    APORA_AUDIO_URL,
+    ASSET_FILENAME_PREFIX,
+    ASSET_MANIFEST_FILENAME,
+    MEDIA_STORE_DIRNAME,
+    USER_FILES_DIR,
+)
+
+logger = logging.getLogger("Apora dict2Anki.mediaStore")
+
+APORA_AUDIO_PATH = "/api/audio/"
+APORA_KEY_PREFIX = "apora:"
+
+
+def asset_key(url: str) -> str:
+    """
+    Identity of the payload behind `url`. Apora audio urls embed the api token,
+    only the `fileNameTag` part identifies the audio.
+    """
+    parts = urlsplit(url)
+    if parts.path.startswith(APORA_AUDIO_PATH):
+        return f"{APORA_KEY_PREFIX}{parts.path.rsplit('/', 1)[-1]}"
+    return url
+
+
+def asset_url(key: str, aporaApiToken: str) -> Optional[str]:
+    """The url to download the asset `key` (see `asset_key`) with the current api token"""
+    if key.startswith(APORA_KEY_PREFIX):
+        if not aporaApiToken:
+            return None
+        return APORA_AUDIO_URL.format(
+            token=aporaApiToken, name=key[len(APORA_KEY_PREFIX) :]
+        )
+    return key
+
+
+def asset_filename(url: str, ext: str) -> str:
+    """Media filename referenced by notes for the asset at `url`, the same for every deck and model"""
+    digest = hashlib.sha1(asset_key(url).encode("utf-8")).hexdigest()[:20]
+    return f"{ASSET_FILENAME_PREFIX}-{digest}.{ext}"
+
+
+def content_hash(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """
+    Content addressed index of the assets downloaded into a media folder.
+
+    asset key -> content hash -> filename: one physical file per unique payload, other
+    filenames of the same payload are hard links to it.
+    """
+
+    def __init__(self, mediaDir: str, path: Optional[Path] = None):
+        self.mediaDir = mediaDir
+        if path is None:
+            digest = hashlib.sha1(os.path.abspath(mediaDir).encode("utf-8")).hexdigest()
+            path = USER_FILES_DIR.joinpath(MEDIA_STORE_DIRNAME, f"{digest[:12]}.json")
+        self.path = path
+        self._lock = threading.Lock()
+        self.keys: dict[str, str] = {}  # asset key + extension -> content hash
+        self.files: dict[str, str] = {}  # content hash -> filename in the media folder
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                data = json.load(f)
+            self.keys = data["keys"]
+            self.files = data["files"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discard media store index {self.path}: {e}")
+            self.keys, self.files = {}, {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(
+                {"keys": self.keys, "files": self.files}, separators=(",", ":")
+            )
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmpPath = self.path.with_suffix(".tmp")
+            with open(tmpPath, "w", encoding="utf8") as f:
+                f.write(data)
+            os.replace(tmpPath, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save media store index: {e}")
+
+    @staticmethod
+    def _key(url: str, filename: str) -> str:
+        # the same audio may be stored both as downloaded and compressed
+        return f"{asset_key(url)}{os.path.splitext(filename)[1]}"
+
+    def _exists(self, filename: str) -> bool:
+        return os.path.exists(os.path.join(self.mediaDir, filename))
+
+    def has(self, url: str, filename: str) -> bool:
+        """
+        Whether the payload of `url` is already available as `filename`, linking it from
+        another filename with the same content if necessary.
+        """
+        with self._lock:
+            digest = self.keys.get(self._key(url, filename))
+            stored = self.files.get(digest) if digest else None
+        if stored is None or not self._exists(stored):
+            return self._exists(filename)
+        if stored != filename and not self._exists(filename):
+            self._link(stored, filename)
+        return self._exists(filename)
+
+    def commit(self, url: str, filename: str):
+        """Record a file just downloaded to the media folder, de-duplicating its content"""
+        filepath = os.path.join(self.mediaDir, filename)
+        digest = content_hash(filepath)
+        with self._lock:
+            self.keys[self._key(url, filename)] = digest
+            stored = self.files.get(digest)
+            if stored is None or stored == filename or not self._exists(stored):
+                self.files[digest] = filename
+                stored = None
+            self._dirty = True
+        if stored is not None:
+            os.remove(filepath)
+            self._link(stored, filename)
+            logger.info(f"{filename} has the same content as {stored}, linked")
+
+    def _link(self, source: str, filename: str):
+        sourcePath = os.path.join(self.mediaDir, source)
+        targetPath = os.path.join(self.mediaDir, filename)
+        try:
+            os.link(sourcePath, targetPath)
+        except OSError:
+            # file systems without hard links
+            with open(sourcePath, "rb") as src, open(targetPath, "wb") as dst:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    dst.write(chunk)
+
+
+class BundledAssetManifest:
+    """
+    Content hashes of the files in `addon/assets` and of their copies in media folders,
+    validated by (size, mtime) so an unchanged asset is neither hashed nor copied again.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or USER_FILES_DIR.joinpath(ASSET_MANIFEST_FILENAME)
+        self.assets: dict[str, list] = {}  # asset name -> [size, mtime_ns, hash]
+        self.media: dict[str, dict[str, list]] = {}  # media dir -> same as `assets`
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf8") as f:
+                    data = json.load(f)
+                self.assets = data["assets"]
+                self.media = data["media"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Discard asset manifest {self.path}: {e}")
+
+    @staticmethod
+    def _hash(filepath: str, records: dict[str, list], name: str) -> tuple[str, bool]:
+        """:return: (content hash, whether `records` was updated)"""
+        st = os.stat(filepath)
+        record = records.get(name)
+        if record is not None and record[:2] == [st.st_size, st.st_mtime_ns]:
+            return record[2], False
+        digest = content_hash(filepath)
+        records[name] = [st.st_size, st.st_mtime_ns, digest]
+        return digest, True
+
+    def outdated(self, assetsDir: Path, mediaDir: str) -> list[Path]:
+        """:return: the assets missing from the media folder, or whose copy differs"""
+        mediaRecords = self.media.setdefault(os.path.abspath(mediaDir), {})
+        result = []
+        for asset in sorted(assetsDir.iterdir()):
+            if not asset.is_file():
+                continue
+            name = asset.name
+            assetHash, updated = self._hash(str(asset), self.assets, name)
+            self._dirty |= updated
+            mediaPath = os.path.join(mediaDir, name)
+            if not os.path.exists(mediaPath):
+                result.append(asset)
+                continue
+            mediaHash, updated = self._hash(mediaPath, mediaRecords, name)
+            self._dirty |= updated
+            if mediaHash != assetHash:
+                result.append(asset)
+        return result
+
+    def forget(self, mediaDir: str, name: str):
+        """Drop the record of a media file that is about to be replaced"""
+        self.media.get(os.path.abspath(mediaDir), {}).pop(name, None)
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmpPath = self.path.with_suffix(".tmp")
+            with open(tmpPath, "w", encoding="utf8") as f:
+                json.dump(
+                    {"assets": self.assets, "media": self.media},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmpPath, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Cannot save asset manifest: {e}")
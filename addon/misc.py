@@ -61,6 +61,10 @@ class ConfigType:
     USSpeaking: bool
     aporaApiToken: str
     language: Language
+    pullAllDictionaries: bool = False
+    compressAudio: bool = False
+    prefetchAudio: bool = False
+    sslVerify: bool = True  # no UI, `false` disables SSL checks for debugging
 
 
 def asdict_with_enum(obj) -> Any:
@@ -150,25 +154,14 @@ def safe_load_config(data: dict) -> ConfigType:
         USSpeaking=data["USSpeaking"],
         aporaApiToken=data["aporaApiToken"],
         language=transform_text_to_lang(str(data["language"])),
+        pullAllDictionaries=data.get("pullAllDictionaries", False),
+        compressAudio=data.get("compressAudio", False),
+        prefetchAudio=data.get("prefetchAudio", False),
+        sslVerify=data.get("sslVerify", True),
     )
     return config
 
 
-def safe_load_config_from_mw() -> ConfigType:
-    try:
-        from aqt import mw
-    except ImportError:
-        raise Exception("Cannot import apt.mw")
-
-    untypedConfig = mw.addonManager.getConfig(__name__)
-
-    if untypedConfig is None:
-        raise Exception("Cannot load Apora dict2anki config.")
-
-    config = safe_load_config(untypedConfig)
-    return config
-
-
 logger = logging.getLogger("Apora dict2Anki.misc")
 
 
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from anki import hooks
+from anki.collection import Collection, OpChanges
+from anki.notes import Note
+from anki.utils import ids2str
+from aqt import gui_hooks, mw
+
+from .constants import (
+    MODEL_FIELDS,
+    MODEL_NAME,
+    MODEL_NAME_DISABLED_CONTEXT,
+    NOTE_INDEX_DIRNAME,
+    USER_FILES_DIR,
+)
+from .termIndex import canonical_term
+
+logger = logging.getLogger("Apora dict2Anki.noteIndex")
+
+# the bit of a field in `filled` bitmaps
+FIELD_BITS = {name: 1 << i for i, name in enumerate(MODEL_FIELDS)}
+
+
+def isAporaModelName(name: str) -> bool:
+    return name in (MODEL_NAME, MODEL_NAME_DISABLED_CONTEXT) or name.lower().startswith(
+        "apora-dict2anki"
+    )
+
+
+def fieldsBitmap(values: Iterable[str], names: Iterable[str]) -> int:
+    """Bitmap of the non-empty fields, see `FIELD_BITS`"""
+    bitmap = 0
+    for name, value in zip(names, values):
+        if value.strip():
+            bitmap |= FIELD_BITS.get(name, 0)
+    return bitmap
+
+
+class NoteIndex:
+    """
+    Persistent index of Apora notes: note id -> (term, deck ids, notetype id, filled fields bitmap).
+    The deck ids are those of every card of the note, filtered decks and their home decks alike.
+
+    It is rebuilt with one query when the collection changed behind our back, and otherwise kept
+    up to date through Anki's note hooks, so looking up which terms exist never walks the collection.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self.entries: dict[int, list] = {}  # nid -> [term, [did], mid, filled]
+        self.byTerm: dict[str, set[int]] = {}  # canonical term -> nids
+        self.fieldNames: dict[int, list[str]] = {}  # mid -> field names, in order
+        self.signature: list[int] = []
+        self.colMod = 0
+        self._pendingAdds: list[tuple[Note, int]] = []
+        self._touched = False
+        self._dirty = False
+        self._load()
+
+    # ================================== persistence ================================== #
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                return
+            self.fieldNames = {int(k): v for k, v in data["fieldNames"].items()}
+            self.signature = data["signature"]
+            self.colMod = data["colMod"]
+            for nid, entry in data["entries"].items():
+                self._put(int(nid), *entry)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discard note index {self.path}: {e}")
+            self._clear()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(
+                {
+                    "version": self.VERSION,
+                    "colMod": self.colMod,
+                    "signature": self.signature,
+                    "fieldNames": self.fieldNames,
+                    "entries": self.entries,
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmpPath = self.path.with_suffix(".tmp")
+            with open(tmpPath, "w", encoding="utf8") as f:
+                f.write(data)
+            os.replace(tmpPath, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save note index: {e}")
+
+    # ================================== validation ================================== #
+
+    @staticmethod
+    def _aporaFieldNames(col: Collection) -> dict[int, list[str]]:
+        fieldNames = {}
+        for entry in col.models.all_names_and_ids():
+            if isAporaModelName(entry.name):
+                model = col.models.get(entry.id)  # type: ignore
+                if model is not None:
+                    fieldNames[entry.id] = [f["name"] for f in model["flds"]]
+        return fieldNames
+
+    @staticmethod
+    def _signature(col: Collection, mids: Iterable[int]) -> list[int]:
+        mids = sorted(mids)
+        midList = ids2str(mids)
+        notes = col.db.first(
+            f"select count(), coalesce(max(mod), 0) from notes where mid in {midList}"
+        )
+        cards = col.db.first(
+            "select count(), coalesce(max(mod), 0) from cards where nid in "
+            f"(select id from notes where mid in {midList})"
+        )
+        return [*mids, *(notes or (0, 0)), *(cards or (0, 0))]
+
+    def ensureValid(self, col: Collection) -> bool:
+        """
+        Make sure the index reflects the collection. Cheap when nothing changed:
+        compares the collection modification time first, then a notes/cards signature.
+        :return: True if the index had to be rebuilt
+        """
+        with self._lock:
+            self._resolvePendingAdds()
+            colMod = col.mod
+            if self.signature and colMod == self.colMod:
+                return False
+            fieldNames = self._aporaFieldNames(col)
+            signature = self._signature(col, fieldNames)
+            if signature == self.signature and fieldNames == self.fieldNames:
+                self.colMod = colMod
+                self._dirty = True
+                return False
+            self._rebuild(col, fieldNames)
+            self.signature = signature
+            self.colMod = colMod
+            self._dirty = True
+            return True
+
+    def _rebuild(self, col: Collection, fieldNames: dict[int, list[str]]):
+        logger.info("Rebuilding note index")
+        self._clear()
+        self.fieldNames = fieldNames
+        if not fieldNames:
+            return
+        mids = ids2str(fieldNames)
+        deckIds: dict[int, set[int]] = {}
+        for nid, did, odid in col.db.all(
+            "select nid, did, odid from cards where nid in "
+            f"(select id from notes where mid in {mids})"
+        ):
+            dids = deckIds.setdefault(nid, set())
+            dids.add(did)
+            if odid:
+                dids.add(odid)
+        for nid, mid, flds in col.db.all(
+            f"select id, mid, flds from notes where mid in {mids}"
+        ):
+            self._putFields(nid, mid, flds.split("\x1f"), sorted(deckIds.get(nid, ())))
+        logger.info(f"Note index rebuilt: {len(self.entries)} notes")
+
+    # ================================== mutation ================================== #
+
+    def _clear(self):
+        self.entries = {}
+        self.byTerm = {}
+        self.fieldNames = {}
+        self.signature = []
+        self.colMod = 0
+
+    def _put(self, nid: int, term: str, dids: list[int], mid: int, filled: int):
+        self._remove(nid)
+        self.entries[nid] = [term, dids, mid, filled]
+        if term:
+            self.byTerm.setdefault(canonical_term(term), set()).add(nid)
+
+    def _putFields(self, nid: int, mid: int, fields: list[str], dids: list[int]):
+        names = self.fieldNames.get(mid, [])
+        term = fields[names.index("term")] if "term" in names else ""
+        self._put(nid, term, dids, mid, fieldsBitmap(fields, names))
+
+    def _remove(self, nid: int):
+        entry = self.entries.pop(nid, None)
+        if entry is None or not entry[0]:
+            return
+        key = canonical_term(entry[0])
+        nids = self.byTerm.get(key)
+        if nids is not None:
+            nids.discard(nid)
+            if not nids:
+                del self.byTerm[key]
+
+    def _resolvePendingAdds(self):
+        """Notes only get their id once added, so new notes are indexed afterwards"""
+        pending = self._pendingAdds
+        self._pendingAdds = [(n, did) for n, did in pending if not n.id]
+        for note, did in pending:
+            if note.id:
+                self._putFields(note.id, note.mid, note.fields, [did])
+
+    # ================================== hooks ================================== #
+
+    def onNoteWillBeAdded(self, _col: Any, note: Note, deckId: int):
+        with self._lock:
+            if note.mid in self.fieldNames:
+                self._pendingAdds.append((note, deckId))
+                self._touched = True
+
+    def onNoteWillFlush(self, note: Note):
+        with self._lock:
+            if not note.id or note.id not in self.entries:
+                return  # new notes are handled by `onNoteWillBeAdded`
+            dids = self.entries[note.id][1]
+            self._putFields(note.id, note.mid, note.fields, dids)
+            self._touched = True
+
+    def onNotesWillBeDeleted(self, _col: Any, noteIds: Iterable[int]):
+        with self._lock:
+            for nid in noteIds:
+                if nid in self.entries:
+                    self._remove(nid)
+                    self._touched = True
+
+    def onOperationDidExecute(self, col: Collection, changes: OpChanges):
+        """After an operation we observed through the hooks, accept the new collection state"""
+        with self._lock:
+            if not self._touched or not self.signature:
+                return
+            self._touched = False
+            self._resolvePendingAdds()
+            signature = self._signature(col, self.fieldNames)
+            # the note count of the signature must agree with the index, otherwise something
+            # we did not see changed in the same operation: rebuild on the next lookup
+            self.signature = (
+                signature
+                if signature[len(self.fieldNames)] == len(self.entries)
+                else []
+            )
+            self.colMod = col.mod
+            self._dirty = True
+
+    # ================================== queries ================================== #
+
+    def termsInDecks(self, deckIds: Iterable[int]) -> list[tuple[int, str]]:
+        """:return: (note id, term) of the notes with a card in (or moved from) one of the decks"""
+        deckIds = set(deckIds)
+        with self._lock:
+            return [
+                (nid, term)
+                for nid, (term, dids, _, _) in self.entries.items()
+                if term and not deckIds.isdisjoint(dids)
+            ]
+
+    def notesWithEmptyFields(self, fieldNames: Iterable[str]) -> list[tuple[int, str]]:
+        """:return: (note id, term) of the notes with at least one of `fieldNames` empty"""
+        with self._lock:
+            result = []
+            for nid, (term, _, mid, filled) in self.entries.items():
+                names = self.fieldNames.get(mid, [])
+                mask = 0
+                for name in fieldNames:
+                    if name in names:
+                        mask |= FIELD_BITS.get(name, 0)
+                if term and filled & mask != mask:
+                    result.append((nid, term))
+            return result
+
+    def noteIdsOf(self, term: str) -> set[int]:
+        with self._lock:
+            return set(self.byTerm.get(canonical_term(term), ()))
+
+
+_noteIndex: Optional[NoteIndex] = None
+_noteIndexPath: Optional[str] = None
+
+
+def getNoteIndex(col: Optional[Collection] = None) -> NoteIndex:
+    """The note index of the open collection, validated against it"""
+    global _noteIndex, _noteIndexPath
+    col = col or mw.col
+    if col is None:
+        raise Exception("Collection is not available")
+    if _noteIndex is None or _noteIndexPath != col.path:
+        digest = hashlib.sha1(col.path.encode("utf-8")).hexdigest()[:12]
+        _noteIndex = NoteIndex(
+            USER_FILES_DIR.joinpath(NOTE_INDEX_DIRNAME, f"{digest}.json")
+        )
+        _noteIndexPath = col.path
+    _noteIndex.ensureValid(col)
+    return _noteIndex
+
+
+def saveNoteIndex():
+    if _noteIndex is not None:
+        _noteIndex.save()
+
+
+def _onNoteWillBeAdded(col, note, deckId):
+    if _noteIndex is not None:
+        _noteIndex.onNoteWillBeAdded(col, note, deckId)
+
+
+def _onNoteWillFlush(note):
+    if _noteIndex is not None:
+        _noteIndex.onNoteWillFlush(note)
+
+
+def _onNotesWillBeDeleted(col, noteIds):
+    if _noteIndex is not None:
+        _noteIndex.onNotesWillBeDeleted(col, noteIds)
+
+
+def _onOperationDidExecute(changes, _handler):
+    if _noteIndex is not None and mw.col is not None:
+        _noteIndex.onOperationDidExecute(mw.col, changes)
+
+
+def _onProfileWillClose():
+    global _noteIndex, _noteIndexPath
+    saveNoteIndex()
+    _noteIndex = None
+    _noteIndexPath = None
+
+
+def registerNoteIndexHooks():
+    """Keep the note index in sync with the collection. Call once when the add-on loads."""
+    hooks.note_will_be_added.append(_onNoteWillBeAdded)
+    hooks.note_will_flush.append(_onNoteWillFlush)
+    hooks.notes_will_be_deleted.append(_onNotesWillBeDeleted)
+    gui_hooks.operation_did_execute.append(_onOperationDidExecute)
+    gui_hooks.profile_will_close.append(_onProfileWillClose)
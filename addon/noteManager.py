@@ -2,66 +2,235 @@ from .constants import (
     BACKWARDS_CARD_TEMPLATE_NAME,
     CARD_TEMPLATE_CSS,
     MODEL_FIELDS,
+    MODEL_TEMPLATE_HASH_KEY,
     NORMAL_CARD_TEMPLATE_NAME,
+    NOTE_SCAN_BATCH_SIZE,
+    NOTE_WRITE_CHUNK_SIZE,
     FieldGroup,
     backwards_card_template_afmt,
     backwards_card_template_qfmt,
     normal_card_template_afmt,
     normal_card_template_qfmt,
 )
+import hashlib
 import logging
 from aqt import mw
-from anki.decks import DeckDict
+from anki.collection import (
+    AddNoteRequest,
+    Collection,
+    OpChanges,
+    OpChangesWithCount,
+    SearchNode,
+)
+from anki.decks import DeckDict, DeckId
 from anki.notes import Note
-from anki.models import NotetypeDict
+from anki.models import NotetypeDict, NotetypeId
+from anki.utils import ids2str
 from .misc import ConfigType, PronunciationVariantEnum
 from .queryApi.base import QueryAPIReturnType
-from typing import Optional, Union
-from .utils import swap_positions_with_list, default_audio_filename
+from .audioCompressor import audio_format
+from .mediaScanner import (
+    SOUND_REFERENCE,
+    find_missing_media,
+    get_sound_references,
+    snapshot_media_dir,
+)
+from .mediaStore import BundledAssetManifest
+from .noteIndex import getNoteIndex, isAporaModelName
+from .runReport import getRunReport
+from .termIndex import TermIndex, canonical_term
+from typing import Callable, Iterator, Optional, Sequence, Union
+from .utils import swap_positions_with_list, audio_filename
 from pathlib import Path
 
 
 logger = logging.getLogger("Apora dict2Anki.noteManager")
 
 
-def getDeckList() -> list[str]:
-    if mw.col is None:
+def getDeckList(col: Optional[Collection] = None) -> list[str]:
+    """Deck names, without loading the full deck dicts"""
+    col = col or mw.col
+    if col is None:
         raise Exception("Collection is not available")
-    return [deck["name"] for deck in mw.col.decks.all()]
+    return [deck.name for deck in col.decks.all_names_and_ids()]
 
 
-def getWordsByDeck(deckName: str) -> list[str]:
+def getAporaFieldOrdinals() -> dict[int, dict[str, int]]:
+    """:return: {notetype id: {field name: field index}} for every Apora note type"""
     if mw.col is None:
         raise Exception("Collection is not available")
-    notes = mw.col.find_notes(f'deck:"{deckName}"')
-    words = []
-    for nid in notes:
-        note = mw.col.get_note(nid)
-        note_type = note.note_type()
+    ordinals = {}
+    for entry in mw.col.models.all_names_and_ids():
+        if not isAporaModelName(entry.name):
+            continue
+        model = mw.col.models.get(NotetypeId(entry.id))
+        if model is None:
+            continue
+        ordinals[entry.id] = {
+            name: ord for name, (ord, _) in mw.col.models.field_map(model).items()
+        }
+    return ordinals
+
+
+def iterAporaNoteRows(
+    batchSize: int = NOTE_SCAN_BATCH_SIZE,
+) -> Iterator[list[tuple[int, int, str]]]:
+    """
+    Yield (note id, notetype id, raw fields) of every Apora note, `batchSize` rows at a time,
+    so scanning a large collection keeps a bounded amount of rows in memory.
+    """
+    if mw.col is None:
+        raise Exception("Collection is not available")
+    mids = ids2str(getAporaFieldOrdinals())
+    lastId = 0
+    while True:
+        rows = mw.col.db.all(
+            f"select id, mid, flds from notes where mid in {mids} and id > ? order by id limit ?",
+            lastId,
+            batchSize,
+        )
+        if not rows:
+            return
+        yield rows
+        lastId = rows[-1][0]
+
 
-        if note_type is None:
-            raise Exception("note_type is none")
+def findNotesWithMissingMedia(mediaDir: str) -> list[tuple[int, str, list[str]]]:
+    """
+    Find Apora notes whose image/pronunciation references are missing from the media folder,
+    from one snapshot of the folder and the raw field data (no Note objects are loaded).
+    :return: [(note id, term, missing filenames)]
+    """
+    mediaFiles = snapshot_media_dir(mediaDir)
+    fieldOrdinals = {
+        mid: (
+            fields.get("term", 0),
+            [fields["image"]] if "image" in fields else [],
+            [fields["pronunciation"]] if "pronunciation" in fields else [],
+        )
+        for mid, fields in getAporaFieldOrdinals().items()
+    }
+    result = []
+    for rows in iterAporaNoteRows():
+        result.extend(find_missing_media(rows, fieldOrdinals, mediaFiles))
+    return result
 
-        if (
-            note_type.get("name", "").lower().startswith("apora-dict2anki")
-            and note["term"]
-        ):
-            words.append(note["term"])
-    return words
 
+def findSoundReferences(mediaDir: str, extension: str) -> dict[str, list[int]]:
+    """
+    :return: {filename: note ids} of the `extension` files (e.g. `wav`) referenced by the
+    pronunciation field of Apora notes and present in the media folder
+    """
+    mediaFiles = snapshot_media_dir(mediaDir)
+    suffix = f".{extension.lower()}"
+    pronunciationOrdinals = {
+        mid: fields["pronunciation"]
+        for mid, fields in getAporaFieldOrdinals().items()
+        if "pronunciation" in fields
+    }
+    result: dict[str, list[int]] = {}
+    for rows in iterAporaNoteRows():
+        for nid, mid, flds in rows:
+            ord = pronunciationOrdinals.get(mid)
+            fields = flds.split("\x1f")
+            if ord is None or ord >= len(fields):
+                continue
+            for filename in get_sound_references(fields[ord]):
+                if filename.lower().endswith(suffix) and filename in mediaFiles:
+                    result.setdefault(filename, []).append(nid)
+    return result
+
+
+def replaceSoundReferences(
+    col: Collection, noteIds: Sequence[int], renamed: dict[str, str]
+) -> OpChangesWithCount:
+    """Point `[sound:old]` references of the notes to `[sound:new]`. Meant to run inside a `CollectionOp`."""
+    notes = []
+    for nid in noteIds:
+        note = col.get_note(nid)  # type: ignore
+        changed = False
+        for name, value in note.items():
+            newValue = SOUND_REFERENCE.sub(
+                lambda m: f"[sound:{renamed.get(m.group(1), m.group(1))}]", value
+            )
+            if newValue != value:
+                note[name] = newValue
+                changed = True
+        if changed:
+            notes.append(note)
+    return updateNotesInBulk(col, notes)
+
+
+def findUnreferencedSounds(col: Collection, filenames: Sequence[str]) -> list[str]:
+    """
+    :return: the `filenames` no note of the collection references as `[sound:filename]`,
+    in any field of any note type
+    """
+    result = []
+    for filename in filenames:
+        search = col.build_search_string(SearchNode(literal_text=f"[sound:{filename}]"))
+        if not col.find_notes(search):
+            result.append(filename)
+    return result
 
-def getNoteIDsOfWords(wordList: list[str], deckName: str) -> list:
+
+def getEnabledFieldNames(config: ConfigType, withPronunciation: bool) -> list[str]:
+    """
+    Fields that `fillNoteFields` writes with the given settings (when the query result has a
+    value), also the fields Fill Missing Values looks for: both must agree.
+    """
+    fieldNames = ["ipa", "part_of_speech", "definition"]
+    if config.enableChineseDefinition:
+        fieldNames.append("definition_cn")
+    if withPronunciation:
+        fieldNames.append("pronunciation")
+    if config.enableContext:
+        fieldNames.append("context")
+    if config.contextTranslation:
+        fieldNames.append("translation")
+    return fieldNames
+
+
+def findNotesWithMissingFields(fieldNames: list[str]) -> list[tuple[int, str]]:
+    """
+    Look up the fill bitmaps of the note index (both note types), the collection is only
+    read again when the index is out of date.
+    :return: (note id, term) of notes having at least one of `fieldNames` empty
+    """
+    return getNoteIndex().notesWithEmptyFields(fieldNames)
+
+
+def getTermNoteIdsByDeck(deckName: str) -> list[tuple[int, str]]:
+    """
+    Fetch (note id, term) of every Apora note in the deck (and its sub decks) from the note index.
+    Safe to call from a background thread (e.g. inside a `QueryOp`).
+    """
     if mw.col is None:
-        raise Exception("mw.col is none")
+        raise Exception("Collection is not available")
+    deckId = mw.col.decks.id_for_name(deckName)
+    if not deckId:
+        return []
+    return getNoteIndex().termsInDecks(mw.col.decks.deck_and_child_ids(deckId))
+
+
+def getWordsByDeck(deckName: str) -> list[str]:
+    return [term for _, term in getTermNoteIdsByDeck(deckName)]
+
+
+def getNoteIDsOfWords(wordList: list[str], deckName: str) -> list[int]:
+    """Resolve the note ids of `wordList` in the deck from a term -> note ids map built with one query"""
+    noteIdsByTerm: dict[str, list[int]] = {}
+    for nid, term in getTermNoteIdsByDeck(deckName):
+        noteIdsByTerm.setdefault(canonical_term(term), []).append(nid)
     notes = []
-    for word in wordList:
-        note = mw.col.find_notes(f'deck:"{deckName}" term:"{word}"')
-        if note:
-            notes.append(note[0])
+    # spelling variants of a word (case, full-width...) only need to be resolved once
+    for word in TermIndex(wordList):
+        notes.extend(noteIdsByTerm.get(canonical_term(word), []))
     return notes
 
 
 def getOrCreateDeck(deckName: str, model: NotetypeDict):
+    """Select the deck and make it the default deck of the model, saving only what changed"""
     if mw.col is None:
         raise Exception("mw.col is none")
 
@@ -75,16 +244,24 @@ def getOrCreateDeck(deckName: str, model: NotetypeDict):
     if deck is None:
         raise Exception("deck is none")
 
-    mw.col.decks.select(deck["id"])
-    mw.col.decks.save(deck)
+    changed = False
+    if mw.col.decks.get_current_id() != deck["id"]:
+        mw.col.decks.select(deck["id"])
+        changed = True
 
     if mw.col.models is None:
         raise Exception("mw.col.models is none")
 
-    mw.col.models.set_current(model)
-    model["did"] = deck["id"]
-    mw.col.models.save(model)
-    mw.reset()
+    if mw.col.get_config("curModel", None) != model["id"]:
+        mw.col.models.set_current(model)
+        changed = True
+    # saving a note type may ask for a full sync, skip it when nothing changed
+    if model.get("did") != deck["id"]:
+        model["did"] = deck["id"]
+        mw.col.models.save(model)
+        changed = True
+    if changed:
+        mw.reset()
 
     return deck
 
@@ -144,6 +321,7 @@ def getOrCreateCardTemplate(
     cardTemplate["afmt"] = afmt
     modelObject["css"] = css
     mw.col.models.addTemplate(modelObject, cardTemplate)
+    modelObject[MODEL_TEMPLATE_HASH_KEY] = modelTemplatesHash(modelObject)
     if add:
         mw.col.models.add(modelObject)
     else:
@@ -152,8 +330,7 @@ def getOrCreateCardTemplate(
 
 def getOrCreateNormalCardTemplate(modelObject: NotetypeDict, fg: FieldGroup):
     """Create Normal Card Template (Card Type)"""
-    qfmt = normal_card_template_qfmt(fg)
-    afmt = normal_card_template_afmt(fg)
+    qfmt, afmt = renderCardTemplates(fg)[NORMAL_CARD_TEMPLATE_NAME]
     getOrCreateCardTemplate(
         modelObject, NORMAL_CARD_TEMPLATE_NAME, qfmt, afmt, CARD_TEMPLATE_CSS, add=True
     )
@@ -161,8 +338,7 @@ def getOrCreateNormalCardTemplate(modelObject: NotetypeDict, fg: FieldGroup):
 
 def getOrCreateBackwardsCardTemplate(modelObject: NotetypeDict, fg: FieldGroup):
     """Create Backwards Card Template (Card Type) to existing Dict2Anki Note Type"""
-    qfmt = backwards_card_template_qfmt(fg)
-    afmt = backwards_card_template_afmt(fg)
+    qfmt, afmt = renderCardTemplates(fg)[BACKWARDS_CARD_TEMPLATE_NAME]
     getOrCreateCardTemplate(
         modelObject,
         BACKWARDS_CARD_TEMPLATE_NAME,
@@ -230,24 +406,68 @@ def mergeModelFields(modelObject: NotetypeDict) -> bool:
     return True
 
 
+def renderCardTemplates(fg: FieldGroup) -> dict[str, tuple[str, str]]:
+    """
+    :return: {card template name: (qfmt, afmt)}, rendered once per `FieldGroup` state
+    """
+    key = fg.key()
+    rendered = _renderedCardTemplates.get(key)
+    if rendered is None:
+        rendered = {
+            NORMAL_CARD_TEMPLATE_NAME: (
+                normal_card_template_qfmt(fg),
+                normal_card_template_afmt(fg),
+            ),
+            BACKWARDS_CARD_TEMPLATE_NAME: (
+                backwards_card_template_qfmt(fg),
+                backwards_card_template_afmt(fg),
+            ),
+        }
+        _renderedCardTemplates[key] = rendered
+    return rendered
+
+
+_renderedCardTemplates: dict[tuple[str, str, str], dict[str, tuple[str, str]]] = {}
+
+
+def templatesHash(templates: list[tuple[str, str, str]], css: str) -> str:
+    """Content hash of [(name, qfmt, afmt)] and the CSS"""
+    digest = hashlib.sha1()
+    for name, qfmt, afmt in templates:
+        for part in (name, qfmt, afmt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x1f")
+    digest.update(css.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def modelTemplatesHash(modelObject: NotetypeDict) -> str:
+    """Hash of the card templates and CSS the model currently has"""
+    return templatesHash(
+        [(t["name"], t["qfmt"], t["afmt"]) for t in modelObject["tmpls"]],
+        modelObject["css"],
+    )
+
+
+def expectedTemplatesHash(modelObject: NotetypeDict, fg: FieldGroup) -> str:
+    """Hash of the card templates and CSS the model should have with `fg`"""
+    rendered = renderCardTemplates(fg)
+    templates = []
+    for t in modelObject["tmpls"]:
+        qfmt, afmt = rendered.get(t["name"], (t["qfmt"], t["afmt"]))
+        templates.append((t["name"], qfmt, afmt))
+    return templatesHash(templates, CARD_TEMPLATE_CSS)
+
+
 def checkModelCardTemplates(modelObject: NotetypeDict, fg: FieldGroup) -> bool:
-    """Check if model card templates are as expected"""
-    for tmpl in modelObject["tmpls"]:
-        tmpl_name = tmpl["name"]
-        logger.info(f"Found card template '{tmpl_name}'")
-        if tmpl_name == NORMAL_CARD_TEMPLATE_NAME:
-            if tmpl["qfmt"] != normal_card_template_qfmt(fg) or tmpl[
-                "afmt"
-            ] != normal_card_template_afmt(fg):
-                logger.info(f"Changes detected in template '{tmpl_name}'")
-                return False
-        elif tmpl_name == BACKWARDS_CARD_TEMPLATE_NAME:
-            if tmpl["qfmt"] != backwards_card_template_qfmt(fg) or tmpl[
-                "afmt"
-            ] != backwards_card_template_afmt(fg):
-                logger.warning(f"Changes detected in template '{tmpl_name}'")
-                return False
-    return True
+    """Check if model card templates (and CSS) are as expected"""
+    if modelTemplatesHash(modelObject) == expectedTemplatesHash(modelObject, fg):
+        return True
+    if modelObject.get(MODEL_TEMPLATE_HASH_KEY) == modelTemplatesHash(modelObject):
+        logger.info("Card templates have changed with the card settings")
+    else:
+        logger.warning("Changes detected in card templates")
+    return False
 
 
 def checkModelCardCSS(modelObject: NotetypeDict) -> bool:
@@ -261,26 +481,29 @@ def checkModelCardCSS(modelObject: NotetypeDict) -> bool:
         return False
 
 
-def resetModelCardTemplates(modelObject: NotetypeDict, fg: FieldGroup):
-    """Reset Card Templates to default"""
+def resetModelCardTemplates(modelObject: NotetypeDict, fg: FieldGroup) -> bool:
+    """Reset Card Templates to default. The model is only saved if they differ. :return: saved"""
+    expectedHash = expectedTemplatesHash(modelObject, fg)
+    if modelTemplatesHash(modelObject) == expectedHash:
+        logger.info("Card templates and CSS are up to date")
+        return False
+
+    rendered = renderCardTemplates(fg)
     for tmpl in modelObject["tmpls"]:
         tmpl_name = tmpl["name"]
-        if tmpl_name == NORMAL_CARD_TEMPLATE_NAME:
-            logger.info(f"Reset card template '{NORMAL_CARD_TEMPLATE_NAME}'")
-            tmpl["qfmt"] = normal_card_template_qfmt(fg)
-            tmpl["afmt"] = normal_card_template_afmt(fg)
-        elif tmpl_name == BACKWARDS_CARD_TEMPLATE_NAME:
-            logger.info(f"Reset card template '{BACKWARDS_CARD_TEMPLATE_NAME}'")
-            tmpl["qfmt"] = backwards_card_template_qfmt(fg)
-            tmpl["afmt"] = backwards_card_template_afmt(fg)
+        if tmpl_name in rendered:
+            logger.info(f"Reset card template '{tmpl_name}'")
+            tmpl["qfmt"], tmpl["afmt"] = rendered[tmpl_name]
     logger.info("Reset CSS")
     modelObject["css"] = CARD_TEMPLATE_CSS
+    modelObject[MODEL_TEMPLATE_HASH_KEY] = expectedHash
     logger.info("Save changes")
 
     if mw.col is None:
         raise Exception("mw.col is none")
 
     mw.col.models.save(modelObject)
+    return True
 
 
 def setNoteFieldValue(
@@ -308,7 +531,12 @@ def appendTagToNote(note: Note, tag: Union[str, list[str]]):
             note.set_tags_from_str(" ".join(tag))
 
 
-def loadAssetsIntoCollectionMedia():
+def loadAssetsIntoCollectionMedia() -> list[str]:
+    """
+    Copy the bundled assets (fonts, icons...) into `collection.media`, only the ones missing
+    there or changed since, so it is cheap enough to run on every sync.
+    :return: names of the files copied
+    """
     if mw.col is None:
         raise Exception("mw.col is none")
 
@@ -317,50 +545,41 @@ def loadAssetsIntoCollectionMedia():
     assets_path = current_path.joinpath("assets")
 
     media = mw.col.media
-
-    for p in assets_path.iterdir():
-        media.add_file(p.as_posix())
-    pass
-
-
-def addNoteToDeck(
-    deck: Optional[DeckDict],
-    model: Optional[NotetypeDict],
+    mediaDir = media.dir()
+    manifest = BundledAssetManifest()
+
+    added = []
+    for p in manifest.outdated(assets_path, mediaDir):
+        if media.have(p.name):
+            # `add_file` would keep the old file and add a renamed copy
+            media.trash_files([p.name])
+            manifest.forget(mediaDir, p.name)
+        added.append(media.add_file(p.as_posix()))
+    if added:
+        logger.info(f"Copied assets into collection media: {added}")
+        # record the new copies
+        manifest.outdated(assets_path, mediaDir)
+    manifest.save()
+    return added
+
+
+def fillNoteFields(
+    note: Note,
     config: ConfigType,
     word: QueryAPIReturnType,
     pronunciationVariant: PronunciationVariantEnum,
-    existing_note: Optional[Note],
-    overwrite=False,
-):
+    isNewNote: bool,
+    overwrite: bool,
+) -> set[str]:
     """
-    Add note
-    :param deck: deck
-    :param model: model
-    :param config: currentConfig
-    :param word: (dict) query result of a word
-    :param whichPron:
-    :param existing_note: if not None, then do not create new note
-    :param overwrite: True to overwrite existing note, and False to fill missing values only. (Only relevant when
-                        'existing_note' is not None.
-    :return: None
+    Write the query result of a word into the note fields (and tags). Does not touch the collection.
+    :return: names of the fields whose value actually changed (`"tags"` if the tags changed)
     """
-    if not word:
-        logger.warning(f"查询结果{word} 异常，忽略")
-        return
-
-    if mw.col is None:
-        raise Exception("mw.col is none")
-
-    isNewNote = existing_note is None
-    if isNewNote:
-        if not model or not deck:
-            logger.error("Cannot create new note: model or deck is missing")
-            return
-        model["did"] = deck["id"]
-        note = Note(mw.col, model)  # create new note
-    else:
-        note = existing_note  # existing note
-
+    fieldsBefore = list(note.fields)
+    tagsBefore = list(note.tags)
+    enabled = getEnabledFieldNames(
+        config, pronunciationVariant is not PronunciationVariantEnum.NONE
+    )
     term = word.term
     setNoteFieldValue(note, "term", term, isNewNote, overwrite)
     # note['term'] = term
@@ -384,11 +603,11 @@ def addNoteToDeck(
     #     # note['exam_type'] = " / ".join(word['exam_type'])
 
     # International Phonetic Alphabet (IPA)
-    if word.ipa:
+    if word.ipa and "ipa" in enabled:
         setNoteFieldValue(note, "ipa", word.ipa, isNewNote, overwrite)
         # note['us'] = word['AmEPhonetic']
 
-    if word.part_of_speech:
+    if word.part_of_speech and "part_of_speech" in enabled:
         setNoteFieldValue(
             note, "part_of_speech", word.part_of_speech, isNewNote, overwrite
         )
@@ -397,7 +616,7 @@ def addNoteToDeck(
 
     # definition
 
-    if word.definition:
+    if word.definition and "definition" in enabled:
         setNoteFieldValue(note, "definition", word.definition, isNewNote, overwrite)
 
     # ================================== Optional fields ==================================
@@ -406,7 +625,7 @@ def addNoteToDeck(
     # 3. Toggle visibility by dynamically updating card template
 
     # definition_cn
-    if word.chinese_definition and config.enableChineseDefinition:
+    if word.chinese_definition and "definition_cn" in enabled:
         setNoteFieldValue(
             note, "definition_cn", word.chinese_definition, isNewNote, overwrite
         )
@@ -420,10 +639,10 @@ def addNoteToDeck(
     # note['image'] = f'<div><img src="{imageFilename}" /></div>'
 
     # pronunciation
-    if pronunciationVariant is not PronunciationVariantEnum.NONE:
-        pronFilename = default_audio_filename(
-            term, "wav"
-        )  # For now, use `.wav` as default, this should be flexible
+    if "pronunciation" in enabled:
+        pronFilename = audio_filename(
+            term, word.context_audio_url or word.term_audio_url, audio_format(config)
+        )  # `.wav` as downloaded, or `.ogg` if compressed
         key, value = "pronunciation", f"[sound:{pronFilename}]"
         setNoteFieldValue(note, key, value, isNewNote, overwrite)
         # note['pronunciation'] = f"[sound:{pronFilename}]"
@@ -440,7 +659,7 @@ def addNoteToDeck(
     #         setNoteFieldValue(note, key, value, isNewNote, overwrite)
 
     # sentence
-    if word.context and config.enableContext:
+    if word.context and "context" in enabled:
         if config.enableTermHighlight and word.replacing:
             # highlight term in the context
 
@@ -456,12 +675,78 @@ def addNoteToDeck(
             setNoteFieldValue(note, "context", word.context, isNewNote, overwrite)
 
     # if context translation enabled
-    if word.translation:
+    if word.translation and "translation" in enabled:
         setNoteFieldValue(note, "translation", word.translation, isNewNote, overwrite)
 
-    if isNewNote:
-        mw.col.addNote(note)
-        logger.info(f"添加笔记{term}")
-    else:
-        mw.col.update_note(note)
-        logger.info(f"更新笔记{term}")
+    changed = {
+        name
+        for (name, value), before in zip(note.items(), fieldsBefore)
+        if value != before
+    }
+    if note.tags != tagsBefore:
+        changed.add("tags")
+    return changed
+
+
+def buildAddNoteRequest(
+    deck: DeckDict,
+    model: NotetypeDict,
+    config: ConfigType,
+    word: QueryAPIReturnType,
+    pronunciationVariant: PronunciationVariantEnum,
+) -> AddNoteRequest:
+    """Create a new (not yet added) note for the word, see `addNotesInBulk`"""
+    if mw.col is None:
+        raise Exception("mw.col is none")
+    note = Note(mw.col, model)
+    fillNoteFields(note, config, word, pronunciationVariant, True, False)
+    return AddNoteRequest(note=note, deck_id=DeckId(deck["id"]))
+
+
+def addNotesInBulk(
+    col: Collection,
+    requests: Sequence[AddNoteRequest],
+    chunkSize: int = NOTE_WRITE_CHUNK_SIZE,
+    onProgress: Optional[Callable[[int, int], None]] = None,
+) -> OpChanges:
+    """
+    Add notes chunk by chunk. Every chunk is written in one transaction, and all chunks are
+    merged into a single undo entry. Meant to run inside a `CollectionOp`.
+    :param onProgress: called with (added, total) after each chunk, from the background thread
+    """
+    if not requests:
+        return OpChanges()
+    undoEntry = col.add_custom_undo_entry("Apora Dict2Anki: 添加笔记")
+    total = len(requests)
+    report = getRunReport()
+    for start in range(0, total, chunkSize):
+        chunk = requests[start : start + chunkSize]
+        with report.stage("note write"):
+            col.add_notes(chunk)
+        report.count("notes added", len(chunk))
+        if onProgress:
+            onProgress(min(start + chunkSize, total), total)
+    logger.info(f"添加笔记({total})")
+    return col.merge_undo_entries(undoEntry)
+
+
+def updateNotesInBulk(
+    col: Collection,
+    notes: Sequence[Note],
+    chunkSize: int = NOTE_WRITE_CHUNK_SIZE,
+    onProgress: Optional[Callable[[int, int], None]] = None,
+) -> OpChangesWithCount:
+    """
+    Save changed notes chunk by chunk, merged into a single undo entry. Meant to run inside a `CollectionOp`.
+    Callers should only pass notes that actually changed (see `fillNoteFields`).
+    """
+    if not notes:
+        return OpChangesWithCount(count=0)
+    undoEntry = col.add_custom_undo_entry("Apora Dict2Anki: 更新笔记")
+    total = len(notes)
+    for start in range(0, total, chunkSize):
+        col.update_notes(notes[start : start + chunkSize])
+        if onProgress:
+            onProgress(min(start + chunkSize, total), total)
+    logger.info(f"更新笔记({total})")
+    return OpChangesWithCount(count=total, changes=col.merge_undo_entries(undoEntry))
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from aqt.qt import QLabel, QObject, QProgressBar, QTimer
+
+from .constants import PROGRESS_FPS, PROGRESS_RATE_WINDOW
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressAggregator(QObject):
+    """
+    Collects the progress of a stage (pull, query, download...) from the workers and repaints the
+    progress bar and status label at a fixed frame rate, whatever the rate of events.
+
+    The counting methods are thread safe and never touch widgets, so worker signals can be
+    connected to them with `Qt.ConnectionType.DirectConnection`.
+    """
+
+    def __init__(
+        self,
+        progressBar: QProgressBar,
+        statusLabel: QLabel,
+        fps: int = PROGRESS_FPS,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.progressBar = progressBar
+        self.statusLabel = statusLabel
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, 1000 // fps))
+        self._timer.timeout.connect(self.refresh)
+        self._reset("", 0)
+
+    def _reset(self, stage: str, total: int):
+        self.stage = stage
+        self.total = total
+        self.done = 0  # finished items, failures included
+        self.failed = 0
+        self.inFlight = 0
+        self.startTime = time.monotonic()
+        self._samples: deque[tuple[float, int]] = deque()
+
+    # ================================== reporting ================================== #
+
+    def begin(self, stage: str, total: int = 0):
+        with self._lock:
+            self._reset(stage, total)
+        self._timer.start()
+        self.refresh()
+
+    def addTotal(self, n: int):
+        with self._lock:
+            self.total += n
+
+    def started(self):
+        """An item is being processed"""
+        with self._lock:
+            self.inFlight += 1
+
+    def finish(self):
+        """An item is finished, successfully or not"""
+        with self._lock:
+            self.done += 1
+            self.inFlight = max(0, self.inFlight - 1)
+
+    def fail(self):
+        """Count a failure, the item still has to be finished with `finish`"""
+        with self._lock:
+            self.failed += 1
+
+    def finishFailed(self):
+        self.fail()
+        self.finish()
+
+    def end(self):
+        self._timer.stop()
+        self.refresh()
+
+    # ================================== display ================================== #
+
+    def rate(self, now: float) -> float:
+        """items/sec over the last `PROGRESS_RATE_WINDOW` seconds"""
+        samples = self._samples
+        samples.append((now, self.done))
+        while len(samples) > 2 and now - samples[0][0] > PROGRESS_RATE_WINDOW:
+            samples.popleft()
+        elapsed = now - samples[0][0]
+        if elapsed <= 0:
+            return 0.0
+        return (self.done - samples[0][1]) / elapsed
+
+    def summary(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            stage, total, done = self.stage, self.total, self.done
+            failed, inFlight = self.failed, self.inFlight
+            rate = self.rate(now)
+        parts = [f"{stage}: {done}/{total}" if total else f"{stage}: {done}"]
+        parts.append(f"{rate:.1f}/s")
+        if total and done < total:
+            parts.append(
+                f"ETA {format_duration((total - done) / rate)}"
+                if rate > 0
+                else "ETA --"
+            )
+        else:
+            parts.append(f"用时 {format_duration(now - self.startTime)}")
+        parts.append(f"进行中 {inFlight}")
+        if failed:
+            parts.append(f"失败 {failed}")
+        return " · ".join(parts)
+
+    def refresh(self):
+        with self._lock:
+            total, done = self.total, self.done
+        if not self.stage:
+            return
+        self.progressBar.setMaximum(max(total, done, 1))
+        self.progressBar.setValue(done)
+        self.statusLabel.setText(self.summary())
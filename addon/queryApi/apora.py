@@ -2,14 +2,14 @@ import logging
 import requests
 from urllib3 import Retry
 from requests.adapters import HTTPAdapter
-from ..constants import HEADERS
+from ..constants import APORA_AUDIO_URL, HEADERS
 from .base import (
     AbstractQueryAPI,
     QueryAPIReturnType,
     QueryAPIPlatformEnum,
 )
 from typing import Optional
-from ..misc import safe_load_config_from_mw
+from ..configService import getConfigService
 from ..exceptions import BalanceInsufficientException, QueryAPIError
 
 
@@ -30,7 +30,7 @@ class API(AbstractQueryAPI):
 
     @classmethod
     def query(cls, term) -> Optional[QueryAPIReturnType]:
-        config = safe_load_config_from_mw()
+        config = getConfigService().snapshot
         if not config.aporaApiToken:
             raise RuntimeError("Apora API Token cannot be empty.")
 
@@ -92,7 +92,9 @@ class API(AbstractQueryAPI):
             if config.contextSpeaking or config.termSpeaking:
                 filename_tag = response_data.get("fileNameTag")
                 if filename_tag:
-                    audio_download_link = f"https://apora.sumku.cc/api/audio/{config.aporaApiToken}/{filename_tag}.wav"
+                    audio_download_link = APORA_AUDIO_URL.format(
+                        token=config.aporaApiToken, name=f"{filename_tag}.wav"
+                    )
 
             replacing = response_data.get("replacing") if config.enableContext else None
 
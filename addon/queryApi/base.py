@@ -1,7 +1,8 @@
+import sys
 from abc import ABC, abstractmethod
 from ..dictionary.base import SimpleWord
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
 from enum import Enum
 
 
@@ -11,7 +12,7 @@ class QueryAPIPlatformEnum(Enum):
     EUDIC = 3
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryAPIReturnType:
     """
     Dataclass representing the return type for a query to the API.
@@ -42,6 +43,24 @@ class QueryAPIReturnType:
     replacing: Optional[str]
     translation: Optional[str]
 
+    def __post_init__(self):
+        # a handful of distinct values (noun, verb...) shared by all the results
+        if isinstance(self.part_of_speech, str):
+            self.part_of_speech = sys.intern(self.part_of_speech)
+
+    def to_values(self) -> list[Any]:
+        """Field values in declaration order, used to persist results compactly."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_values(cls, values: list[Any]) -> "QueryAPIReturnType":
+        """Inverse of `to_values`"""
+        return cls(*values)
+
+    def __reduce__(self):
+        # pickled as a plain tuple of values, without the field names
+        return (self.__class__, tuple(self.to_values()))
+
 
 def todo_empty_query_result() -> QueryAPIReturnType:
     return QueryAPIReturnType(
@@ -0,0 +1,211 @@
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from .constants import RUN_REPORT_KEEP
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 60:
+        return f"{int(seconds) // 60}m{seconds % 60:04.1f}s"
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    return f"{seconds * 1000:.0f}ms"
+
+
+@dataclass
+class StageTiming:
+    """Every timed call of one stage (e.g. each page, each query) of a run"""
+
+    name: str
+    durations: list[float] = field(default_factory=list)
+    failed: int = 0
+    firstStart: float = 0.0
+    """seconds since the start of the run"""
+    lastEnd: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.durations)
+
+    @property
+    def busy(self) -> float:
+        """sum of the durations, larger than `wall` when the calls run concurrently"""
+        return sum(self.durations)
+
+    @property
+    def wall(self) -> float:
+        """from the start of the first call to the end of the last one"""
+        return self.lastEnd - self.firstStart
+
+    def percentile(self, q: float) -> float:
+        durations = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(q * len(durations)))]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "failed": self.failed,
+            "start": round(self.firstStart, 6),
+            "wall": round(self.wall, 6),
+            "busy": round(self.busy, 6),
+            "mean": round(statistics.fmean(self.durations), 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "max": round(max(self.durations), 6),
+        }
+
+
+class StageTimer:
+    """Yielded by `RunReport.stage`, set `failed` when the call did not succeed without raising"""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+class RunReport:
+    """
+    Timings and counters of one run (pull -> diff -> query -> note write -> download).
+
+    Stages are timed with `time.perf_counter` (monotonic) from any thread. Once `finish`ed,
+    the report ignores what is still recorded, e.g. by downloads outliving the run.
+    """
+
+    def __init__(self, name: str = "sync"):
+        self.name = name
+        self.startedAt = time.time()  # wall clock, only displayed
+        self.origin = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        self.status = ""
+        self.stages: dict[str, StageTiming] = {}
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.elapsed is not None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTimer]:
+        """Time the body as one call of stage `name`, a raised exception counts as a failure"""
+        timer = StageTimer()
+        start = time.perf_counter()
+        try:
+            yield timer
+        except BaseException:
+            timer.failed = True
+            raise
+        finally:
+            self.record(name, start, time.perf_counter(), timer.failed)
+
+    def record(self, name: str, start: float, end: float, failed: bool = False):
+        """:param start, end: `time.perf_counter()` values"""
+        with self._lock:
+            if self.finished:
+                return
+            timing = self.stages.get(name)
+            if timing is None:
+                timing = self.stages[name] = StageTiming(
+                    name, firstStart=start - self.origin
+                )
+            timing.durations.append(end - start)
+            timing.lastEnd = max(timing.lastEnd, end - self.origin)
+            if failed:
+                timing.failed += 1
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            if not self.finished:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self, status: str = "completed"):
+        with self._lock:
+            if self.finished:
+                return
+            self.elapsed = time.perf_counter() - self.origin
+            self.status = status
+
+    # ================================== output ================================== #
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "status": self.status,
+                "startedAt": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S%z", time.localtime(self.startedAt)
+                ),
+                "elapsed": round(self.elapsed or time.perf_counter() - self.origin, 6),
+                "stages": {name: t.summary() for name, t in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def formatLines(self) -> list[str]:
+        """Table of the stages (in the order they started) and the counters, for the log"""
+        summary = self.summary()
+        lines = [
+            f"Run report ({summary['status']}): {format_seconds(summary['elapsed'])}"
+        ]
+        for name, s in summary["stages"].items():
+            failed = f" failed={s['failed']}" if s["failed"] else ""
+            lines.append(
+                f"  {name:<14} n={s['count']:<6} wall={format_seconds(s['wall']):<8}"
+                f" busy={format_seconds(s['busy']):<8} p50={format_seconds(s['p50']):<7}"
+                f" p95={format_seconds(s['p95']):<7} max={format_seconds(s['max'])}{failed}"
+            )
+        if summary["counters"]:
+            lines.append(
+                "  " + ", ".join(f"{k}={v}" for k, v in summary["counters"].items())
+            )
+        return lines
+
+    def formatShort(self) -> str:
+        """One line: total and wall time of the stages"""
+        summary = self.summary()
+        stages = " · ".join(
+            f"{name} {format_seconds(s['wall'])}"
+            for name, s in summary["stages"].items()
+        )
+        return f"上次运行 {format_seconds(summary['elapsed'])}: {stages}"
+
+    def export(self, directory: Path, log: str = "") -> Path:
+        """
+        Write the report as `<directory>/run-<time>.json`, and `log` next to it as `.log`.
+        Only the `RUN_REPORT_KEEP` most recent runs are kept.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        startedAt = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.startedAt))
+        stem = f"run-{startedAt}-{self.name}"
+        path = directory.joinpath(f"{stem}.json")
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=1)
+        if log:
+            directory.joinpath(f"{stem}.log").write_text(log, encoding="utf8")
+        for old in sorted(directory.glob("run-*.json"))[:-RUN_REPORT_KEEP]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".log").unlink(missing_ok=True)
+        return path
+
+
+# nothing is recorded outside of a run
+_report = RunReport()
+_report.finish("idle")
+
+
+def startRunReport(name: str = "sync") -> RunReport:
+    """Start recording a new run, the current one is dropped if it was not finished"""
+    global _report
+    _report = RunReport(name)
+    return _report
+
+
+def getRunReport() -> RunReport:
+    """The report of the current run, e.g. `with getRunReport().stage("query") as t:`"""
+    return _report
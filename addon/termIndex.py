@@ -0,0 +1,88 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+_WHITESPACES = re.compile(r"\s+")
+
+
+def canonical_term(term: str) -> str:
+    """
+    Canonical form used to compare terms: NFKC normalized, case folded and trimmed.
+
+    Full-width letters, composed characters and case variants all map to the same key,
+    e.g. `Ｃａｆé`, `café` and `CAFÉ` -> `café`.
+    """
+    term = unicodedata.normalize("NFKC", term).casefold()
+    # case folding may produce non-normalized sequences (e.g. `ǰ`), normalize again
+    term = unicodedata.normalize("NFKC", term)
+    return _WHITESPACES.sub(" ", term).strip()
+
+
+@dataclass
+class TermDiff:
+    """Result of `TermIndex.diff`. Every list keeps the original spellings."""
+
+    added: list[str] = field(default_factory=list)
+    """terms only in the new side (original spelling of the new side)"""
+    removed: list[str] = field(default_factory=list)
+    """terms only in the old side (original spelling of the old side)"""
+    unchanged: list[str] = field(default_factory=list)
+    """terms on both sides (original spelling of the old side)"""
+
+
+class TermIndex:
+    """
+    A set of terms keyed by their canonical form, remembering the first spelling seen.
+
+    Shared by the pull, file import and delete paths so they agree on what "the same word" is.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self._terms: dict[str, str] = {}  # canonical -> original spelling
+        self.update(terms)
+
+    def add(self, term: str) -> bool:
+        """:return: True if the term was not in the index yet"""
+        key = canonical_term(term)
+        if not key or key in self._terms:
+            return False
+        self._terms[key] = term
+        return True
+
+    def update(self, terms: Iterable[str]) -> int:
+        """:return: number of terms actually added"""
+        return sum(1 for term in terms if self.add(term))
+
+    def get(self, term: str) -> Optional[str]:
+        """:return: the stored spelling of `term`, or None"""
+        return self._terms.get(canonical_term(term))
+
+    def diff(self, old: "TermIndex") -> TermDiff:
+        """
+        Compare this (new) index with an `old` one, visiting every key once.
+        e.g. `remote.diff(local)` gives the words to add and the words to delete.
+        """
+        result = TermDiff()
+        oldTerms = old._terms
+        for key, term in self._terms.items():
+            oldTerm = oldTerms.get(key)
+            if oldTerm is None:
+                result.added.append(term)
+            else:
+                result.unchanged.append(oldTerm)
+        if len(result.unchanged) != len(oldTerms):
+            newTerms = self._terms
+            result.removed = [
+                term for key, term in oldTerms.items() if key not in newTerms
+            ]
+        return result
+
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and canonical_term(term) in self._terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms.values())
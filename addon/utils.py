@@ -1,8 +1,10 @@
 import os
 import re
 import hashlib
-from bs4 import BeautifulSoup
 from .constants import ASSET_FILENAME_PREFIX
+from .mediaScanner import get_image_references, get_sound_references
+from .mediaStore import asset_filename
+from typing import Optional
 
 
 def default_image_filename(term: str) -> str:
@@ -14,6 +16,13 @@ def default_audio_filename(term: str, format: str = "mp3") -> str:
     return f"{ASSET_FILENAME_PREFIX}-{term}-{hashed_term}.{format}"
 
 
+def audio_filename(term: str, url: Optional[str], format: str = "mp3") -> str:
+    """Filename of the downloaded audio: shared by every note using the same audio url"""
+    if url:
+        return asset_filename(url, format)
+    return default_audio_filename(term, format)
+
+
 # 使用 list 表示 swap：列表中每个子列表是交换对，如 [['context', 'term']]
 def swap_positions_with_list(fields: list[str], swap_list: list[list[str]]):
     """
@@ -41,20 +50,13 @@ def set_sub_ignore_case(a, b: set) -> set:
 
 
 def get_image(fieldValue: str) -> str:
-    if not fieldValue:
-        return ""
-    soup = BeautifulSoup(fieldValue, features="html.parser")
-    result = []
-    for img in soup.find_all("img", src=True):
-        result.append(img["src"])
-    return result[0] if result else ""
+    images = get_image_references(fieldValue)
+    return images[0] if images else ""
 
 
 def get_audio(fieldValue: str) -> str:
-    if not fieldValue:
-        return ""
-    matches = re.findall(r"\[sound:(.+)]", fieldValue)
-    return matches[0] if matches else ""
+    sounds = get_sound_references(fieldValue)
+    return sounds[0] if sounds else ""
 
 
 def is_image_file_missing(fieldValue: str, media_dir: str) -> bool:
@@ -0,0 +1,281 @@
+import csv
+import logging
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from .constants import IMPORT_BATCH_SIZE, IMPORT_MAX_WORKERS, IMPORT_QUEUE_SIZE
+from .dictionary.base import SimpleWord
+from .runReport import getRunReport
+from .termIndex import TermIndex
+
+logger = logging.getLogger("Apora dict2Anki.wordImporter")
+
+_TABS = re.compile(r"\t+")
+_SPACES = re.compile(r"\s+")
+_TAGS = re.compile(r"<[^>]*>")
+
+# header names used by vocabulary apps exports (Anki, Quizlet, Eudic, Youdao, spreadsheets...),
+# compared lower-cased without spaces, `_` and `-`
+TERM_HEADERS = {
+    "word", "words", "term", "terms", "front", "expression", "headword", "vocabulary",
+    "vocab", "lemma", "text", "单词", "词汇", "生词", "单词/短语",
+}  # fmt: skip
+TRANS_HEADERS = {
+    "trans", "translation", "meaning", "meanings", "definition", "definitions", "back",
+    "explanation", "释义", "翻译", "解释", "中文", "词义",
+}  # fmt: skip
+BOOK_HEADERS = {
+    "bookname", "book", "wordbook", "deck", "list", "单词本", "生词本", "词书",
+}  # fmt: skip
+
+# `#separator:` values of Anki's "Notes in Plain Text" exports
+ANKI_SEPARATORS = {
+    "tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "colon": ":", "space": " ",
+}  # fmt: skip
+
+SNIFF_SIZE = 64 * 1024
+
+
+@dataclass
+class ImportStats:
+    files: int = 0
+    words: int = 0
+    """words read, duplicates included"""
+    unique: int = 0
+    failedFiles: list[str] = field(default_factory=list)
+
+    @property
+    def duplicates(self) -> int:
+        return self.words - self.unique
+
+
+def _clean(value: str) -> str:
+    return _SPACES.sub(" ", value.strip())
+
+
+def _header_key(value: str) -> str:
+    return re.sub(r"[\s_\-]+", "", value.strip().lower())
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    UTF-8 (with or without BOM), else GB18030 as saved by Excel on Chinese Windows
+    :param complete: `sample` is the whole file, not only its beginning
+    """
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # unless it is the whole file, the sample may end in the middle of a character
+        if complete or e.start < len(sample) - 3:
+            return "gb18030"
+    return "utf-8-sig"
+
+
+def header_columns(row: list[str]) -> Optional[dict[str, int]]:
+    """:return: {"term"/"trans"/"book": column} if `row` is a header row, else None"""
+    columns: dict[str, int] = {}
+    for i, value in enumerate(row):
+        key = _header_key(value)
+        for name, headers in (
+            ("term", TERM_HEADERS),
+            ("trans", TRANS_HEADERS),
+            ("book", BOOK_HEADERS),
+        ):
+            if key in headers and name not in columns:
+                columns[name] = i
+    return columns if "term" in columns else None
+
+
+def _word_from_columns(
+    row: list[str], columns: dict[str, int], html: bool
+) -> Optional[SimpleWord]:
+    def _get(name: str) -> str:
+        i = columns.get(name)
+        return _clean(row[i]) if i is not None and i < len(row) else ""
+
+    term = _get("term")
+    if html:
+        term = _clean(_TAGS.sub(" ", term))
+    if not term:
+        return None
+    return SimpleWord(term, trans=_get("trans"), bookName=_get("book"))
+
+
+def _iter_legacy_lines(lines: Iterable[str]) -> Iterator[SimpleWord]:
+    """Tab separated, headerless, positional: term, trans, modifiedTime, bookId, bookName"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            word = SimpleWord.from_values([_clean(f) for f in _TABS.split(line)])
+        except ValueError:
+            # modifiedTime/bookId that are not numbers, keep the term at least
+            word = SimpleWord(_clean(_TABS.split(line)[0]))
+        if word is not None and word.term:
+            yield word
+
+
+def iter_words(path: str) -> Iterator[SimpleWord]:
+    """
+    Stream the words of a word list, one row at a time.
+
+    - `.txt` without header: the legacy tab separated format (see `_iter_legacy_lines`)
+    - `.csv`/`.tsv`, or any file whose first row names at least two columns (a single `word`
+      could as well be the first word of a legacy list): columns picked by name
+    - Anki plain text exports: `#separator:`, `#html:` and `#columns:` directives are honored
+    """
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_SIZE)
+    encoding = detect_encoding(sample, complete=len(sample) < SNIFF_SIZE)
+    ext = os.path.splitext(path)[1].lower()
+
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        delimiter = "\t"
+        html = False
+        columns: Optional[dict[str, int]] = None
+        directives = False
+
+        # leading `#key:value` directives of Anki exports
+        line = f.readline()
+        while line.startswith("#") and ":" in line:
+            directives = True
+            key, _, value = line[1:].strip().partition(":")
+            key = key.lower()
+            if key == "separator":
+                delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or "\t")
+            elif key == "html":
+                html = value.lower() == "true"
+            elif key == "columns":
+                columns = header_columns(value.split(delimiter))
+            line = f.readline()
+
+        if ext == ".csv" and not directives:
+            try:
+                text = sample.decode(encoding, "ignore")
+                delimiter = csv.Sniffer().sniff(text, ",;\t").delimiter
+            except csv.Error:
+                delimiter = ","
+
+        if columns is None and line.strip():
+            columns = header_columns(next(csv.reader([line], delimiter=delimiter)))
+            if columns is not None and len(columns) < 2 and ext not in (".csv", ".tsv"):
+                columns = None
+            if columns is not None:
+                line = ""  # the header row is not a word
+        if columns is None and not directives and ext not in (".csv", ".tsv"):
+            yield from _iter_legacy_lines([line] if line else [])
+            yield from _iter_legacy_lines(f)
+            return
+
+        # positional csv: term, translation
+        columns = columns or {"term": 0, "trans": 1}
+        rows = csv.reader(f, delimiter=delimiter)
+        if line.strip():
+            rows = _chain_row(next(csv.reader([line], delimiter=delimiter)), rows)
+        for row in rows:
+            word = _word_from_columns(row, columns, html)
+            if word is not None:
+                yield word
+
+
+def _chain_row(first: list[str], rows: Iterator[list[str]]) -> Iterator[list[str]]:
+    yield first
+    yield from rows
+
+
+_FILE_DONE = object()
+
+
+class WordImporter:
+    """
+    Read word lists concurrently and de-duplicate them as they stream in.
+
+    Every file is parsed by its own thread into batches of `batchSize` words, handed over through
+    a bounded queue: a slow consumer blocks the parsers, so memory stays bounded by the batches in
+    flight plus the unique words, whatever the size of the files.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        termIndex: Optional[TermIndex] = None,
+        batchSize: int = IMPORT_BATCH_SIZE,
+        maxWorkers: int = IMPORT_MAX_WORKERS,
+    ):
+        self.paths = paths
+        self.termIndex = termIndex if termIndex is not None else TermIndex()
+        self.batchSize = batchSize
+        self.maxWorkers = maxWorkers
+
+    def run(
+        self,
+        onBatch: Callable[[list[SimpleWord]], None],
+        isInterrupted: Callable[[], bool] = lambda: False,
+        onFileStarted: Optional[Callable[[str], None]] = None,
+        onFileDone: Optional[Callable[[str, int], None]] = None,
+    ) -> ImportStats:
+        """
+        Call `onBatch` with every batch of new (not seen before) words, in the calling thread.
+        :return: statistics of the import
+        """
+        stats = ImportStats(files=len(self.paths))
+        if not self.paths:
+            return stats
+        batches: queue.Queue = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+        report = getRunReport()
+
+        def _parse(path: str):
+            count = 0
+            batch: list[SimpleWord] = []
+            try:
+                if onFileStarted is not None:
+                    onFileStarted(path)
+                # includes the time blocked on a full queue, i.e. waiting for the consumer
+                with report.stage("import file"):
+                    for word in iter_words(path):
+                        batch.append(word)
+                        if len(batch) >= self.batchSize:
+                            if isInterrupted():
+                                return
+                            batches.put(batch)
+                            count += len(batch)
+                            batch = []
+                    if batch:
+                        batches.put(batch)
+                        count += len(batch)
+            except (OSError, csv.Error) as e:
+                logger.error(f"Cannot read {path}: {e}")
+                stats.failedFiles.append(path)
+            finally:
+                batches.put((_FILE_DONE, path, count))
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.maxWorkers, len(self.paths)))
+        ) as executor:
+            for path in self.paths:
+                executor.submit(_parse, path)
+            remaining = len(self.paths)
+            # keep draining even when interrupted, parsers may be blocked on a full queue
+            while remaining:
+                item = batches.get()
+                if isinstance(item, tuple) and item[0] is _FILE_DONE:
+                    remaining -= 1
+                    _, path, count = item
+                    logger.info(
+                        f"[OK] {path}: {count} words (may including duplicates)"
+                    )
+                    if onFileDone is not None:
+                        onFileDone(path, count)
+                    continue
+                stats.words += len(item)
+                report.count("words imported", len(item))
+                newWords = [word for word in item if self.termIndex.add(word.term)]
+                stats.unique += len(newWords)
+                if newWords and not isInterrupted():
+                    onBatch(newWords)
+        return stats
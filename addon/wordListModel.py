@@ -0,0 +1,165 @@
+from enum import IntEnum
+from typing import Any, Iterable, Optional
+
+from aqt.qt import QAbstractListModel, QIcon, QModelIndex, Qt
+
+from .queryApi.base import QueryAPIReturnType
+
+
+class WordStatus(IntEnum):
+    WAITING = 0  # not queried yet
+    DONE = 1  # queried successfully
+    FAILED = 2  # query failed
+    DELETE = 3  # only in the local deck, may be deleted
+
+
+STATUS_ICONS = {
+    WordStatus.WAITING: ":/icons/wait.png",
+    WordStatus.DONE: ":/icons/done.png",
+    WordStatus.FAILED: ":/icons/failed.png",
+    WordStatus.DELETE: ":/icons/delete.png",
+}
+
+
+def contiguous_ranges(rows: Iterable[int]) -> list[tuple[int, int]]:
+    """[1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]"""
+    ranges: list[tuple[int, int]] = []
+    for row in sorted(set(rows)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+class WordListModel(QAbstractListModel):
+    """
+    The words of a session stored column by column (terms, a status byte per word, query results,
+    check states) instead of one `QListWidgetItem` per word. Views only ask for the visible rows.
+    """
+
+    def __init__(self, checkable: bool = False, parent=None):
+        super().__init__(parent)
+        self.checkable = checkable
+        self.terms: list[str] = []
+        self.status = bytearray()
+        self.results: list[Optional[QueryAPIReturnType]] = []
+        self.checked = bytearray()
+        self._icons: dict[int, QIcon] = {}
+
+    # ================================== Qt model ================================== #
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.terms)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.terms[row]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._icon(self.status[row])
+        if role == Qt.ItemDataRole.CheckStateRole and self.checkable:
+            return (
+                Qt.CheckState.Checked if self.checked[row] else Qt.CheckState.Unchecked
+            )
+        if role == Qt.ItemDataRole.UserRole:
+            return self.results[row]
+        return None
+
+    def setData(
+        self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole
+    ) -> bool:
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        checkState = value if isinstance(value, int) else getattr(value, "value", value)
+        self.checked[index.row()] = int(checkState == Qt.CheckState.Checked.value)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if self.checkable:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def _icon(self, status: int) -> QIcon:
+        icon = self._icons.get(status)
+        if icon is None:
+            icon = self._icons[status] = QIcon(STATUS_ICONS[WordStatus(status)])
+        return icon
+
+    def _rowsChanged(self, rows: Iterable[int], roles: list[int]):
+        for first, last in contiguous_ranges(rows):
+            self.dataChanged.emit(self.index(first), self.index(last), roles)
+
+    # ================================== store ================================== #
+
+    def count(self) -> int:
+        return len(self.terms)
+
+    def clear(self):
+        self.setTerms([])
+
+    def setTerms(self, terms: Iterable[str], status: WordStatus = WordStatus.WAITING):
+        self.beginResetModel()
+        self.terms = list(terms)
+        self.status = bytearray([status]) * len(self.terms)
+        self.results = [None] * len(self.terms)
+        self.checked = bytearray(len(self.terms))
+        self.endResetModel()
+
+    def appendTerms(
+        self, terms: Iterable[str], status: WordStatus = WordStatus.WAITING
+    ):
+        terms = list(terms)
+        if not terms:
+            return
+        first = len(self.terms)
+        self.beginInsertRows(QModelIndex(), first, first + len(terms) - 1)
+        self.terms.extend(terms)
+        self.status.extend(bytes([status]) * len(terms))
+        self.results.extend([None] * len(terms))
+        self.checked.extend(bytes(len(terms)))
+        self.endInsertRows()
+
+    def setResults(self, results: dict[int, QueryAPIReturnType]):
+        """Store query results {row: result}, notifying views once per contiguous range"""
+        for row, result in results.items():
+            self.results[row] = result
+            self.status[row] = WordStatus.DONE
+        self._rowsChanged(
+            results, [Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.UserRole]
+        )
+
+    def setFailed(self, rows: Iterable[int]):
+        rows = list(rows)
+        for row in rows:
+            self.status[row] = WordStatus.FAILED
+        self._rowsChanged(rows, [Qt.ItemDataRole.DecorationRole])
+
+    def result(self, row: int) -> Optional[QueryAPIReturnType]:
+        return self.results[row]
+
+    def rowsWithStatus(self, status: WordStatus) -> list[int]:
+        return [row for row, s in enumerate(self.status) if s == status]
+
+    def hasUnfinished(self) -> bool:
+        """Whether some words are not queried yet or failed"""
+        return any(s != WordStatus.DONE for s in self.status)
+
+    def checkedTerms(self) -> list[str]:
+        return [term for term, c in zip(self.terms, self.checked) if c]
+
+    def removeTerms(self, terms: Iterable[str]):
+        terms = set(terms)
+        keep = [row for row, term in enumerate(self.terms) if term not in terms]
+        if len(keep) == len(self.terms):
+            return
+        self.beginResetModel()
+        self.terms = [self.terms[row] for row in keep]
+        self.status = bytearray(self.status[row] for row in keep)
+        self.results = [self.results[row] for row in keep]
+        self.checked = bytearray(self.checked[row] for row in keep)
+        self.endResetModel()
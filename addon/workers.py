@@ -1,17 +1,17 @@
 import json
 import logging
-import os
 import time
-import requests
-from urllib3 import Retry
 from itertools import chain
 from .misc import ThreadPool
-from .dictionary.base import SimpleWord
-from requests.adapters import HTTPAdapter
+from .dictionary.base import AbstractDictionary, SimpleWord
+from .dictionary.snapshot import WordbookSnapshotCache
+from .downloadManager import DownloadManager
+from .runReport import getRunReport
+from .wordImporter import ImportStats, WordImporter
 from .queryApi.base import AbstractQueryAPI, QueryAPIReturnType
 from aqt.qt import QObject, pyqtSignal, QThread
 from .exceptions import BalanceInsufficientException
-from typing import Type, Optional, Any, Protocol
+from typing import Callable, Type, Optional, Any, Protocol
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
@@ -31,7 +31,9 @@ class LoginStateCheckWorker(QObject):
         self.cookie = cookie
 
     def run(self):
-        loginState = self.checkFn(self.cookie)
+        with getRunReport().stage("login check") as timer:
+            loginState = self.checkFn(self.cookie)
+            timer.failed = not loginState
         if loginState:
             self.logSuccess.emit(json.dumps(self.cookie))
         else:
@@ -41,40 +43,197 @@ class LoginStateCheckWorker(QObject):
 class RemoteWordFetchingWorker(QObject):
     start = pyqtSignal()
     tick = pyqtSignal()
-    setProgress = pyqtSignal(int)
+    addProgress = pyqtSignal(int)
     done = pyqtSignal()
     doneThisGroup = pyqtSignal(list)
     logger = logging.getLogger("Apora dict2Anki.workers.RemoteWordFetchingWorker")
 
-    def __init__(self, selectedDict, selectedGroups: list[tuple]):
+    def __init__(
+        self,
+        selectedDict,
+        selectedGroups: list[tuple],
+        snapshotCache: Optional[WordbookSnapshotCache] = None,
+    ):
         super().__init__()
         self.selectedDict = selectedDict
         self.selectedGroups = selectedGroups
+        self.snapshotCache = snapshotCache
 
     def run(self):
-        currentThread = QThread.currentThread()
+        isInterrupted = QThread.currentThread().isInterruptionRequested  # type: ignore
+        for groupName, groupId in self.selectedGroups:
+            remoteWordList = pullGroup(
+                self.selectedDict,
+                groupName,
+                groupId,
+                self.snapshotCache,
+                onTotalPage=self.addProgress.emit,
+                onPage=self.tick.emit,
+                isInterrupted=isInterrupted,
+            )
+            self.doneThisGroup.emit(remoteWordList)
 
-        def _pull(*args):
-            if currentThread.isInterruptionRequested():  # type: ignore
+        if self.snapshotCache is not None:
+            self.snapshotCache.save()
+        self.done.emit()
+
+
+def pullGroup(
+    selectedDict: AbstractDictionary,
+    groupName: str,
+    groupId,
+    snapshotCache: Optional[WordbookSnapshotCache],
+    onTotalPage: Callable[[int], Any],
+    onPage: Callable[[], Any],
+    isInterrupted: Callable[[], bool],
+    max_workers: int = 3,
+) -> list[SimpleWord]:
+    """Pull all words of a group, page by page, or from the snapshot if it is unchanged"""
+    logger = RemoteWordFetchingWorker.logger
+    report = getRunReport()
+
+    def _pull(pageNo, *args):
+        if isInterrupted():
+            return
+        with report.stage("page") as timer:
+            wordPerPage = selectedDict.getWordsByPage(pageNo, *args)
+            timer.failed = not wordPerPage
+        onPage()
+        return pageNo, wordPerPage
+
+    snapshot = None
+    if snapshotCache is not None:
+        snapshot = snapshotCache.get(selectedDict.platform, groupId)
+    with report.stage("group state"):
+        state = selectedDict.getGroupState(
+            groupName, groupId, snapshot.validators() if snapshot else None
+        )
+    if snapshot is not None and snapshot.matches(state):
+        logger.info(f"单词本({groupName}-{groupId})无变化，使用本地快照")
+        report.count("snapshot hits")
+        onTotalPage(1)
+        onPage()
+        words = snapshot.words()
+        report.count("words pulled", len(words))
+        return words
+
+    totalPage = state.totalPage
+    onTotalPage(totalPage)
+    with ThreadPool(max_workers=max_workers) as executor:
+        for i in range(totalPage):
+            executor.submit(_pull, i, groupName, groupId)
+    pages = [words for _, words in sorted(executor.result)]
+
+    # only keep complete pulls, a missing/empty page means a request failed
+    if (
+        snapshotCache is not None
+        and state.fingerprint
+        and len(pages) == totalPage
+        and all(pages)
+    ):
+        snapshotCache.put(selectedDict.platform, groupId, state, pages)
+    words = list(chain(*pages))
+    report.count("words pulled", len(words))
+    return words
+
+
+class MultiDictionaryFetchingWorker(QObject):
+    """Log in to several dictionaries and pull their groups concurrently"""
+
+    start = pyqtSignal()
+    tick = pyqtSignal()
+    addProgress = pyqtSignal(int)
+    done = pyqtSignal()
+    doneThisGroup = pyqtSignal(list)
+    dictionaryFailed = pyqtSignal(str)
+    logger = logging.getLogger("Apora dict2Anki.workers.MultiDictionaryFetchingWorker")
+
+    def __init__(
+        self,
+        jobs: list[tuple[AbstractDictionary, dict[str, Any], list[str]]],
+        snapshotCache: Optional[WordbookSnapshotCache] = None,
+    ):
+        """
+        :param jobs: [(dictionary, cookie, selected group names)]
+        """
+        super().__init__()
+        self.jobs = jobs
+        self.snapshotCache = snapshotCache
+
+    def run(self):
+        isInterrupted = QThread.currentThread().isInterruptionRequested  # type: ignore
+        report = getRunReport()
+
+        def _pullDictionary(selectedDict: AbstractDictionary, cookie, groupNames):
+            with report.stage("login check") as timer:
+                timer.failed = not selectedDict.checkCookie(cookie)
+            if timer.failed:
+                self.logger.warning(f"{selectedDict.name}: cookie失效，跳过")
+                self.dictionaryFailed.emit(selectedDict.name)
                 return
-            wordPerPage = self.selectedDict.getWordsByPage(*args)
-            self.tick.emit()
-            return wordPerPage
+            with report.stage("group fetch"):
+                group_map = dict(selectedDict.getGroups())
+            for groupName in groupNames:
+                if isInterrupted():
+                    return
+                if groupName not in group_map:
+                    self.logger.warning(
+                        f"{selectedDict.name}: 单词本({groupName})不存在，跳过"
+                    )
+                    continue
+                words = pullGroup(
+                    selectedDict,
+                    groupName,
+                    group_map[groupName],
+                    self.snapshotCache,
+                    onTotalPage=self.addProgress.emit,
+                    onPage=self.tick.emit,
+                    isInterrupted=isInterrupted,
+                )
+                self.logger.info(
+                    f"{selectedDict.name}: 单词本({groupName})共{len(words)}个单词"
+                )
+                self.doneThisGroup.emit(words)
 
-        for groupName, groupId in self.selectedGroups:
-            totalPage = self.selectedDict.getTotalPage(groupName, groupId)
-            self.setProgress.emit(totalPage)
-            with ThreadPool(max_workers=3) as executor:
-                for i in range(totalPage):
-                    executor.submit(_pull, i, groupName, groupId)
-            remoteWordList = list(chain(*[ft for ft in executor.result]))
-            self.doneThisGroup.emit(remoteWordList)
+        # one thread per dictionary, each one keeps its own session and page concurrency
+        with ThreadPoolExecutor(max_workers=max(1, len(self.jobs))) as executor:
+            futures = [executor.submit(_pullDictionary, *job) for job in self.jobs]
+            for future in as_completed(futures):
+                error = future.exception()
+                if error is not None:
+                    self.logger.error(f"拉取失败: {error}", exc_info=error)
 
+        if self.snapshotCache is not None:
+            self.snapshotCache.save()
         self.done.emit()
 
 
+class WordImportWorker(QObject):
+    """Import word list files off the GUI thread"""
+
+    start = pyqtSignal()
+    fileStarted = pyqtSignal()
+    fileDone = pyqtSignal()
+    doneThisBatch = pyqtSignal(list)
+    done = pyqtSignal(ImportStats)
+
+    def __init__(self, paths: list[str]):
+        super().__init__()
+        self.importer = WordImporter(paths)
+
+    def run(self):
+        stats = self.importer.run(
+            self.doneThisBatch.emit,
+            QThread.currentThread().isInterruptionRequested,  # type: ignore
+            onFileStarted=lambda _path: self.fileStarted.emit(),
+            onFileDone=lambda _path, _count: self.fileDone.emit(),
+        )
+        self.done.emit(stats)
+
+
 class QueryWorker(QObject):
     start = pyqtSignal()
+    taskStarted = pyqtSignal()
     tick = pyqtSignal()
     thisRowDone = pyqtSignal(int, QueryAPIReturnType)
     thisRowFailed = pyqtSignal(int)
@@ -88,23 +247,30 @@ class QueryWorker(QObject):
         api: Type[AbstractQueryAPI],
         max_workers: int = 3,  # concurrent number
         delay: float = 0,  # delay seconds for api query
+        onResult: Optional[Callable[[QueryAPIReturnType], None]] = None,
     ):
+        """:param onResult: called in the worker thread with every result, e.g. to prefetch its audio"""
         super().__init__()
         self.wordList = wordList
         self.api = api
         self.max_workers = max_workers
         self.delay = delay
+        self.onResult = onResult
         self._stop_flag = threading.Event()
 
     def run(self):
         currentThread = QThread.currentThread()
+        report = getRunReport()
 
         def _query(word: SimpleWord, row) -> Optional[QueryAPIReturnType]:
             if currentThread.isInterruptionRequested():  # type: ignore
                 return
+            self.taskStarted.emit()
             queryResult: QueryAPIReturnType | None = None
             try:
-                queryResult = self.api.query(word)
+                with report.stage("query") as timer:
+                    queryResult = self.api.query(word)
+                    timer.failed = not queryResult
             except BalanceInsufficientException:
                 self.logger.error(f"余额不足，停止所有查询: {word}")
                 self._stop_flag.set()  # 设置停止标志
@@ -117,6 +283,11 @@ class QueryWorker(QObject):
 
             if queryResult:
                 self.logger.info(f"查询成功: {word} -- {queryResult}")
+                if self.onResult is not None:
+                    try:
+                        self.onResult(queryResult)
+                    except Exception as e:
+                        self.logger.warning(f"onResult failed ({word}): {e}")
                 self.thisRowDone.emit(row, queryResult)
             else:
                 self.logger.warning(f"查询失败: {word}")
@@ -151,86 +322,44 @@ class AssetDownloadWorker(QObject):
     """Asset (Image and Audio) download worker"""
 
     start = pyqtSignal()
+    taskStarted = pyqtSignal()
     tick = pyqtSignal()
+    failed = pyqtSignal()
     done = pyqtSignal()
     logger = logging.getLogger("Apora dict2Anki.workers.AudioDownloadWorker")
-    retries = Retry(total=5, backoff_factor=3, status_forcelist=[500, 502, 503, 504])
-    session = requests.Session()
-    session.mount("http://", HTTPAdapter(max_retries=retries))
-    session.mount("https://", HTTPAdapter(max_retries=retries))
 
     def __init__(
         self,
         target_dir,
         images: list[tuple[str, str]],  # list[tuple[filename, file download url]]
         audios: list[tuple[str, str]],  # list[tuple[filename, file download url]]
-        overwrite=False,
-        max_retry=3,
+        manager: Optional[DownloadManager] = None,
     ):
+        """:param manager: share downloads (and in flight prefetches) with other workers"""
         super().__init__()
         self.target_dir = target_dir
         self.images = images
         self.audios = audios
-        self.overwrite = overwrite
-        self.max_retry = max_retry
+        self.manager = manager
 
     def run(self):
         currentThread = QThread.currentThread()
+        manager = self.manager or DownloadManager(self.target_dir)
 
-        def __download_with_retry(filename, url):
-            success = False
-            for i in range(self.max_retry):
-                if __download(filename, url):
-                    success = True
-                    break
-                if currentThread.isInterruptionRequested():  # type: ignore
-                    success = False
-                    break
-                self.logger.info(f"Retrying {i + 1} time...")
+        def onFinished(fileName: str, success: bool):
             if success:
                 self.tick.emit()
             else:
-                self.logger.error(
-                    f"FAILED to download {fileName} after retrying {self.max_retry} times!"
-                )
-                self.logger.info("----------------------------------")
-
-        def __download(fileName, url) -> bool:
-            """Do NOT call this method directly. Use `__download_with_retry` instead."""
-            filepath = os.path.join(self.target_dir, fileName)
-            try:
-                if currentThread.isInterruptionRequested():  # type: ignore
-                    return False
-                self.logger.info(f"Downloading {fileName}...")
-                # file already exists
-                if os.path.exists(filepath):
-                    if not self.overwrite:
-                        self.logger.info(f"[SKIP] {fileName} already exists")
-                        return True
-                    else:
-                        self.logger.warning(f"Overwriting file {fileName}")
-
-                r = self.session.get(url, stream=True)
-                with open(filepath, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                self.logger.info(f"[OK] {fileName} 下载完成")
-                self.logger.info("----------------------------------")
-                return True
-            except Exception as e:
-                self.logger.warning(f"下载{fileName}:{url}异常: {e}")
-                return False
-
-        with ThreadPool(max_workers=3) as executor:
-            # download images
-            for fileName, url in self.images:
-                executor.submit(__download_with_retry(fileName, url))
-            # download audios
-            for fileName, url in self.audios:
-                executor.submit(__download_with_retry, fileName, url)
+                self.failed.emit()
+
+        manager.run(
+            self.images + self.audios,
+            onFinished,
+            currentThread.isInterruptionRequested,  # type: ignore
+            onStarted=lambda _fileName: self.taskStarted.emit(),
+        )
         self.done.emit()
 
     @classmethod
     def close(cls):
-        cls.session.close()
+        DownloadManager.close()
@@ -0,0 +1,245 @@
+"""
+Macro benchmark of a whole sync: pull -> diff -> query -> note write -> download.
+
+Everything remote is replaced by local stand-ins (a dictionary serving synthetic pages, a query
+API answering synthetic results, an HTTP server on localhost serving audio), notes are written
+to a temporary collection. Each stage is recorded as its own measurement.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+from anki.collection import AddNoteRequest, Collection
+from anki.decks import DeckId
+from anki.notes import Note
+
+from addon.constants import (
+    MODEL_FIELDS,
+    MODEL_NAME,
+    FieldGroup,
+    normal_card_template_afmt,
+    normal_card_template_qfmt,
+)
+from addon.dictionary.base import AbstractDictionary, SimpleWord
+from addon.downloadManager import DownloadManager, DownloadQueue
+from addon.mediaStore import MediaStore, asset_filename
+from addon.misc import (
+    CredentialPlatformEnum,
+    PronunciationVariantEnum,
+    safe_load_empty_config,
+)
+from addon.noteManager import addNotesInBulk, fillNoteFields
+from addon.queryApi.base import (
+    AbstractQueryAPI,
+    QueryAPIPlatformEnum,
+    QueryAPIReturnType,
+)
+from addon.termIndex import TermIndex
+from addon.workers import QueryWorker, pullGroup
+
+from .generators import local_terms, synthetic_result, synthetic_wordbook
+from .harness import Suite
+
+DEFAULT_MACRO_SIZES = (1_000, 10_000)
+PAGE_SIZE = 100
+MAX_DOWNLOADS = 500  # audio files downloaded per run, the rest share their urls
+AUDIO_PAYLOAD = os.urandom(32 * 1024)
+
+
+class LocalDictionary(AbstractDictionary):
+    """Serves a synthetic wordbook page by page, `latency` seconds per request"""
+
+    name = "Local"
+    platform = CredentialPlatformEnum.NONE
+
+    def __init__(self, words: list[SimpleWord], latency: float = 0):
+        self.words = words
+        self.latency = latency
+        self.groups = [("Synthetic", 1)]
+
+    @staticmethod
+    def getLoginUrl() -> str:
+        return ""
+
+    @staticmethod
+    def loginCheckCallbackFn(cookie: dict[str, Any], content: str) -> bool:
+        return True
+
+    def checkCookie(self, cookie: dict[str, Any]) -> bool:
+        return True
+
+    def getGroups(self) -> list[tuple[str, int]]:
+        return self.groups
+
+    def getTotalPage(self, groupName: str, groupId: int) -> int:
+        return -(-len(self.words) // PAGE_SIZE)
+
+    def getWordsByPage(
+        self, pageNo: int, groupName: str, groupId: str
+    ) -> list[SimpleWord]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.words[pageNo * PAGE_SIZE : (pageNo + 1) * PAGE_SIZE]
+
+    @classmethod
+    def close(cls):
+        pass
+
+
+class LocalQueryAPI(AbstractQueryAPI):
+    """Answers synthetic results, `latency` seconds per query"""
+
+    name = "Local"
+    platform = QueryAPIPlatformEnum.APORA
+    latency = 0.0
+    audioBaseUrl = ""
+
+    @classmethod
+    def query(cls, term: SimpleWord) -> Optional[QueryAPIReturnType]:
+        if cls.latency:
+            time.sleep(cls.latency)
+        # words share audio like real TTS results do, `MAX_DOWNLOADS` distinct files at most
+        audioId = hash(term.term) % MAX_DOWNLOADS
+        return synthetic_result(
+            term, f"{cls.audioBaseUrl}/api/audio/token/{audioId}.wav"
+        )
+
+    @classmethod
+    def close(cls):
+        pass
+
+
+class _AudioHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(AUDIO_PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(AUDIO_PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _newCollection(path: str) -> tuple[Collection, Any, DeckId]:
+    col = Collection(path)
+    models = col.models
+    model = models.new(MODEL_NAME)
+    for name in MODEL_FIELDS:
+        models.add_field(model, models.new_field(name))
+    fg = FieldGroup()
+    template = models.new_template("Normal")
+    template["qfmt"] = normal_card_template_qfmt(fg)
+    template["afmt"] = normal_card_template_afmt(fg)
+    models.add_template(model, template)
+    models.add(model)
+    return col, models.by_name(MODEL_NAME), col.decks.id("Benchmark")
+
+
+def run(
+    suite: Suite,
+    sizes: list[int],
+    pageLatency: float = 0,
+    queryLatency: float = 0,
+    queryWorkers: int = 8,
+):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    LocalQueryAPI.latency = queryLatency
+    LocalQueryAPI.audioBaseUrl = f"http://127.0.0.1:{server.server_address[1]}"
+    config = safe_load_empty_config()
+    try:
+        for n in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                _runOnce(suite, n, Path(tmp), config, pageLatency, queryWorkers)
+    finally:
+        server.shutdown()
+        DownloadManager.close()
+
+
+def _runOnce(
+    suite: Suite, n: int, tmp: Path, config, pageLatency: float, queryWorkers: int
+):
+    params = {"n": n}
+    remoteWords = synthetic_wordbook(n)
+    dictionary = LocalDictionary(remoteWords, pageLatency)
+
+    # pull
+    start = time.perf_counter()
+    pulled = pullGroup(
+        dictionary,
+        "Synthetic",
+        1,
+        None,
+        lambda _total: None,
+        lambda: None,
+        lambda: False,
+    )
+    suite.record("pull", [time.perf_counter() - start], params, items=n)
+
+    # diff with a local deck holding most of the words
+    start = time.perf_counter()
+    remoteIndex = TermIndex(w.term for w in pulled)
+    termDiff = remoteIndex.diff(TermIndex(local_terms([w.term for w in remoteWords])))
+    suite.record("diff", [time.perf_counter() - start], params, items=n)
+    newWords = [SimpleWord(term) for term in termDiff.added]
+
+    # query
+    results: list[QueryAPIReturnType] = []
+    lock = threading.Lock()
+
+    def _onResult(result: QueryAPIReturnType):
+        with lock:
+            results.append(result)
+
+    worker = QueryWorker(
+        [(word, row) for row, word in enumerate(newWords)],
+        LocalQueryAPI,
+        max_workers=queryWorkers,
+        onResult=_onResult,
+    )
+    start = time.perf_counter()
+    worker.run()
+    suite.record("query", [time.perf_counter() - start], params, items=len(newWords))
+
+    # note write
+    col, model, deckId = _newCollection(str(tmp.joinpath("collection.anki2")))
+    try:
+        start = time.perf_counter()
+        noteRequests = []
+        for result in results:
+            note = Note(col, model)
+            fillNoteFields(
+                note, config, result, PronunciationVariantEnum.US, True, False
+            )
+            noteRequests.append(AddNoteRequest(note=note, deck_id=deckId))
+        addNotesInBulk(col, noteRequests)
+        suite.record(
+            "note write", [time.perf_counter() - start], params, items=len(noteRequests)
+        )
+        mediaDir = col.media.dir()
+    finally:
+        col.close()
+
+    # download
+    tasks = list(
+        dict.fromkeys(
+            (asset_filename(r.term_audio_url, "wav"), r.term_audio_url)
+            for r in results
+            if r.term_audio_url
+        )
+    )
+    manager = DownloadManager(
+        mediaDir,
+        queue=DownloadQueue(tmp.joinpath("download_queue.json")),
+        mediaStore=MediaStore(mediaDir, tmp.joinpath("media_store.json")),
+    )
+    manager.partialDir = tmp.joinpath("downloads")
+    start = time.perf_counter()
+    manager.run(tasks, lambda _fileName, _success: None, lambda: False)
+    suite.record("download", [time.perf_counter() - start], params, items=len(tasks))
@@ -0,0 +1,145 @@
+"""Micro benchmarks of the pure helpers on the sync path"""
+
+import os
+import tempfile
+
+from addon import utils
+from addon.constants import (
+    MODEL_FIELDS,
+    FieldGroup,
+    backwards_card_template_afmt,
+    backwards_card_template_qfmt,
+    normal_card_template_afmt,
+    normal_card_template_qfmt,
+)
+from addon.termIndex import TermIndex
+from addon.wordImporter import iter_words
+
+from .generators import (
+    local_terms,
+    synthetic_terms,
+    synthetic_wordbook,
+    write_word_list,
+)
+from .harness import Suite
+
+CALLS = 10_000  # calls per sample of the per-word helpers
+
+
+def bench_diff(suite: Suite, sizes: list[int]):
+    for n in sizes:
+        remote = synthetic_terms(n)
+        local = local_terms(remote)
+        params = {"n": n}
+        suite.bench(
+            "set_sub_ignore_case",
+            lambda: (
+                utils.set_sub_ignore_case(remote, set(local)),
+                utils.set_sub_ignore_case(local, set(remote)),
+            ),
+            params,
+            items=n,
+        )
+        suite.bench(
+            "TermIndex.diff",
+            lambda: TermIndex(remote).diff(TermIndex(local)),
+            params,
+            items=n,
+        )
+
+
+def bench_read_words(suite: Suite, sizes: list[int]):
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            words = synthetic_wordbook(n)
+            txtPath = os.path.join(tmp, f"words-{n}.txt")
+            csvPath = os.path.join(tmp, f"words-{n}.csv")
+            write_word_list(txtPath, words, "txt")
+            write_word_list(csvPath, words, "csv")
+            params = {"n": n}
+            suite.bench(
+                "read_words_from_file",
+                lambda: utils.read_words_from_file(txtPath),
+                params,
+                items=n,
+            )
+            suite.bench(
+                "iter_words[txt]",
+                lambda: sum(1 for _ in iter_words(txtPath)),
+                params,
+                items=n,
+            )
+            suite.bench(
+                "iter_words[csv]",
+                lambda: sum(1 for _ in iter_words(csvPath)),
+                params,
+                items=n,
+            )
+
+
+def bench_templates(suite: Suite):
+    fullGroup = FieldGroup()
+    reducedGroup = FieldGroup()
+    reducedGroup.definition_cn = ""
+    reducedGroup.pronunciation = ""
+
+    def _render(fg: FieldGroup):
+        normal_card_template_qfmt(fg)
+        normal_card_template_afmt(fg)
+        backwards_card_template_qfmt(fg)
+        backwards_card_template_afmt(fg)
+
+    for label, fg in (("all fields", fullGroup), ("reduced", reducedGroup)):
+        suite.bench(
+            "card templates (constants)",
+            lambda: [_render(fg) for _ in range(1000)],
+            {"fields": label},
+            items=1000,
+        )
+
+    try:
+        from addon.noteManager import renderCardTemplates
+    except ImportError as e:
+        print(f"skip renderCardTemplates: {e}")
+        return
+    renderCardTemplates(fullGroup)  # warm the memo
+    suite.bench(
+        "renderCardTemplates (memoized)",
+        lambda: [renderCardTemplates(fullGroup) for _ in range(1000)],
+        {"fields": "all fields"},
+        items=1000,
+    )
+
+
+def bench_filenames(suite: Suite):
+    terms = synthetic_terms(CALLS)
+    url = "https://apora.sumku.cc/api/audio/token/{}.wav"
+    suite.bench(
+        "default_audio_filename",
+        lambda: [utils.default_audio_filename(t, "wav") for t in terms],
+        items=CALLS,
+    )
+    suite.bench(
+        "audio_filename",
+        lambda: [utils.audio_filename(t, url.format(t), "wav") for t in terms],
+        items=CALLS,
+    )
+
+
+def bench_swap_positions(suite: Suite):
+    fields = list(MODEL_FIELDS)
+    swaps = [[fields[0], fields[-1]], [fields[1], fields[2]]]
+    suite.bench(
+        "swap_positions_with_list",
+        lambda: [utils.swap_positions_with_list(fields, swaps) for _ in range(CALLS)],
+        {"fields": len(fields), "swaps": len(swaps)},
+        items=CALLS,
+    )
+
+
+def run(suite: Suite, sizes: list[int]):
+    bench_diff(suite, sizes)
+    bench_read_words(suite, sizes)
+    bench_templates(suite)
+    bench_filenames(suite)
+    bench_swap_positions(suite)
@@ -0,0 +1,129 @@
+"""
+Memory used per word by `SimpleWord` and `QueryAPIReturnType`, compared with the `__dict__`
+based classes they used to be. Run from the repository root:
+
+    python -m test.benchmarks.bench_word_memory -n 100000
+"""
+
+import argparse
+import gc
+import pickle
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from addon.dictionary.base import SimpleWord
+from addon.queryApi.base import QueryAPIReturnType
+
+BOOKS = 20
+PARTS_OF_SPEECH = ["noun", "verb", "adjective", "adverb", "phrase"]
+
+
+class DictSimpleWord:
+    """`SimpleWord` before: instance `__dict__`, no interning"""
+
+    def __init__(self, term: str, trans="", modifiedTime=0, bookId=0, bookName=""):
+        self.term = term
+        self.trans = trans
+        self.modifiedTime = modifiedTime
+        self.bookId = bookId
+        self.bookName = bookName
+
+
+@dataclass
+class DictQueryAPIReturnType:
+    """`QueryAPIReturnType` before: plain dataclass, no interning"""
+
+    term: str
+    definition: str
+    part_of_speech: str
+    ipa: str
+    original: str
+    chinese_definition: Optional[str]
+    context: Optional[str]
+    collocation: Optional[list[str]]
+    term_audio_url: Optional[str]
+    context_audio_url: Optional[str]
+    replacing: Optional[str]
+    translation: Optional[str]
+
+
+def _decoded(text: str) -> str:
+    """A new string object, like every value decoded from a JSON response"""
+    return text.encode("utf-8").decode("utf-8")
+
+
+def make_word(cls: type, i: int):
+    return cls(
+        f"word{i}",
+        f"n. 释义{i}",
+        modifiedTime=1_700_000_000_000 + i,
+        bookId=i % BOOKS,
+        bookName=_decoded(f"Wordbook {i % BOOKS}"),
+    )
+
+
+def make_result(cls: type, i: int):
+    return cls(
+        term=f"word{i}",
+        definition=f"definition of word{i}",
+        part_of_speech=_decoded(PARTS_OF_SPEECH[i % len(PARTS_OF_SPEECH)]),
+        ipa=f"wɜːd{i}",
+        original=f"word{i}",
+        chinese_definition=f"释义{i}",
+        context=f"A sentence using word{i}.",
+        collocation=None,
+        term_audio_url=None,
+        context_audio_url=None,
+        replacing=f"word{i}",
+        translation=f"使用 word{i} 的句子。",
+    )
+
+
+def measure(factory: Callable[[int], object], n: int) -> tuple[float, float]:
+    """:return: (traced bytes per object, pickled bytes per object)"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL))
+    return (after - before) / n, pickled / n
+
+
+CASES = [
+    ("SimpleWord", DictSimpleWord, SimpleWord, make_word),
+    ("QueryAPIReturnType", DictQueryAPIReturnType, QueryAPIReturnType, make_result),
+]
+
+
+def run(suite, sizes: list[int]):
+    """Record bytes per object (traced and pickled) of both classes in `suite`"""
+    for n in sizes:
+        for name, before, after, make in CASES:
+            for label, cls in (("before", before), ("after", after)):
+                memory, pickled = measure(lambda i: make(cls, i), n)
+                params = {"n": n, "class": label}
+                suite.record(f"{name} memory", [memory], params, unit="B")
+                suite.record(f"{name} pickle", [pickled], params, unit="B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=100_000, help="objects per measurement")
+    args = parser.parse_args()
+
+    print(
+        f"{'':<20}{'before B/obj':>14}{'after B/obj':>14}{'pickle before':>15}{'pickle after':>14}"
+    )
+    for name, before, after, make in CASES:
+        memBefore, pickleBefore = measure(lambda i: make(before, i), args.n)
+        memAfter, pickleAfter = measure(lambda i: make(after, i), args.n)
+        print(
+            f"{name:<20}{memBefore:>14.1f}{memAfter:>14.1f}{pickleBefore:>15.1f}{pickleAfter:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
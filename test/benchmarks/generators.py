@@ -0,0 +1,97 @@
+"""Deterministic synthetic wordbooks, local decks and query results (1k - 200k terms)"""
+
+import csv
+import random
+import string
+from typing import Iterable
+
+from addon.dictionary.base import SimpleWord
+from addon.queryApi.base import QueryAPIReturnType
+from addon.termIndex import canonical_term
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+ALL_SIZES = (1_000, 10_000, 50_000, 200_000)
+BOOKS = 10
+PARTS_OF_SPEECH = ["noun", "verb", "adjective", "adverb", "phrase", "preposition"]
+
+
+def synthetic_terms(n: int, seed: int = 0) -> list[str]:
+    """`n` distinct terms: words of 3-12 letters, 10% two-word phrases, some capitalized"""
+    rng = random.Random(seed)
+    seen: set[str] = set()
+    terms: list[str] = []
+
+    def _word() -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+
+    while len(terms) < n:
+        term = f"{_word()} {_word()}" if rng.random() < 0.1 else _word()
+        if rng.random() < 0.05:
+            term = term.capitalize()
+        key = canonical_term(term)
+        if key in seen:
+            continue
+        seen.add(key)
+        terms.append(term)
+    return terms
+
+
+def synthetic_wordbook(n: int, seed: int = 0) -> list[SimpleWord]:
+    """A pulled wordbook of `n` words spread over `BOOKS` books"""
+    rng = random.Random(seed)
+    return [
+        SimpleWord(
+            term,
+            trans=f"n. 释义{i}",
+            modifiedTime=1_700_000_000_000 + i * 1000,
+            bookId=i % BOOKS,
+            bookName=f"Wordbook {i % BOOKS}",
+        )
+        for i, term in enumerate(synthetic_terms(n, rng.randint(0, 1 << 30)))
+    ]
+
+
+def local_terms(
+    remote: list[str], kept: float = 0.8, extra: float = 0.1, seed: int = 1
+) -> list[str]:
+    """
+    Terms of a local deck that already has `kept` of the remote terms (20% of them spelled with
+    another case) plus `extra` * len(remote) terms deleted remotely.
+    """
+    rng = random.Random(seed)
+    local = []
+    for term in remote:
+        if rng.random() < kept:
+            local.append(term.upper() if rng.random() < 0.2 else term)
+    local.extend(f"deleted{i}" for i in range(int(len(remote) * extra)))
+    rng.shuffle(local)
+    return local
+
+
+def synthetic_result(word: SimpleWord, audioUrl: str = "") -> QueryAPIReturnType:
+    i = len(word.term)
+    return QueryAPIReturnType(
+        term=word.term,
+        definition=f"A synthetic definition of {word.term}.",
+        part_of_speech=PARTS_OF_SPEECH[i % len(PARTS_OF_SPEECH)],
+        ipa=f"/{word.term}/",
+        original=word.term,
+        chinese_definition=word.trans,
+        context=f"This sentence uses {word.term} in a context.",
+        collocation=None,
+        term_audio_url=audioUrl or None,
+        context_audio_url=audioUrl or None,
+        replacing=word.term,
+        translation=f"这个句子在上下文中使用了 {word.term}。",
+    )
+
+
+def write_word_list(path: str, words: Iterable[SimpleWord], fmt: str = "txt"):
+    """`txt`: the legacy tab separated format, `csv`: with a header row"""
+    with open(path, "w", encoding="utf8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["Word", "Meaning", "Book"])
+            writer.writerows([w.term, w.trans, w.bookName] for w in words)
+        else:
+            f.writelines("\t".join(w.to_values()) + "\n" for w in words)
@@ -0,0 +1,154 @@
+"""Timing, result records and JSON reports shared by the benchmark modules"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class Result:
+    suite: str
+    name: str
+    params: dict[str, Any]
+    samples: list[float]
+    unit: str = "s"
+    items: int = 1
+    """items processed by one sample, e.g. words, to report per item figures"""
+
+    @property
+    def key(self) -> str:
+        """Identity of the measurement across runs"""
+        return f"{self.suite}/{self.name}/{json.dumps(self.params, sort_keys=True)}"
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "key": self.key,
+            "suite": self.suite,
+            "name": self.name,
+            "params": self.params,
+            "unit": self.unit,
+            "items": self.items,
+            "min": min(self.samples),
+            "median": self.median,
+            "mean": statistics.fmean(self.samples),
+            "stdev": statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0,
+            "per_item": self.median / self.items if self.items else None,
+            "samples": self.samples,
+        }
+
+
+@dataclass
+class Suite:
+    name: str
+    repeat: int = 5
+    results: list[Result] = field(default_factory=list)
+
+    def bench(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        params: Optional[dict[str, Any]] = None,
+        items: int = 1,
+        repeat: Optional[int] = None,
+        setup: Optional[Callable[[], Any]] = None,
+    ) -> Result:
+        """Time `fn()` `repeat` times, `setup()` runs before every sample and is not timed"""
+        samples = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            gc.collect()
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return self.record(name, samples, params, items=items)
+
+    def record(
+        self,
+        name: str,
+        samples: list[float],
+        params: Optional[dict[str, Any]] = None,
+        unit: str = "s",
+        items: int = 1,
+    ) -> Result:
+        result = Result(self.name, name, params or {}, samples, unit=unit, items=items)
+        self.results.append(result)
+        print(
+            f"{result.suite:>6} {result.name:<40} {json.dumps(result.params):<28}"
+            f" {_format(result.median, unit):>12}"
+            f" {_format(result.median / items, unit) + '/item' if items > 1 else '':>16}",
+            flush=True,
+        )
+        return result
+
+
+def _format(value: float, unit: str) -> str:
+    if unit != "s":
+        return f"{value:,.1f} {unit}"
+    for scale, suffix in ((1, "s"), (1e-3, "ms"), (1e-6, "µs")):
+        if value >= scale:
+            return f"{value / scale:.2f} {suffix}"
+    return f"{value * 1e9:.0f} ns"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def write_report(results: list[Result], path: str, argv: Optional[list[str]] = None):
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "argv": argv if argv is not None else sys.argv[1:],
+        "results": [r.summary() for r in results],
+    }
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+
+def compare_reports(baselinePath: str, results: list[Result], threshold: float) -> int:
+    """
+    Print the median ratio (current / baseline) of every measurement found in both.
+    :return: number of measurements slower (or bigger) than `threshold` times the baseline
+    """
+    with open(baselinePath, "r", encoding="utf8") as f:
+        baseline = {r["key"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\ncompared with {baselinePath} (ratio = current / baseline median)")
+    for result in results:
+        old = baseline.get(result.key)
+        if old is None or not old["median"]:
+            continue
+        ratio = result.median / old["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            flag = "  (faster)"
+        print(f"{result.key:<80} {ratio:6.2f}x{flag}")
+    return regressions
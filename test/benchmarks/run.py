@@ -0,0 +1,103 @@
+"""
+Run the benchmarks and write their results as JSON. Run from the repository root:
+
+    python -m test.benchmarks.run -o bench_output.json
+    python -m test.benchmarks.run --suite micro --sizes 1000,200000
+    python -m test.benchmarks.run --compare baseline.json --threshold 1.2
+
+The add-on modules import `aqt`, so run it with Anki's Python environment. The macro suite also
+writes notes to a temporary collection and is skipped when `anki` cannot be imported.
+Exits with status 1 if `--compare` finds a regression.
+"""
+
+import argparse
+import sys
+
+from .generators import ALL_SIZES, DEFAULT_SIZES
+from .harness import Suite, compare_reports, write_report
+
+SUITES = ("micro", "macro", "memory")
+
+
+def _sizes(value: str) -> list[int]:
+    if value == "all":
+        return list(ALL_SIZES)
+    return [int(n.replace("_", "")) for n in value.split(",") if n]
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--suite", choices=SUITES + ("all",), default="all")
+    parser.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=list(DEFAULT_SIZES),
+        help=f"comma separated wordbook sizes, or `all` for {ALL_SIZES}",
+    )
+    parser.add_argument(
+        "--macro-sizes",
+        type=_sizes,
+        default=None,
+        help="wordbook sizes of the macro suite, defaults to the sizes up to 10000",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="samples per micro benchmark"
+    )
+    parser.add_argument(
+        "--page-latency", type=float, default=0, help="seconds per page pulled"
+    )
+    parser.add_argument(
+        "--query-latency", type=float, default=0, help="seconds per query"
+    )
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="report to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="median ratio over the baseline reported as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    suites = SUITES if args.suite == "all" else (args.suite,)
+    results = []
+    for name in suites:
+        suite = Suite(name, repeat=args.repeat)
+        print(f"\n== {name} ==")
+        if name == "micro":
+            from . import bench_micro
+
+            bench_micro.run(suite, args.sizes)
+        elif name == "memory":
+            from . import bench_word_memory
+
+            bench_word_memory.run(suite, args.sizes)
+        else:
+            try:
+                from . import bench_macro
+            except ImportError as e:
+                print(f"skip macro suite: {e}")
+                continue
+            macroSizes = args.macro_sizes or [n for n in args.sizes if n <= 10_000]
+            bench_macro.run(
+                suite,
+                macroSizes or bench_macro.DEFAULT_MACRO_SIZES,
+                pageLatency=args.page_latency,
+                queryLatency=args.query_latency,
+            )
+        results.extend(suite.results)
+
+    write_report(results, args.output, argv)
+    print(f"\nresults written to {args.output}")
+    if args.compare:
+        regressions = compare_reports(args.compare, results, args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold}x")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,118 @@
+import io
+import json
+
+import requests
+
+from addon.downloadManager import DownloadManager, DownloadQueue
+from addon.mediaStore import MediaStore
+
+TOKEN = "secret-token"
+AUDIO_URL = f"https://apora.sumku.cc/api/audio/{TOKEN}/abc.wav"
+IMAGE_URL = "https://example.com/apple.png"
+
+
+def test_queue_is_saved_without_the_token(tmp_path):
+    path = tmp_path / "queue.json"
+    queue = DownloadQueue(path)
+    queue.add(str(tmp_path), [("a.wav", AUDIO_URL), ("b.png", IMAGE_URL)])
+    queue.save()
+
+    assert TOKEN not in path.read_text(encoding="utf8")
+    # the url is built again with the token of the next session
+    assert DownloadQueue(path).pending(str(tmp_path), "new-token") == [
+        ("a.wav", "https://apora.sumku.cc/api/audio/new-token/abc.wav"),
+        ("b.png", IMAGE_URL),
+    ]
+
+
+def test_queue_keeps_audios_while_there_is_no_token(tmp_path):
+    queue = DownloadQueue(tmp_path / "queue.json")
+    queue.add(str(tmp_path), [("a.wav", AUDIO_URL), ("b.png", IMAGE_URL)])
+
+    assert queue.pending(str(tmp_path), "") == [("b.png", IMAGE_URL)]
+    assert len(queue.pending(str(tmp_path), TOKEN)) == 2
+
+
+def test_queue_saved_with_urls_is_read(tmp_path):
+    path = tmp_path / "queue.json"
+    path.write_text(
+        json.dumps({str(tmp_path): [["a.wav", AUDIO_URL]]}), encoding="utf8"
+    )
+
+    queue = DownloadQueue(path)
+    assert queue.pending(str(tmp_path), TOKEN) == [("a.wav", AUDIO_URL)]
+    queue.save()
+    assert TOKEN not in path.read_text(encoding="utf8")
+
+
+def test_queue_is_saved_once_changed(tmp_path):
+    path = tmp_path / "queue.json"
+    queue = DownloadQueue(path)
+    for i in range(100):
+        queue.add(str(tmp_path), [(f"{i}.png", f"{IMAGE_URL}?{i}")])
+    assert not path.exists()
+
+    queue.save()
+    mtime = path.stat().st_mtime_ns
+    queue.save()  # nothing changed, nothing written
+    assert path.stat().st_mtime_ns == mtime
+
+    queue.remove(str(tmp_path), "0.png")
+    queue.remove(str(tmp_path), "missing.png")
+    queue.save()
+    assert len(DownloadQueue(path).pending(str(tmp_path), TOKEN)) == 99
+
+
+class FakeSession:
+    """Answers every request with `status`"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.requests = 0
+
+    def get(self, url, **kwargs) -> requests.Response:
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = self.status
+        response.url = url
+        response.raw = io.BytesIO()
+        return response
+
+
+def make_manager(tmp_path, status: int) -> DownloadManager:
+    manager = DownloadManager(
+        str(tmp_path),
+        queue=DownloadQueue(tmp_path / "queue.json"),
+        mediaStore=MediaStore(str(tmp_path), tmp_path / "manifest.json"),
+        maxRetry=2,
+        backoff=0,
+    )
+    manager.partialDir = tmp_path / "partial"
+    manager.session = FakeSession(status)  # type: ignore
+    return manager
+
+
+def run(manager: DownloadManager) -> dict[str, bool]:
+    results = {}
+    manager.run(
+        [("a.wav", AUDIO_URL)],
+        lambda fileName, success: results.__setitem__(fileName, success),
+        lambda: False,
+    )
+    return results
+
+
+def test_permanent_failure_is_dropped(tmp_path):
+    manager = make_manager(tmp_path, 404)
+
+    assert run(manager) == {"a.wav": False}
+    assert manager.session.requests == 1  # type: ignore
+    assert manager.queue.pending(str(tmp_path), TOKEN) == []
+
+
+def test_retryable_failure_is_kept(tmp_path):
+    manager = make_manager(tmp_path, 503)
+
+    assert run(manager) == {"a.wav": False}
+    assert manager.session.requests == 3  # type: ignore
+    assert manager.queue.pending(str(tmp_path), TOKEN) == [("a.wav", AUDIO_URL)]
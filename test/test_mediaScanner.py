@@ -0,0 +1,54 @@
+import unicodedata
+
+from addon.mediaScanner import (
+    find_missing_media,
+    get_image_references,
+    get_sound_references,
+    snapshot_media_dir,
+)
+
+MID = 1
+# term, image, sound-uk, sound-us
+FIELD_ORDINALS = {MID: (0, [1], [2, 3])}
+
+
+def test_sound_references():
+    assert get_sound_references("") == []
+    assert get_sound_references("[sound:a.wav] apple [sound:b c.mp3]") == [
+        "a.wav",
+        "b c.mp3",
+    ]
+    # filenames are compared in NFC
+    decomposed = unicodedata.normalize("NFD", "café.wav")
+    assert get_sound_references(f"[sound:{decomposed}]") == ["café.wav"]
+
+
+def test_image_references():
+    assert get_image_references(
+        '<img src="a%20b.png"> <img class="x" src=\'c&amp;d.jpg\'>'
+        '<img src="https://example.com/e.png">'
+    ) == ["a b.png", "c&d.jpg"]
+
+
+def test_snapshot_media_dir(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"")
+    (tmp_path / unicodedata.normalize("NFD", "café.wav")).write_bytes(b"")
+    (tmp_path / "folder").mkdir()
+
+    assert snapshot_media_dir(str(tmp_path)) == {"a.wav", "café.wav"}
+
+
+def test_find_missing_media(tmp_path):
+    for name in ("apple.png", "apple-uk.wav"):
+        (tmp_path / name).write_bytes(b"")
+    rows = [
+        (1, MID, 'apple\x1f<img src="apple.png">\x1f[sound:apple-uk.wav]\x1f'),
+        (2, MID, 'banana\x1f<img src="banana.png">\x1f\x1f[sound:banana.wav]'),
+        (3, MID, "cherry\x1f\x1f\x1f"),
+        (4, 2, "other notetype\x1f\x1f[sound:missing.wav]\x1f"),
+        (5, MID, "\x1f\x1f[sound:no-term.wav]\x1f"),
+    ]
+
+    assert find_missing_media(
+        rows, FIELD_ORDINALS, snapshot_media_dir(str(tmp_path))
+    ) == [(2, "banana", ["banana.png", "banana.wav"])]
@@ -0,0 +1,73 @@
+import os
+
+from addon.mediaStore import MediaStore, asset_filename, asset_key, asset_url
+
+TOKEN = "secret-token"
+AUDIO_URL = f"https://apora.sumku.cc/api/audio/{TOKEN}/abc.wav"
+IMAGE_URL = "https://example.com/apple.png"
+
+
+def test_asset_key_drops_the_token():
+    assert asset_key(AUDIO_URL) == "apora:abc.wav"
+    assert asset_key(AUDIO_URL.replace(TOKEN, "new-token")) == "apora:abc.wav"
+    assert asset_key(IMAGE_URL) == IMAGE_URL
+
+    assert asset_url(asset_key(AUDIO_URL), TOKEN) == AUDIO_URL
+    assert asset_url(asset_key(AUDIO_URL), "") is None
+    assert asset_url(IMAGE_URL, "") == IMAGE_URL
+
+
+def test_asset_filename_is_stable():
+    filename = asset_filename(AUDIO_URL, "wav")
+    assert filename == asset_filename(AUDIO_URL.replace(TOKEN, "new-token"), "wav")
+    assert filename.startswith("APORA-") and filename.endswith(".wav")
+    assert len(filename) == len("APORA-.wav") + 20
+    assert TOKEN not in filename
+    assert asset_filename(IMAGE_URL, "png") != asset_filename(AUDIO_URL, "png")
+
+
+def write(tmp_path, filename: str, content: bytes = b"payload"):
+    (tmp_path / filename).write_bytes(content)
+
+
+def test_same_content_is_linked(tmp_path):
+    store = MediaStore(str(tmp_path), tmp_path / "store.json")
+    write(tmp_path, "a.wav")
+    store.commit(AUDIO_URL, "a.wav")
+    # another url with the same payload
+    write(tmp_path, "b.wav")
+    store.commit(IMAGE_URL, "b.wav")
+
+    assert os.path.samefile(tmp_path / "a.wav", tmp_path / "b.wav")
+
+    # the payload of a known url is linked to the filename of another deck
+    assert store.has(AUDIO_URL, "c.wav")
+    assert os.path.samefile(tmp_path / "a.wav", tmp_path / "c.wav")
+
+    store.save()
+    reloaded = MediaStore(str(tmp_path), tmp_path / "store.json")
+    assert reloaded.has(AUDIO_URL, "d.wav")
+
+
+def test_copy_without_hard_links(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise OSError("hard links are not supported")
+
+    monkeypatch.setattr(os, "link", link)
+    store = MediaStore(str(tmp_path), tmp_path / "store.json")
+    write(tmp_path, "a.wav")
+    store.commit(AUDIO_URL, "a.wav")
+
+    assert store.has(AUDIO_URL, "b.wav")
+    assert (tmp_path / "b.wav").read_bytes() == b"payload"
+    assert not os.path.samefile(tmp_path / "a.wav", tmp_path / "b.wav")
+
+
+def test_unknown_or_missing_payload(tmp_path):
+    store = MediaStore(str(tmp_path), tmp_path / "store.json")
+    assert not store.has(AUDIO_URL, "a.wav")
+
+    write(tmp_path, "a.wav")
+    store.commit(AUDIO_URL, "a.wav")
+    (tmp_path / "a.wav").unlink()
+    assert not store.has(AUDIO_URL, "b.wav")
@@ -0,0 +1,64 @@
+from anki.collection import Collection
+
+from addon.constants import MODEL_FIELDS, MODEL_NAME
+from addon.noteIndex import NoteIndex, fieldsBitmap
+
+MID = 1
+
+
+def make_index(tmp_path, notes: dict[int, dict[str, str]]) -> NoteIndex:
+    index = NoteIndex(tmp_path / "index.json")
+    index.fieldNames[MID] = list(MODEL_FIELDS)
+    for nid, values in notes.items():
+        fields = [values.get(name, "") for name in MODEL_FIELDS]
+        index._put(nid, values["term"], [1], MID, fieldsBitmap(fields, MODEL_FIELDS))
+    return index
+
+
+def test_notes_with_empty_fields(tmp_path):
+    index = make_index(
+        tmp_path,
+        {
+            1: {"term": "look up", "definition": "to search"},
+            2: {"term": "apple", "ipa": "ˈæp.əl", "definition": "a fruit"},
+        },
+    )
+    assert sorted(index.notesWithEmptyFields(["ipa", "definition"])) == [(1, "look up")]
+    assert index.notesWithEmptyFields(["definition"]) == []
+    # blank values count as empty
+    index._put(3, "banana", [1], MID, fieldsBitmap([" "], ["definition"]))
+    assert index.notesWithEmptyFields(["definition"]) == [(3, "banana")]
+
+
+def make_collection(tmp_path):
+    col = Collection(str(tmp_path / "collection.anki2"))
+    model = col.models.new(MODEL_NAME)
+    for name in MODEL_FIELDS:
+        col.models.add_field(model, col.models.new_field(name))
+    for name, front in (("forward", "{{term}}"), ("backward", "{{term}}?")):
+        template = col.models.new_template(name)
+        template["qfmt"], template["afmt"] = front, "{{definition}}"
+        col.models.add_template(model, template)
+    col.models.add(model)
+    return col
+
+
+def test_note_split_across_decks(tmp_path):
+    col = make_collection(tmp_path)
+    try:
+        deckA = col.decks.id("A")
+        deckB = col.decks.id("B")
+        note = col.new_note(col.models.by_name(MODEL_NAME))  # type: ignore
+        note["term"] = "apple"
+        col.add_note(note, deckA)  # type: ignore
+        # the first card is moved away, the second one stays in A
+        forward, backward = sorted(note.cards(), key=lambda card: card.ord)
+        col.set_deck([forward.id], deckB)  # type: ignore
+
+        index = NoteIndex(tmp_path / "index.json")
+        assert index.ensureValid(col)
+        assert index.termsInDecks([deckA]) == [(note.id, "apple")]
+        assert index.termsInDecks([deckB]) == [(note.id, "apple")]
+        assert index.termsInDecks([col.decks.id("C")]) == []
+    finally:
+        col.close()
@@ -0,0 +1,22 @@
+from anki.collection import Collection
+
+from addon.noteManager import findUnreferencedSounds
+
+
+def test_find_unreferenced_sounds(tmp_path):
+    col = Collection(str(tmp_path / "collection.anki2"))
+    try:
+        basic = col.models.by_name("Basic")
+        for front, back in [
+            ("apple [sound:APORA-a.wav]", ""),
+            ("banana", "[sound:APORA_b*.wav]"),  # another field, search wildcards
+        ]:
+            note = col.new_note(basic)  # type: ignore
+            note["Front"], note["Back"] = front, back
+            col.add_note(note, 1)  # type: ignore
+
+        assert findUnreferencedSounds(
+            col, ["APORA-a.wav", "APORA_b*.wav", "APORA_bc.wav", "APORA-c.wav"]
+        ) == ["APORA_bc.wav", "APORA-c.wav"]
+    finally:
+        col.close()
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from addon.constants import RUN_REPORT_KEEP
+from addon.runReport import RunReport, format_seconds
+
+
+def make_report() -> RunReport:
+    report = RunReport()
+    origin = report.origin
+    # two pages fetched one after the other, two queries running concurrently
+    report.record("pull", origin + 0.0, origin + 1.0)
+    report.record("pull", origin + 1.0, origin + 3.0)
+    report.record("query", origin + 3.0, origin + 4.0)
+    report.record("query", origin + 3.0, origin + 4.5, failed=True)
+    return report
+
+
+def test_stage_timings():
+    stages = make_report().summary()["stages"]
+    assert list(stages) == ["pull", "query"]
+    pull = stages["pull"]
+    assert (pull["count"], pull["start"], pull["wall"], pull["busy"]) == (2, 0, 3, 3)
+    assert (pull["p50"], pull["max"]) == (2, 2)
+    assert (stages["query"]["wall"], stages["query"]["busy"]) == (1.5, 2.5)
+    assert (stages["query"]["failed"], stages["pull"]["failed"]) == (1, 0)
+
+
+def test_stage_failures():
+    report = RunReport()
+    with report.stage("query"):
+        pass
+    with report.stage("query") as timer:
+        timer.failed = True
+    with pytest.raises(ValueError):
+        with report.stage("query"):
+            raise ValueError
+
+    timing = report.stages["query"]
+    assert (timing.count, timing.failed) == (3, 2)
+
+
+def test_counters():
+    report = RunReport()
+    report.count("added")
+    report.count("added", 2)
+    report.count("skipped")
+    assert report.summary()["counters"] == {"added": 3, "skipped": 1}
+
+
+def test_nothing_is_recorded_once_finished():
+    report = make_report()
+    report.finish()
+    report.finish("cancelled")  # the first status is kept
+    report.count("added")
+    with report.stage("download"):
+        pass
+
+    summary = report.summary()
+    assert summary["status"] == "completed"
+    assert list(summary["stages"]) == ["pull", "query"]
+    assert summary["counters"] == {}
+
+
+def test_format():
+    assert [format_seconds(s) for s in (0.0123, 2.5, 75.25)] == [
+        "12ms",
+        "2.50s",
+        "1m15.2s",
+    ]
+    report = make_report()
+    report.count("added", 2)
+    report.finish()
+    lines = report.formatLines()
+    assert lines[0].startswith("Run report (completed): ")
+    assert lines[1].split()[:3] == ["pull", "n=2", "wall=3.00s"]
+    assert lines[2].endswith("failed=1")
+    assert lines[3] == "  added=2"
+
+
+def test_export(tmp_path):
+    for i in range(RUN_REPORT_KEEP):
+        tmp_path.joinpath(f"run-20000101-0000{i:02}-sync.json").write_text("{}")
+    tmp_path.joinpath("run-20000101-000000-sync.log").write_text("")
+    report = make_report()
+    report.finish()
+
+    path = report.export(tmp_path, log="log lines")
+
+    assert json.loads(path.read_text(encoding="utf8")) == report.summary()
+    assert path.with_suffix(".log").read_text(encoding="utf8") == "log lines"
+    # the oldest run is removed with its log
+    assert len(list(tmp_path.glob("run-*.json"))) == RUN_REPORT_KEEP
+    assert not tmp_path.joinpath("run-20000101-000000-sync.json").exists()
+    assert not tmp_path.joinpath("run-20000101-000000-sync.log").exists()
@@ -0,0 +1,185 @@
+import json
+
+from addon.dictionary.base import AbstractDictionary, GroupState, SimpleWord
+from addon.dictionary.snapshot import WordbookSnapshotCache
+from addon.misc import CredentialPlatformEnum
+from addon.workers import pullGroup
+
+GROUP_ID = 7
+
+
+class FakeDictionary(AbstractDictionary):
+    """Serves fixed pages, counts page requests, answers `getGroupState` with `fingerprint`"""
+
+    name = "Fake"
+    platform = CredentialPlatformEnum.YOUDAO
+
+    def __init__(self, pages: list[list[str]], fingerprint: str = "v1"):
+        self.pages = [
+            [SimpleWord(term, trans=f"{term}-trans") for term in page] for page in pages
+        ]
+        self.fingerprint = fingerprint
+        self.notModified = False
+        self.failedPages: set[int] = set()
+        self.pageRequests = 0
+        self.groups = [("Group", GROUP_ID)]
+
+    @staticmethod
+    def getLoginUrl() -> str:
+        return ""
+
+    @staticmethod
+    def loginCheckCallbackFn(cookie, content) -> bool:
+        return True
+
+    def checkCookie(self, cookie) -> bool:
+        return True
+
+    def getGroups(self):
+        return self.groups
+
+    def getTotalPage(self, groupName, groupId) -> int:
+        return len(self.pages)
+
+    def getGroupState(self, groupName, groupId, validators=None) -> GroupState:
+        return GroupState(
+            totalPage=len(self.pages),
+            fingerprint=self.fingerprint,
+            notModified=self.notModified,
+        )
+
+    def getWordsByPage(self, pageNo, groupName, groupId):
+        self.pageRequests += 1
+        if pageNo in self.failedPages:
+            return []
+        return self.pages[pageNo]
+
+    @classmethod
+    def close(cls):
+        pass
+
+
+def pull(dictionary: FakeDictionary, cache: WordbookSnapshotCache) -> list[str]:
+    words = pullGroup(
+        dictionary,
+        "Group",
+        GROUP_ID,
+        cache,
+        lambda _total: None,
+        lambda: None,
+        lambda: False,
+    )
+    return [word.term for word in words]
+
+
+def make_dictionary(**kwargs) -> FakeDictionary:
+    return FakeDictionary(
+        [["apple", "banana"], ["cherry", "date"], ["elder"]], **kwargs
+    )
+
+
+def test_miss_then_hit(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary()
+
+    assert pull(dictionary, cache) == ["apple", "banana", "cherry", "date", "elder"]
+    assert dictionary.pageRequests == 3
+
+    # unchanged group: served from the snapshot, no page is requested
+    assert pull(dictionary, cache) == ["apple", "banana", "cherry", "date", "elder"]
+    assert dictionary.pageRequests == 3
+
+
+def test_snapshot_keeps_word_values(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary()
+    pull(dictionary, cache)
+
+    snapshot = cache.get(dictionary.platform, GROUP_ID)
+    assert snapshot is not None
+    assert [w.trans for w in snapshot.words()][:2] == ["apple-trans", "banana-trans"]
+
+
+def test_changed_fingerprint_pulls_again(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary()
+    pull(dictionary, cache)
+
+    dictionary.fingerprint = "v2"
+    dictionary.pages[2].append(SimpleWord("fig"))
+    assert pull(dictionary, cache)[-1] == "fig"
+    assert dictionary.pageRequests == 6
+
+
+def test_not_modified_is_a_hit(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary()
+    pull(dictionary, cache)
+
+    dictionary.fingerprint = ""
+    dictionary.notModified = True
+    assert len(pull(dictionary, cache)) == 5
+    assert dictionary.pageRequests == 3
+
+
+def test_without_fingerprint_nothing_is_cached(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary(fingerprint="")
+    pull(dictionary, cache)
+    pull(dictionary, cache)
+
+    assert cache.get(dictionary.platform, GROUP_ID) is None
+    assert dictionary.pageRequests == 6
+
+
+def test_partial_pull_is_not_cached(tmp_path):
+    cache = WordbookSnapshotCache(tmp_path / "snapshot.json")
+    dictionary = make_dictionary()
+    dictionary.failedPages = {1}
+
+    assert pull(dictionary, cache) == ["apple", "banana", "elder"]
+    assert cache.get(dictionary.platform, GROUP_ID) is None
+
+    # the next pull requests every page again, and caches the complete group
+    dictionary.failedPages = set()
+    assert len(pull(dictionary, cache)) == 5
+    assert dictionary.pageRequests == 6
+    assert cache.get(dictionary.platform, GROUP_ID) is not None
+
+
+def test_damaged_page_invalidates_the_snapshot(tmp_path):
+    path = tmp_path / "snapshot.json"
+    cache = WordbookSnapshotCache(path)
+    dictionary = make_dictionary()
+    pull(dictionary, cache)
+    cache.save()
+
+    data = json.loads(path.read_text(encoding="utf8"))
+    (raw,) = data.values()
+    raw["pages"][1][0][0] = "tampered"
+    path.write_text(json.dumps(data), encoding="utf8")
+
+    cache = WordbookSnapshotCache(path)
+    assert cache.get(dictionary.platform, GROUP_ID) is None
+    assert "tampered" not in pull(dictionary, cache)
+    assert dictionary.pageRequests == 6
+
+
+def test_save_and_reload(tmp_path):
+    path = tmp_path / "nested" / "snapshot.json"
+    cache = WordbookSnapshotCache(path)
+    dictionary = make_dictionary()
+    pull(dictionary, cache)
+    cache.save()
+
+    reloaded = WordbookSnapshotCache(path)
+    assert len(pull(dictionary, reloaded)) == 5
+    assert dictionary.pageRequests == 3
+
+
+def test_corrupted_file_is_discarded(tmp_path):
+    path = tmp_path / "snapshot.json"
+    path.write_text("{not json", encoding="utf8")
+
+    cache = WordbookSnapshotCache(path)
+    assert cache.get(CredentialPlatformEnum.YOUDAO, GROUP_ID) is None
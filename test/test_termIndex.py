@@ -0,0 +1,65 @@
+import pytest
+
+from addon.termIndex import TermIndex, canonical_term
+
+
+@pytest.mark.parametrize(
+    "variant, term",
+    [
+        ("Ｃａｆé", "café"),  # full-width letters
+        ("ｗｏｒｄ", "word"),
+        ("CAFÉ", "café"),  # case
+        ("Café", "café"),
+        ("cafe\u0301", "caf\u00e9"),  # combining accent
+        ("  café \t", "café"),  # surrounding whitespace
+        ("look　 up", "look up"),  # inner (ideographic) whitespace
+        ("Straße", "strasse"),  # case folding, not just lower-casing
+    ],
+)
+def test_canonical_term(variant, term):
+    assert canonical_term(variant) == canonical_term(term)
+
+
+def test_canonical_term_keeps_different_words_apart():
+    assert canonical_term("resume") != canonical_term("résumé")
+    assert canonical_term("look up") != canonical_term("lookup")
+
+
+def test_index_keeps_first_spelling():
+    index = TermIndex(["Apple", "apple", " APPLE ", "Ａｐｐｌｅ"])
+    assert len(index) == 1
+    assert list(index) == ["Apple"]
+    assert index.get("apple") == "Apple"
+    assert "ａｐｐｌｅ" in index
+
+
+def test_empty_terms_are_ignored():
+    index = TermIndex(["", "   ", "　"])
+    assert len(index) == 0
+
+
+def test_diff():
+    remote = TermIndex(["apple", "Banana", "ｃｈｅｒｒｙ", "date "])
+    local = TermIndex(["APPLE", "banana", "cherry", "elder"])
+
+    diff = remote.diff(local)
+    assert diff.added == ["date "]
+    # spelled as in the local deck, which is what notes are looked up by
+    assert diff.unchanged == ["APPLE", "banana", "cherry"]
+    # only in the local deck: the words to delete
+    assert diff.removed == ["elder"]
+
+
+def test_diff_same_words_in_another_form_deletes_nothing():
+    remote = TermIndex(["Ｃａｆé", "look up"])
+    local = TermIndex(["CAFÉ", " look  up "])
+
+    diff = remote.diff(local)
+    assert diff.added == []
+    assert diff.removed == []
+
+
+def test_diff_with_empty_sides():
+    local = TermIndex(["apple"])
+    assert TermIndex().diff(local).removed == ["apple"]
+    assert local.diff(TermIndex()).added == ["apple"]
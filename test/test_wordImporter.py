@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+from addon.wordImporter import WordImporter, detect_encoding, iter_words
+
+FIXTURES = Path(__file__).parent.joinpath("fixtures", "wordImporter")
+
+
+def read(name: str) -> list[tuple[str, str]]:
+    return [(word.term, word.trans) for word in iter_words(str(FIXTURES / name))]
+
+
+def test_legacy_txt():
+    words = list(iter_words(str(FIXTURES / "legacy.txt")))
+    assert [(w.term, w.trans) for w in words] == [
+        ("apple", "苹果"),
+        ("look up", "查找"),
+        ("banana", ""),
+    ]
+    assert (words[0].modifiedTime, words[0].bookId, words[0].bookName) == (
+        1700000000,
+        1,
+        "CET4",
+    )
+
+
+def test_legacy_txt_first_word_is_a_header_name():
+    # `word` alone is a word, not a header naming a single column
+    assert read("legacy_first_word_is_header_word.txt") == [
+        ("word", "单词"),
+        ("front", ""),
+        ("next", ""),
+    ]
+
+
+def test_txt_with_a_header_row():
+    assert read("header.txt") == [("apple", "苹果")]
+
+
+def test_csv_header():
+    words = list(iter_words(str(FIXTURES / "header.csv")))
+    assert [(w.term, w.trans, w.bookName) for w in words] == [
+        ("apple", "苹果", "CET4"),
+        ("look up", "查找, 查询", "CET4"),
+    ]
+
+
+def test_csv_delimiter_is_sniffed():
+    assert read("semicolon.csv") == [("apple", "苹果"), ("banana", "香蕉")]
+
+
+def test_headerless_csv_is_positional():
+    assert read("headerless.csv") == [("apple", "苹果"), ("banana", "香蕉")]
+
+
+def test_tsv_header_naming_a_single_column():
+    assert read("single_header.tsv") == [("apple", ""), ("banana", "")]
+
+
+def test_anki_export_directives():
+    # `#columns:` names the columns, `#html:true` strips the tags
+    assert read("anki_export.txt") == [("apple", "苹果"), ("look up", "查找")]
+
+
+def test_anki_export_without_columns():
+    assert read("anki_export_without_columns.txt") == [
+        ("apple", "苹果"),
+        ("banana", "香蕉"),
+    ]
+
+
+def test_gb18030_fallback():
+    assert read("gb18030.csv") == [("apple", "苹果"), ("banana", "香蕉")]
+
+
+def test_utf8_bom():
+    assert read("bom.csv") == [("apple", "苹果")]
+
+
+@pytest.mark.parametrize(
+    "sample, complete, encoding",
+    [
+        ("apple,苹果".encode("utf-8"), True, "utf-8-sig"),
+        ("apple,苹果".encode("gb18030"), True, "gb18030"),
+        ("苹果,apple".encode("gb18030"), False, "gb18030"),
+        # the beginning of a file, cut in the middle of a character
+        ("apple,苹果".encode("utf-8")[:-1], False, "utf-8-sig"),
+    ],
+)
+def test_detect_encoding(sample, complete, encoding):
+    assert detect_encoding(sample, complete) == encoding
+
+
+def test_importer_removes_duplicates_across_files():
+    importer = WordImporter(
+        [str(FIXTURES / "headerless.csv"), str(FIXTURES / "semicolon.csv")],
+        batchSize=1,
+    )
+    imported: list[str] = []
+    stats = importer.run(lambda batch: imported.extend(w.term for w in batch))
+
+    assert sorted(imported) == ["apple", "banana"]
+    assert (stats.files, stats.words, stats.unique, stats.duplicates) == (2, 4, 2, 2)